@@ -207,10 +207,13 @@ from addon_system import AddonRegistry
 from flask import render_template, redirect, url_for, flash
 import json
 
+from config import Config
+from services.cache_manager import current_processed_data
+
 def {module_name}_view():
     """Vista principal para el addon {name}"""
-    # Importar la variable global desde app.py
-    from app import processed_data
+    # Datos procesados en memoria del proceso (se recargan si cambia el archivo)
+    processed_data = current_processed_data(Config.DATA_CACHE_PATH)
     
     if processed_data is None:
         flash('No hay datos disponibles. Por favor, sube los archivos primero.', 'error')
@@ -3,63 +3,32 @@ Addon: Trader Performance Analysis
 Description: Provides detailed performance breakdown for each trader
 """
 from addon_system import AddonRegistry
-from flask import render_template, redirect, url_for, flash
-import json
-from collections import defaultdict
+from flask import render_template, redirect, url_for, flash, request
 
 from config import Config
-from services.cache_manager import load_processed_data
+from services.cache_manager import current_processed_data
+from services.cube import PerformanceCube, is_filtered, performance_cube_of, query_filters
+from services.payloads import chart_json, register_chart_payload
+from services.ranking import top_k
+from routes.conditional import not_modified, page_etag, with_etag
 
-def analyze_trader_performance(orders):
+def analyze_trader_performance(orders, **query):
     """
     Analyze trading performance broken down by individual traders
     
     Args:
-        orders (list): List of processed orders
+        orders (PerformanceCube, ProcessedOrders or list): Performance cube or processed orders
+        **query: Cube filters (filters, date_from, date_to)
     
     Returns:
         list: Detailed performance metrics for each trader
     """
-    # Initialize data structures
-    trader_performance = defaultdict(lambda: {
-        'totalTrades': 0,
-        'totalPL': 0,
-        'winningTrades': 0,
-        'losingTrades': 0,
-        'avgTradeSize': 0,
-        'totalCommission': 0,
-        'totalRouteFee': 0
-    })
-    
-    # Process each order
-    for order in orders:
-        trader = order.get('Trader', 'Unknown')
-        
-        # Update trader performance metrics
-        trader_performance[trader]['totalTrades'] += 1
-        trader_performance[trader]['totalPL'] += order.get('pnl', 0)
-        trader_performance[trader]['totalCommission'] += order.get('totalCommission', 0)
-        trader_performance[trader]['totalRouteFee'] += order.get('totalRouteFee', 0)
-        
-        # Track winning/losing trades
-        if order.get('pnl', 0) > 0:
-            trader_performance[trader]['winningTrades'] += 1
-        else:
-            trader_performance[trader]['losingTrades'] += 1
+    cube = orders if isinstance(orders, PerformanceCube) else PerformanceCube.from_orders(orders)
     
-    # Calculate additional metrics
-    result = []
-    for trader, stats in trader_performance.items():
-        # Prevent division by zero
-        if stats['totalTrades'] > 0:
-            stats['winRate'] = (stats['winningTrades'] / stats['totalTrades']) * 100
-            stats['avgPL'] = stats['totalPL'] / stats['totalTrades']
-        else:
-            stats['winRate'] = 0
-            stats['avgPL'] = 0
-        
-        result.append({
-            'trader': trader,
+    # Sum the cube cells by trader (orders without trader are kept)
+    result = [
+        {
+            'trader': stats['Trader'],
             'totalTrades': stats['totalTrades'],
             'totalPL': round(stats['totalPL'], 2),
             'winningTrades': stats['winningTrades'],
@@ -68,10 +37,12 @@ def analyze_trader_performance(orders):
             'avgPL': round(stats['avgPL'], 2),
             'totalCommission': round(stats['totalCommission'], 2),
             'totalRouteFee': round(stats['totalRouteFee'], 2)
-        })
+        }
+        for stats in cube.group('Trader', dropna=False, **query)
+    ]
     
-    # Sort by total P&L in descending order
-    return sorted(result, key=lambda x: x['totalPL'], reverse=True)
+    # Leaderboard by total P&L in descending order
+    return top_k(result, 'totalPL', k=None)
 
 def trader_performance_view():
     """
@@ -84,7 +55,7 @@ def trader_performance_view():
     print("[DEBUG] Entrando en trader_performance_view()")
     
     # Obtener datos procesados
-    processed_data = load_processed_data(Config.DATA_CACHE_PATH)
+    processed_data = current_processed_data(Config.DATA_CACHE_PATH)
     
     print(f"[DEBUG] Processed data: {processed_data is not None}")
     
@@ -93,24 +64,29 @@ def trader_performance_view():
         flash('No hay datos disponibles. Por favor, sube los archivos primero.', 'error')
         return redirect(url_for('main.index'))
     
-    # Obtener órdenes procesadas
-    processed_orders = processed_data.get('processed_orders', [])
+    # Answer 304 when the browser already has this version of the page
+    etag = page_etag()
+    response = not_modified(etag)
+    if response is not None:
+        return response
     
-    print(f"[DEBUG] Número de órdenes procesadas: {len(processed_orders)}")
+    # Analyze trader performance from the pre-aggregated cube (request filters supported)
+    cube = performance_cube_of(processed_data)
     
-    # Analyze trader performance using the obtained data
-    trader_data = analyze_trader_performance(processed_orders)
+    query = query_filters(request.args)
+    trader_data = analyze_trader_performance(cube, **query)
     
     print(f"[DEBUG] Datos de rendimiento por trader: {trader_data}")
     
-    trader_json = json.dumps(trader_data)
+    # Unfiltered chart JSON is serialized once, when the data is processed
+    trader_json = chart_json(processed_data, 'trader_performance', lambda: trader_data, is_filtered(query))
     
-    return render_template(
+    return with_etag(render_template(
         'trader_performance.html',
         trader_performance=trader_data,
         trader_json=trader_json,
         processed_data=processed_data
-    )
+    ), etag)
 
 def register_addon():
     """
@@ -127,6 +103,11 @@ def register_addon():
         'version': '1.0.0',
         'author': 'DAS Trader Analyzer Team'
     })
+    
+    # Unfiltered chart payload, pre-serialized when data is saved
+    register_chart_payload(
+        'trader_performance', lambda data: analyze_trader_performance(performance_cube_of(data))
+    )
 
 # Automatically register when imported
 if __name__ != '__main__':
@@ -8,7 +8,8 @@ import json
 from datetime import datetime, timedelta
 
 from config import Config
-from services.cache_manager import load_processed_data
+from services.cache_manager import current_processed_data
+from services.timestamps import NAT, order_timestamp, time_of_day_ns, time_to_ns
 
 # Crear un blueprint específico para las alertas
 trading_alerts_bp = Blueprint('trading_alerts', __name__)
@@ -73,6 +74,10 @@ class TradingAlertSystem:
         """
         matched_orders = []
         
+        if 'time_range' in conditions:
+            start_time, end_time = conditions['time_range']
+            start_ns, end_ns = time_to_ns(start_time), time_to_ns(end_time)
+        
         for order in orders:
             match = True
             
@@ -93,11 +98,10 @@ class TradingAlertSystem:
                 min_price, max_price = conditions['price_range']
                 match = match and min_price <= order['price'] <= max_price
             
-            # Condiciones de hora
+            # Condiciones de hora (sobre el timestamp parseado en la ingesta)
             if 'time_range' in conditions:
-                order_time = datetime.strptime(order['time'], '%m/%d/%y %H:%M:%S')
-                start_time, end_time = conditions['time_range']
-                match = match and start_time <= order_time.time() <= end_time
+                timestamp = order_timestamp(order)
+                match = match and timestamp != NAT and start_ns <= time_of_day_ns(timestamp) <= end_ns
             
             if match:
                 matched_orders.append(order)
@@ -138,7 +142,7 @@ def trading_alerts():
     print("[DEBUG] Entrando en trading_alerts_view()")
     
     # Obtener datos procesados
-    processed_data = load_processed_data(Config.DATA_CACHE_PATH)
+    processed_data = current_processed_data(Config.DATA_CACHE_PATH)
     
     print(f"[DEBUG] Processed data: {processed_data is not None}")
     
@@ -175,7 +179,7 @@ def create_alert():
     Vista para crear nuevas alertas
     """
     # Obtener datos procesados
-    processed_data = load_processed_data(Config.DATA_CACHE_PATH)
+    processed_data = current_processed_data(Config.DATA_CACHE_PATH)
     
     print(f"[DEBUG] Processed data: {processed_data is not None}")
     
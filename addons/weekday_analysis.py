@@ -3,70 +3,34 @@ Addon: Análisis por Día de la Semana
 Descripción: Analiza el rendimiento de trading por día de la semana
 """
 from addon_system import AddonRegistry
-from flask import render_template, redirect, url_for, flash
-import json
-from datetime import datetime
+from flask import render_template, redirect, url_for, flash, request
 
 from config import Config
-from services.cache_manager import load_processed_data
+from services.cache_manager import current_processed_data
+from services.cube import PerformanceCube, is_filtered, performance_cube_of, query_filters
+from services.payloads import chart_json, register_chart_payload
+from services.ranking import best_worst_active
+from services.timestamps import WEEKDAY_NAMES
+from routes.conditional import not_modified, page_etag, with_etag
 
-def analyze_by_weekday(orders):
-    """Analiza rendimiento por día de la semana"""
+def analyze_by_weekday(orders, **query):
+    """Analiza rendimiento por día de la semana (desde el cubo o desde las órdenes)"""
     print("[DEBUG] Comenzando análisis por día de la semana")
-    print(f"[DEBUG] Número de órdenes: {len(orders)}")
+    cube = orders if isinstance(orders, PerformanceCube) else PerformanceCube.from_orders(orders)
     
-    weekdays = {}
-    
-    for order in orders:
-        time_str = order.get('time', '')
-        if not time_str:
-            continue
-            
-        try:
-            # Probamos diferentes formatos de fecha
-            try:
-                dt = datetime.strptime(time_str, '%m/%d/%y %H:%M:%S')
-            except ValueError:
-                try:
-                    dt = datetime.strptime(time_str, '%Y-%m-%d %H:%M:%S')
-                except ValueError:
-                    print(f"[DEBUG] No se pudo parsear la fecha: {time_str}")
-                    continue
-            
-            weekday = dt.weekday()  # 0 = Lunes, 6 = Domingo
-            weekday_name = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo'][weekday]
-            
-            if weekday_name not in weekdays:
-                weekdays[weekday_name] = {
-                    'totalPL': 0,
-                    'totalTrades': 0,
-                    'winningTrades': 0,
-                    'weekday': weekday  # Guardar número para ordenar
-                }
-            
-            weekdays[weekday_name]['totalPL'] += order.get('pnl', 0)
-            weekdays[weekday_name]['totalTrades'] += 1
-            if order.get('pnl', 0) > 0:
-                weekdays[weekday_name]['winningTrades'] += 1
-        except Exception as e:
-            print(f"[DEBUG] Error procesando fecha {time_str}: {e}")
-            continue
-    
-    # Convertir a lista
-    weekday_stats = []
-    for name, stats in weekdays.items():
-        win_rate = (stats['winningTrades'] / stats['totalTrades'] * 100) if stats['totalTrades'] > 0 else 0
-        avg_pl = stats['totalPL'] / stats['totalTrades'] if stats['totalTrades'] > 0 else 0
-        
-        weekday_stats.append({
-            'weekday': name,
+    # Suma de las celdas del cubo por el día de la semana de su fecha
+    weekday_stats = [
+        {
+            'weekday': WEEKDAY_NAMES[stats['weekday']],
             'weekdayNum': stats['weekday'],
             'totalPL': stats['totalPL'],
             'totalTrades': stats['totalTrades'],
             'winningTrades': stats['winningTrades'],
-            'winRate': win_rate,
-            'avgPL': avg_pl
-        })
+            'winRate': stats['winRate'],
+            'avgPL': stats['avgPL']
+        }
+        for stats in cube.group('weekday', **query)
+    ]
     
     # Ordenar por día de la semana
     weekday_stats = sorted(weekday_stats, key=lambda x: x['weekdayNum'])
@@ -81,8 +45,8 @@ def weekday_analysis_view():
     """Vista para el addon de análisis por día de la semana"""
     print("[DEBUG] Entrando en weekday_analysis_view()")
     
-    # Obtener datos procesados usando load_processed_data
-    processed_data = load_processed_data(Config.DATA_CACHE_PATH)
+    # Obtener datos procesados desde la caché del proceso
+    processed_data = current_processed_data(Config.DATA_CACHE_PATH)
     
     print(f"[DEBUG] Processed data: {processed_data is not None}")
     
@@ -91,33 +55,30 @@ def weekday_analysis_view():
         flash('No hay datos disponibles. Por favor, sube los archivos primero.', 'error')
         return redirect(url_for('main.index'))
     
-    # Obtener órdenes procesadas
-    processed_orders = processed_data.get('processed_orders', [])
+    # Si el navegador ya tiene esta versión de la página no se calcula nada
+    etag = page_etag()
+    response = not_modified(etag)
+    if response is not None:
+        return response
     
-    print(f"[DEBUG] Número de órdenes procesadas: {len(processed_orders)}")
-    
-    # Realizar el análisis con los datos obtenidos
-    weekday_data = analyze_by_weekday(processed_orders)
+    # Realizar el análisis desde el cubo pre-agregado (admite filtros en la petición)
+    query = query_filters(request.args)
+    weekday_data = analyze_by_weekday(performance_cube_of(processed_data), **query)
     
     print(f"[DEBUG] Datos de días de la semana: {weekday_data}")
     
-    # Convertir a JSON para usar en gráficos
-    weekday_json = json.dumps(weekday_data)
+    # JSON para los gráficos (sin filtros, el generado al procesar los datos)
+    weekday_json = chart_json(processed_data, 'weekday', lambda: weekday_data, is_filtered(query))
     
-    # Encontrar el mejor y peor día
-    if weekday_data:
-        best_day = max(weekday_data, key=lambda x: x['totalPL'])
-        worst_day = min(weekday_data, key=lambda x: x['totalPL'])
-        most_active_day = max(weekday_data, key=lambda x: x['totalTrades'])
-    else:
-        best_day = worst_day = most_active_day = None
+    # Encontrar el mejor, el peor y el más activo (selección parcial)
+    best_day, worst_day, most_active_day = best_worst_active(weekday_data)
     
     print(f"[DEBUG] Mejor día: {best_day}")
     print(f"[DEBUG] Peor día: {worst_day}")
     print(f"[DEBUG] Día más activo: {most_active_day}")
     
     # Renderizar la plantilla
-    return render_template(
+    return with_etag(render_template(
         'weekday_analysis.html',
         weekday_data=weekday_data,
         weekday_json=weekday_json,
@@ -125,7 +86,7 @@ def weekday_analysis_view():
         worst_day=worst_day,
         most_active_day=most_active_day,
         processed_data=processed_data
-    )
+    ), etag)
 
 def register_addon():
     """Registra este addon en el sistema"""
@@ -140,6 +101,9 @@ def register_addon():
         'version': '1.0.0',
         'author': 'DAS Trader Analyzer'
     })
+    
+    # Gráfico sin filtros (se pre-serializa al guardar los datos)
+    register_chart_payload('weekday', lambda data: analyze_by_weekday(performance_cube_of(data)))
 
 # Registrar automáticamente al importar
 if __name__ != '__main__':
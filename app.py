@@ -1,16 +1,12 @@
 from flask import Flask
 
-from config import get_config
-from services.cache_manager import load_processed_data
+from config import Config, get_config
+from services.cache_manager import processed_data_cache, save_processed_data
+from services.payloads import with_chart_payloads
 from addons.trading_alert_addon import trading_alerts_bp
 
-# Variable global para almacenar datos procesados
-processed_data = None
-
 def create_app(config_name='development'):
     """Crear y configurar la aplicación Flask"""
-    global processed_data
-    
     # Obtener configuración
     config = get_config(config_name)
     
@@ -20,8 +16,8 @@ def create_app(config_name='development'):
     # Cargar configuración
     app.config.from_object(config)
     
-    # Intentar cargar datos procesados
-    processed_data = load_processed_data(config.DATA_CACHE_PATH)
+    # Intentar cargar datos procesados (quedan en la memoria del proceso)
+    processed_data_cache.get(config.DATA_CACHE_PATH)
     
     # Importar blueprints aquí para evitar importaciones circulares
     from routes.main import main_bp
@@ -53,20 +49,19 @@ def create_app(config_name='development'):
 
 def update_processed_data(new_data=None):
     """
-    Actualiza o devuelve los datos procesados globales
+    Actualiza o devuelve los datos procesados del proceso
     
     Args:
         new_data (dict, optional): Nuevos datos para reemplazar los existentes
+            (se guardan también en Config.DATA_CACHE_PATH)
     
     Returns:
         dict or None: Datos procesados actuales
     """
-    global processed_data
-    
     if new_data is not None:
-        processed_data = new_data
+        save_processed_data(with_chart_payloads(new_data, Config.CHART_PAYLOAD_GZIP), Config.DATA_CACHE_PATH)
     
-    return processed_data
+    return processed_data_cache.get(Config.DATA_CACHE_PATH)
 
 def main():
     """Punto de entrada principal"""
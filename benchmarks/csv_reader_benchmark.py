@@ -0,0 +1,106 @@
+"""
+Benchmark de los lectores de CSV de las exportaciones
+
+Genera archivos Orders/Trades/Tickets sintéticos con la forma de las
+exportaciones de DAS Trader y mide las filas por segundo de cada lector
+disponible en services.ingest (pyarrow si está instalado y pandas).
+
+Uso:
+    python benchmarks/csv_reader_benchmark.py [--orders 200000] [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.ingest import available_csv_readers, read_export_csv  # noqa: E402
+
+SYMBOLS = np.array(['AAPL', 'TSLA', 'MSFT', 'NVDA', 'AMD', 'GDHG', 'MLGO', 'TNON', 'DATS'])
+TRADERS = np.array(['1GDN-001173-1', '1GDN-002000-1', '1GDN-003000-2'])
+
+
+def generate_exports(directory, num_orders, seed=0):
+    """
+    Escribe un trío Orders/Trades/Tickets sintético
+
+    Returns:
+        dict: Tipo de exportación -> (ruta, número de filas)
+    """
+    rng = np.random.default_rng(seed)
+    order_ids = np.arange(1, num_orders + 1)
+    traders = TRADERS[rng.integers(0, len(TRADERS), num_orders)]
+    accounts = np.array([trader.split('-')[1] for trader in TRADERS])[rng.integers(0, len(TRADERS), num_orders)]
+    symbols = SYMBOLS[rng.integers(0, len(SYMBOLS), num_orders)]
+    sides = np.where(rng.random(num_orders) < 0.5, 'B', 'S')
+    prices = np.round(rng.uniform(1, 100, num_orders), 2)
+    seconds = rng.integers(4 * 3600, 20 * 3600, num_orders)
+    times = pd.Series(pd.to_datetime('2025-03-25') + pd.to_timedelta(seconds, unit='s')).dt.strftime('%m/%d/%y %H:%M:%S')
+
+    orders = pd.DataFrame({
+        'OrderID': order_ids, 'Trader': traders, 'Account': accounts, 'Branch': '1GDN', 'route': 'ARCA',
+        'bkrsym': '', 'rrno': '', 'B/S': sides, 'SHORT': np.where(rng.random(num_orders) < 0.2, 'Y', 'N'),
+        'Market': 'Lmt', 'stop': '', 'symb': symbols, 'qty': rng.integers(1, 500, num_orders), 'lvsqty': 0,
+        'price': prices, 'stopprice': 0, 'trailprice': 0, 'time': times
+    })
+
+    fills = np.repeat(np.arange(num_orders), rng.integers(0, 4, num_orders))
+    trades = pd.DataFrame({
+        'TradeID': np.arange(1, len(fills) + 1), 'OrderID': order_ids[fills], 'Trader': traders[fills],
+        'Account': accounts[fills], 'Branch': '1GDN', 'route': 'ARCA', 'bkrsym': 'ARCX', 'rrno': '',
+        'B/S': sides[fills], 'SHORT': 'N', 'Market': 'Lmt', 'symb': symbols[fills],
+        'qty': rng.integers(1, 200, len(fills)), 'price': np.round(prices[fills] + rng.normal(0, 0.05, len(fills)), 2),
+        'time': times.to_numpy()[fills]
+    })
+
+    tickets = trades.drop(columns=['OrderID']).copy()
+    tickets.insert(0, 'TicketID', np.arange(1, len(tickets) + 1))
+    tickets.insert(len(tickets.columns) - 1, 'commission', np.round(rng.uniform(0, 1, len(tickets)), 3))
+    tickets.insert(len(tickets.columns) - 1, 'RouteFee', np.round(rng.uniform(0, 0.3, len(tickets)), 3))
+
+    files = {}
+    for kind, frame in (('orders', orders), ('trades', trades), ('tickets', tickets)):
+        path = os.path.join(directory, f'{kind.capitalize()}.csv')
+        frame.to_csv(path, index=False)
+        files[kind] = (path, len(frame))
+    return files
+
+
+def benchmark_reader(reader, files, repeat):
+    """Mejor tiempo de lectura de los tres archivos y filas por segundo"""
+    total_rows = sum(rows for _, rows in files.values())
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for kind, (path, _) in files.items():
+            read_export_csv(path, kind, reader=reader)
+        best = min(best, time.perf_counter() - start)
+    return best, total_rows / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de los lectores de CSV')
+    parser.add_argument('--orders', type=int, default=200_000, help='Número de órdenes sintéticas')
+    parser.add_argument('--repeat', type=int, default=3, help='Repeticiones por lector (se toma la mejor)')
+    args = parser.parse_args()
+
+    readers = available_csv_readers()
+    if 'pyarrow' not in readers:
+        print('pyarrow no está instalado: solo se mide el lector de pandas')
+
+    with tempfile.TemporaryDirectory(prefix='das_csv_bench_') as directory:
+        files = generate_exports(directory, args.orders)
+        print('Archivos: ' + ', '.join(f'{kind}={rows} filas' for kind, (_, rows) in files.items()))
+
+        for reader in readers:
+            seconds, rows_per_second = benchmark_reader(reader, files, args.repeat)
+            print(f'{reader:>8}: {seconds:.3f} s  {rows_per_second:,.0f} filas/s')
+
+
+if __name__ == '__main__':
+    main()
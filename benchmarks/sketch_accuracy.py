@@ -0,0 +1,94 @@
+"""
+Precisión de los sketches de distribución frente a cuantiles exactos
+
+Genera valores sintéticos (P&L con colas pesadas, cantidades y comisiones),
+los agrega con services.distributions en lotes y combinando sketches
+parciales (como la ingesta por días o por procesos) y compara los cuantiles
+estimados con np.quantile exacto. Informa del error de rango normalizado
+máximo, que debe quedar por debajo de la cota documentada (~1.65% para
+k = 200).
+
+Uso:
+    python benchmarks/sketch_accuracy.py [--values 1000000] [--parts 16] [--k 200]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.distributions import QuantileSketch  # noqa: E402
+
+FRACTIONS = np.array([0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 0.75, 0.9, 0.95, 0.99, 0.999])
+
+# Cota de error de rango normalizado documentada para k = 200
+RANK_ERROR_BOUND_K200 = 0.0165
+
+
+def generate_values(num_values, seed=0):
+    """Distribuciones sintéticas con la forma de P&L, cantidad y comisión"""
+    rng = np.random.default_rng(seed)
+    return {
+        'pnl': rng.standard_t(3, num_values) * 25,
+        'qty': np.round(rng.lognormal(4, 1.2, num_values)),
+        'commission': np.round(rng.exponential(0.4, num_values), 3)
+    }
+
+
+def rank_errors(values, estimates):
+    """Error de rango normalizado de cada cuantil estimado"""
+    ordered = np.sort(values)
+    low = np.searchsorted(ordered, estimates, side='left') / len(values)
+    high = np.searchsorted(ordered, estimates, side='right') / len(values)
+    # El rango del valor estimado es cualquiera entre low y high (empates)
+    return np.maximum(np.maximum(low - FRACTIONS, FRACTIONS - high), 0)
+
+
+def build_sketch(values, parts, k):
+    """Sketch construido por lotes en varias partes que luego se combinan"""
+    sketches = []
+    for index, chunk in enumerate(np.array_split(values, parts)):
+        sketch = QuantileSketch(k, seed=index)
+        for batch in np.array_split(chunk, 4):
+            sketch.update(batch)
+        sketches.append(sketch)
+
+    merged = sketches[0]
+    for sketch in sketches[1:]:
+        merged.merge(sketch)
+    return merged
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Precisión de los sketches de cuantiles')
+    parser.add_argument('--values', type=int, default=1_000_000, help='Número de valores por medida')
+    parser.add_argument('--parts', type=int, default=16, help='Sketches parciales que se combinan')
+    parser.add_argument('--k', type=int, default=200, help='Tamaño del sketch KLL')
+    args = parser.parse_args()
+
+    bound = RANK_ERROR_BOUND_K200 * 200 / args.k
+    failures = 0
+    for measure, values in generate_values(args.values).items():
+        start = time.perf_counter()
+        sketch = build_sketch(values, args.parts, args.k)
+        seconds = time.perf_counter() - start
+
+        estimates = sketch.quantiles(FRACTIONS)
+        exact = np.quantile(values, FRACTIONS)
+        errors = rank_errors(values, estimates)
+        retained = sum(len(level) for level in sketch.levels)
+
+        print(f'{measure}: {seconds:.2f} s, {retained} valores retenidos, '
+              f'error de rango máximo {errors.max():.4%} (cota {bound:.2%})')
+        for fraction, estimate, value, error in zip(FRACTIONS, estimates, exact, errors):
+            print(f'  q={fraction:<6} estimado={estimate:12.4f} exacto={value:12.4f} error de rango={error:.4%}')
+        failures += int(errors.max() > bound)
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -20,6 +20,42 @@ class Config:
     
     # Ruta de caché
     DATA_CACHE_PATH = os.path.join(DATA_FOLDER, 'processed_cache.pkl')
+    
+    # Caché por contenido de los resultados (clave: huella de los CSV + motor + versión) y entradas que se conservan
+    PROCESSING_CACHE_FOLDER = os.environ.get('PROCESSING_CACHE_FOLDER', os.path.join(DATA_FOLDER, 'processing_cache'))
+    PROCESSING_CACHE_ENTRIES = int(os.environ.get('PROCESSING_CACHE_ENTRIES', 4))
+    
+    # Instantáneas binarias de los CSV predeterminados (vacío = desactivadas)
+    SNAPSHOT_FOLDER = os.environ.get('SNAPSHOT_FOLDER', os.path.join(DATA_FOLDER, 'snapshots'))
+    
+    # Motor de procesamiento ('vectorized' o 'reference', ver services/engines.py)
+    PROCESSING_ENGINE = os.environ.get('PROCESSING_ENGINE', 'vectorized')
+    
+    # Ingesta por trozos: número de filas por trozo (vacío = cargar los CSV completos)
+    INGEST_CHUNK_SIZE = int(os.environ.get('INGEST_CHUNK_SIZE', 0)) or None
+    
+    # Directorio con exportaciones diarias (Orders_<día>.csv o <día>/Orders.csv)
+    EXPORTS_FOLDER = os.environ.get('EXPORTS_FOLDER', os.path.join(DATA_FOLDER, 'exports'))
+    
+    # Procesos usados en la ingesta en paralelo (vacío = número de núcleos)
+    INGEST_WORKERS = int(os.environ.get('INGEST_WORKERS', 0)) or None
+    
+    # Procesos entre los que se reparten las cuentas al procesar una exportación (1 = sin paralelismo, 0 = núcleos)
+    PROCESSING_WORKERS = int(os.environ.get('PROCESSING_WORKERS', 1)) or None
+    
+    # Puntos de la curva de equidad en el dashboard y máximo por petición al ampliar
+    EQUITY_CHART_POINTS = int(os.environ.get('EQUITY_CHART_POINTS', 1000))
+    EQUITY_MAX_POINTS = int(os.environ.get('EQUITY_MAX_POINTS', 5000))
+    
+    # Tamaño por defecto de las ventanas móviles (operaciones y días naturales)
+    ROLLING_TRADE_WINDOW = int(os.environ.get('ROLLING_TRADE_WINDOW', 50))
+    ROLLING_DAY_WINDOW = int(os.environ.get('ROLLING_DAY_WINDOW', 20))
+    
+    # Round trips mostrados en la tabla (los más recientes; el resumen usa todos)
+    ROUND_TRIP_TABLE_ROWS = int(os.environ.get('ROUND_TRIP_TABLE_ROWS', 1000))
+    
+    # Guardar también comprimido con gzip el JSON pre-serializado de los gráficos (0 = no)
+    CHART_PAYLOAD_GZIP = os.environ.get('CHART_PAYLOAD_GZIP', '1') != '0'
 
 class DevelopmentConfig(Config):
     """Configuración para desarrollo"""
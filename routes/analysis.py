@@ -1,15 +1,31 @@
-import json
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+import numpy as np
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
 
 from config import Config
-from services.cache_manager import load_processed_data
+from services.cache_manager import current_processed_data
+from services.cube import (group_performance_of, hour_breakdown, is_filtered, performance_cube_of, query_filters,
+                           side_breakdown, symbol_breakdown)
+from services.distributions import DISTRIBUTION_DIMENSIONS, DISTRIBUTION_MEASURES, distributions_of
+from services.order_index import filtered_rows, order_index_of
+from services.payloads import chart_json, register_chart_payload
+from services.positions import round_trip_records, round_trip_summary, round_trips_of
+from services.processed_orders import as_processed_orders
+from services.ranking import best_worst_active, top_k
+from services.rolling import ROLLING_UNITS, rolling_chart_points
+from services.timestamps import order_timestamps
 from addon_system import AddonRegistry, load_addons_from_directory, create_addon_template
+from routes.conditional import not_modified, page_etag, with_etag
 
 analysis_bp = Blueprint('analysis', __name__)
 
+# Gráficos sin filtros (se pre-serializan al guardar los datos)
+register_chart_payload('symbols.top', lambda data: top_k(symbol_breakdown(performance_cube_of(data)), 'totalPL', 10))
+register_chart_payload('time', lambda data: hour_breakdown(performance_cube_of(data)))
+register_chart_payload('buysell', lambda data: side_breakdown(performance_cube_of(data)))
+
 def get_processed_data():
     """Obtener datos procesados"""
-    processed_data = load_processed_data(Config.DATA_CACHE_PATH)
+    processed_data = current_processed_data(Config.DATA_CACHE_PATH)
     
     if processed_data is None:
         flash('No hay datos disponibles. Por favor, sube los archivos primero.', 'error')
@@ -26,16 +42,26 @@ def symbols():
     if processed_data is None:
         return redirect(url_for('main.index'))
     
-    symbols_data = processed_data.get('symbol_performance', [])
-    symbols_json = json.dumps(symbols_data)
+    etag = page_etag()
+    response = not_modified(etag)
+    if response is not None:
+        return response
     
-    return render_template(
+    # Desglose desde el cubo pre-agregado (admite filtros en la petición)
+    query = query_filters(request.args)
+    symbols_data = symbol_breakdown(performance_cube_of(processed_data), **query)
+    top_symbols_json = chart_json(  # Top 10 para los gráficos
+        processed_data, 'symbols.top', lambda: top_k(symbols_data, 'totalPL', 10), is_filtered(query)
+    )
+    
+    return with_etag(render_template(
         'symbols.html', 
         symbols=symbols_data, 
-        symbols_json=symbols_json,
+        filter_symbols=order_index_of(processed_data).symbols(),
+        top_symbols_json=top_symbols_json,
         processed_data=processed_data,
         sidebar_items=AddonRegistry.get_sidebar_items()
-    )
+    ), etag)
 
 @analysis_bp.route('/time')
 def time_analysis():
@@ -45,27 +71,29 @@ def time_analysis():
     if processed_data is None:
         return redirect(url_for('main.index'))
     
-    time_data = processed_data.get('time_performance', [])
-    time_json = json.dumps(time_data)
+    etag = page_etag()
+    response = not_modified(etag)
+    if response is not None:
+        return response
     
-    # Encontrar las mejores y peores horas
-    if time_data:
-        best_hour = max(time_data, key=lambda x: x['totalPL'])
-        worst_hour = min(time_data, key=lambda x: x['totalPL'])
-        most_active = max(time_data, key=lambda x: x['totalTrades'])
-    else:
-        best_hour = worst_hour = most_active = None
+    query = query_filters(request.args)
+    time_data = hour_breakdown(performance_cube_of(processed_data), **query)
+    time_json = chart_json(processed_data, 'time', lambda: time_data, is_filtered(query))
     
-    return render_template(
+    # Mejor, peor y más activa con selección parcial (sin ordenar las horas)
+    best_hour, worst_hour, most_active = best_worst_active(time_data)
+    
+    return with_etag(render_template(
         'time_analysis.html', 
         time_data=time_data, 
+        filter_symbols=order_index_of(processed_data).symbols(),
         time_json=time_json,
         best_hour=best_hour,
         worst_hour=worst_hour,
         most_active=most_active,
         processed_data=processed_data,
         sidebar_items=AddonRegistry.get_sidebar_items()
-    )
+    ), etag)
 
 @analysis_bp.route('/buysell')
 def buysell():
@@ -75,16 +103,23 @@ def buysell():
     if processed_data is None:
         return redirect(url_for('main.index'))
     
-    buysell_data = processed_data.get('buysell_performance', [])
-    buysell_json = json.dumps(buysell_data)
+    etag = page_etag()
+    response = not_modified(etag)
+    if response is not None:
+        return response
     
-    return render_template(
+    query = query_filters(request.args)
+    buysell_data = side_breakdown(performance_cube_of(processed_data), **query)
+    buysell_json = chart_json(processed_data, 'buysell', lambda: buysell_data, is_filtered(query))
+    
+    return with_etag(render_template(
         'buysell.html', 
         buysell=buysell_data, 
+        filter_symbols=order_index_of(processed_data).symbols(),
         buysell_json=buysell_json,
         processed_data=processed_data,
         sidebar_items=AddonRegistry.get_sidebar_items()
-    )
+    ), etag)
 
 @analysis_bp.route('/trades')
 def trades():
@@ -94,18 +129,135 @@ def trades():
     if processed_data is None:
         return redirect(url_for('main.index'))
     
-    processed_orders = processed_data.get('processed_orders', [])
+    processed_orders = as_processed_orders(processed_data.get('processed_orders', []))
     
-    # Ordenar por fecha (más reciente primero)
-    sorted_orders = sorted(processed_orders, key=lambda x: x.get('time', ''), reverse=True)
+    # Órdenes filtradas con el índice por tiempo y símbolo (más reciente primero)
+    rows = filtered_rows(processed_data, **query_filters(request.args))
+    sorted_orders = processed_orders.take(rows[::-1])
     
     return render_template(
         'trades.html', 
         orders=sorted_orders,
+        filter_symbols=order_index_of(processed_data).symbols(),
         processed_data=processed_data,
         sidebar_items=AddonRegistry.get_sidebar_items()
     )
 
+@analysis_bp.route('/rolling')
+def rolling():
+    """Métricas de rendimiento en ventanas móviles"""
+    processed_data = get_processed_data()
+    
+    if processed_data is None:
+        return redirect(url_for('main.index'))
+    
+    # Las series se cargan desde rolling_data según la ventana elegida
+    return render_template(
+        'rolling.html',
+        trade_window=Config.ROLLING_TRADE_WINDOW,
+        day_window=Config.ROLLING_DAY_WINDOW,
+        filter_symbols=order_index_of(processed_data).symbols(),
+        processed_data=processed_data,
+        sidebar_items=AddonRegistry.get_sidebar_items()
+    )
+
+@analysis_bp.route('/rolling/data')
+def rolling_data():
+    """Devuelve en JSON las métricas móviles (ventana de operaciones o de días)"""
+    processed_data = current_processed_data(Config.DATA_CACHE_PATH)
+    
+    if processed_data is None:
+        return jsonify({'points': [], 'total': 0}), 404
+    
+    unit = request.args.get('unit', 'trades')
+    if unit not in ROLLING_UNITS:
+        return jsonify({'error': f'Unidad no válida: {unit}'}), 400
+    
+    default_window = Config.ROLLING_DAY_WINDOW if unit == 'days' else Config.ROLLING_TRADE_WINDOW
+    window = max(request.args.get('window', default_window, type=int) or default_window, 1)
+    points = request.args.get('points', Config.EQUITY_CHART_POINTS, type=int)
+    points = max(3, min(points, Config.EQUITY_MAX_POINTS))
+    
+    # P&L y timestamps en orden cronológico de las órdenes seleccionadas
+    processed_orders = as_processed_orders(processed_data.get('processed_orders', []))
+    rows = filtered_rows(processed_data, **query_filters(request.args))
+    pnl = processed_orders.column('pnl').astype(float)[rows] if len(processed_orders) else np.zeros(0)
+    timestamps = order_timestamps(processed_orders)[rows]
+    
+    chart_points, total = rolling_chart_points(pnl, timestamps, window, unit, points)
+    
+    return jsonify({
+        'unit': unit,
+        'window': window,
+        'points': chart_points,
+        'total': total
+    })
+
+@analysis_bp.route('/round-trips')
+def round_trips():
+    """Round trips reconstruidos de los fills (P&L realizado FIFO)"""
+    processed_data = get_processed_data()
+    
+    if processed_data is None:
+        return redirect(url_for('main.index'))
+    
+    book = round_trips_of(processed_data)
+    selected = book.select(**query_filters(request.args))
+    
+    return render_template(
+        'round_trips.html',
+        summary=round_trip_summary(selected),
+        round_trips=round_trip_records(selected, Config.ROUND_TRIP_TABLE_ROWS),
+        open_positions=round_trip_records(book.open_positions),
+        unmatched=book.unmatched,
+        filter_symbols=order_index_of(processed_data).symbols(),
+        processed_data=processed_data,
+        sidebar_items=AddonRegistry.get_sidebar_items()
+    )
+
+@analysis_bp.route('/distributions')
+def distributions():
+    """Devuelve en JSON percentiles, colas e histogramas de P&L, cantidad o comisión"""
+    processed_data = current_processed_data(Config.DATA_CACHE_PATH)
+    
+    if processed_data is None:
+        return jsonify({'groups': []}), 404
+    
+    measure = request.args.get('measure', 'pnl')
+    dimension = request.args.get('by', 'all')
+    if measure not in DISTRIBUTION_MEASURES or dimension not in DISTRIBUTION_DIMENSIONS:
+        return jsonify({
+            'error': 'Parámetros no válidos',
+            'measures': list(DISTRIBUTION_MEASURES),
+            'dimensions': list(DISTRIBUTION_DIMENSIONS)
+        }), 400
+    
+    # Sketches mantenidos durante la agregación (percentiles aproximados, ver services/distributions.py)
+    sketches = distributions_of(processed_data)
+    groups = sketches.summary(measure, dimension)
+    for group in groups:
+        group['histogram'] = sketches.histogram(measure, dimension, group['key'])
+    
+    return jsonify({'measure': measure, 'by': dimension, 'groups': groups})
+
+@analysis_bp.route('/breakdown')
+def breakdown():
+    """Devuelve en JSON el rendimiento agrupado por una o varias dimensiones"""
+    processed_data = current_processed_data(Config.DATA_CACHE_PATH)
+    
+    if processed_data is None:
+        return jsonify({'groups': []}), 404
+    
+    dimensions = [value.strip() for value in request.args.get('by', 'symbol').split(',') if value.strip()]
+    
+    # Dimensiones del cubo desde sus celdas; el resto (route, Account...) desde las órdenes
+    try:
+        groups = group_performance_of(processed_data, dimensions, **query_filters(request.args))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({'by': dimensions, 'groups': groups})
+
 @analysis_bp.route('/manage-addons')
 def manage_addons():
     """Página para gestionar addons"""
@@ -0,0 +1,90 @@
+"""
+Peticiones condicionales (ETag / 304) de las páginas de análisis
+
+El ETag de una página depende de la versión del conjunto de datos activo
+(ProcessedDataCache.generation), de la ruta y sus parámetros, de los addons
+de la barra lateral y de las plantillas. Si el navegador ya tiene esa
+versión, la vista responde 304 sin calcular ni renderizar nada. Las páginas
+con mensajes flash pendientes no usan ETag (el mensaje se tiene que mostrar).
+"""
+import hashlib
+import json
+import os
+
+from flask import Response, current_app, make_response, request, session
+
+from addon_system import AddonRegistry
+from services.cache_manager import processed_data_cache
+
+# Fecha de modificación más reciente de las plantillas (se calcula una vez por proceso)
+_template_mtime = None
+
+
+def page_etag(*extra):
+    """
+    ETag de la página solicitada para el conjunto de datos activo
+
+    Args:
+        *extra: Otros valores de los que dependa la página
+
+    Returns:
+        str or None: ETag, o None si la página no se debe validar por ETag
+    """
+    generation = processed_data_cache.generation
+    if generation is None or session.get('_flashes'):
+        return None
+
+    key = json.dumps([
+        generation,
+        _template_stamp(),
+        request.path,
+        sorted(request.args.items(multi=True)),
+        AddonRegistry.get_sidebar_items(),
+        extra
+    ], default=str)
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def not_modified(etag):
+    """
+    Respuesta 304 si el navegador ya tiene la versión indicada
+
+    Args:
+        etag (str or None): ETag de la página
+
+    Returns:
+        Response or None: 304 Not Modified, o None si hay que generar la página
+    """
+    if etag is not None and request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+    return None
+
+
+def with_etag(body, etag):
+    """
+    Respuesta con ETag (el navegador la revalida en cada visita)
+
+    Args:
+        body (str or Response): Página renderizada
+        etag (str or None): ETag de la página
+
+    Returns:
+        Response: Respuesta de Flask
+    """
+    response = make_response(body)
+    if etag is not None:
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def _template_stamp():
+    """Fecha de modificación más reciente de las plantillas de la aplicación"""
+    global _template_mtime
+    if _template_mtime is None:
+        folder = os.path.join(current_app.root_path, current_app.template_folder or 'templates')
+        stamps = [entry.stat().st_mtime_ns for entry in os.scandir(folder) if entry.is_file()]
+        _template_mtime = max(stamps, default=0)
+    return _template_mtime
@@ -4,11 +4,68 @@ from flask import Blueprint, request, redirect, url_for, flash, current_app
 
 from config import Config
 from services.data_processor import process_trading_data
-from services.cache_manager import save_processed_data
+from services.batch_ingest import process_export_directory
+from services.incremental_ingest import append_trading_data
+from services.cache_manager import (
+    load_processed_data, processed_data_cache, processing_cache_key, restore_cached_result, save_processed_data,
+    store_cached_result
+)
 from services.file_handler import save_uploaded_file, validate_csv_files, copy_file
+from services.payloads import with_chart_payloads
 
 upload_bp = Blueprint('upload', __name__)
 
+def activate_processed_data(processed_data):
+    """
+    Guarda los datos como conjunto activo y lo mapea en la caché del proceso
+    
+    Antes de guardarlos se pre-serializa el JSON de los gráficos sin filtros.
+    
+    Args:
+        processed_data (dict): Datos procesados
+    
+    Returns:
+        bool: True si se han guardado los datos
+    """
+    processed_data = with_chart_payloads(processed_data, Config.CHART_PAYLOAD_GZIP)
+    saved = save_processed_data(processed_data, Config.DATA_CACHE_PATH)
+    if saved:
+        # Las vistas pasan a usar el archivo nuevo, mapeado y compartido con
+        # los demás procesos, en lugar de la copia privada recién calculada
+        processed_data_cache.get(Config.DATA_CACHE_PATH)
+    return saved
+
+def process_with_cache(paths, snapshot_dir=None):
+    """
+    Procesa una exportación y la guarda como conjunto de datos activo
+    
+    Si la caché por contenido tiene el resultado de los mismos CSV con el
+    mismo motor y versión de formato, se activa sin volver a procesar.
+    
+    Args:
+        paths (list): Rutas de los CSV de órdenes, trades y tickets
+        snapshot_dir (str, optional): Directorio de instantáneas binarias de los CSV
+    """
+    key = processing_cache_key(paths, Config.PROCESSING_ENGINE, Config.PROCESSING_CACHE_FOLDER)
+    if restore_cached_result(Config.PROCESSING_CACHE_FOLDER, key, Config.DATA_CACHE_PATH):
+        return
+    
+    processed_data = process_trading_data(
+        *paths,
+        chunk_size=Config.INGEST_CHUNK_SIZE,
+        engine=Config.PROCESSING_ENGINE,
+        snapshot_dir=snapshot_dir,
+        workers=Config.PROCESSING_WORKERS
+    )
+    
+    # Guardar en caché (los resultados vacíos por error no se reutilizan)
+    saved = activate_processed_data(processed_data)
+    if saved and len(processed_data.get('processed_orders') or []):
+        store_cached_result(
+            Config.PROCESSING_CACHE_FOLDER, key, Config.DATA_CACHE_PATH,
+            Config.PROCESSING_ENGINE, Config.PROCESSING_CACHE_ENTRIES
+        )
+
 @upload_bp.route('/upload', methods=['POST'])
 def upload_files():
     """Procesa archivos subidos por el usuario"""
@@ -27,11 +84,8 @@ def upload_files():
             return redirect(url_for('main.index'))
         
         try:
-            # Procesar archivos predeterminados
-            processed_data = process_trading_data(*default_paths)
-            
-            # Guardar en caché
-            save_processed_data(processed_data, Config.DATA_CACHE_PATH)
+            # Procesar archivos predeterminados (o recuperar el resultado si no han cambiado)
+            process_with_cache(default_paths, snapshot_dir=Config.SNAPSHOT_FOLDER)
             
             return redirect(url_for('main.dashboard'))
         
@@ -84,15 +138,28 @@ def upload_files():
             flash('Los archivos CSV no son válidos', 'error')
             return redirect(url_for('main.index'))
         
-        # Procesar los datos
-        processed_data = process_trading_data(*temp_paths)
+        # Añadir a los datos ya procesados si se solicita y existe caché (se
+        # cargan del archivo porque append_trading_data modifica los datos)
+        existing_data = load_processed_data(Config.DATA_CACHE_PATH) if 'append' in request.form else None
         
-        # Guardar en caché
-        save_processed_data(processed_data, Config.DATA_CACHE_PATH)
+        if existing_data is not None:
+            processed_data = append_trading_data(
+                existing_data,
+                *temp_paths,
+                engine=Config.PROCESSING_ENGINE
+            )
+            
+            # Guardar en caché
+            activate_processed_data(processed_data)
+        else:
+            # Procesar los datos (o recuperar el resultado si la exportación ya se procesó)
+            process_with_cache(temp_paths)
         
-        # Copiar archivos a la carpeta 'data' para uso futuro
-        for temp_path, default_path in zip(temp_paths, default_paths):
-            copy_file(temp_path, default_path)
+        # Copiar archivos a la carpeta 'data' para uso futuro (los archivos
+        # predeterminados solo contienen la última exportación completa)
+        if existing_data is None:
+            for temp_path, default_path in zip(temp_paths, default_paths):
+                copy_file(temp_path, default_path)
         
         return redirect(url_for('main.dashboard'))
     
@@ -103,4 +170,27 @@ def upload_files():
                 os.remove(temp_path)
         
         flash(f'Error al procesar archivos: {str(e)}', 'error')
-        return redirect(url_for('main.index'))
\ No newline at end of file
+        return redirect(url_for('main.index'))
+
+@upload_bp.route('/upload-directory', methods=['POST'])
+def upload_directory():
+    """Procesa en paralelo todas las exportaciones diarias del directorio configurado"""
+    try:
+        processed_data = process_export_directory(
+            Config.EXPORTS_FOLDER,
+            max_workers=Config.INGEST_WORKERS,
+            engine=Config.PROCESSING_ENGINE
+        )
+        
+        if not processed_data['processed_orders']:
+            flash('No se encontraron exportaciones válidas en el directorio', 'error')
+            return redirect(url_for('main.index'))
+        
+        # Guardar en caché
+        activate_processed_data(processed_data)
+        
+        return redirect(url_for('main.dashboard'))
+    
+    except Exception as e:
+        flash(f'Error al procesar el directorio de exportaciones: {str(e)}', 'error')
+        return redirect(url_for('main.index'))
@@ -1,13 +1,28 @@
 import os
-import json
-from flask import Blueprint, render_template, redirect, url_for, flash
+from flask import Blueprint, Response, render_template, redirect, url_for, flash, request, jsonify
 
 from config import Config
 from addon_system import AddonRegistry
-from services.cache_manager import load_processed_data
+from services.aggregates import PerformanceAccumulator
+from services.cache_manager import current_processed_data
+from services.batch_ingest import discover_export_sets
+from services.cube import is_filtered, query_filters
+from services.equity import equity_chart_points, equity_series_of
+from services.order_index import filtered_rows, order_index_of
+from services.payloads import chart_json, chart_payload, register_chart_payload
+from services.processed_orders import as_processed_orders
+from services.ranking import top_k
+from routes.conditional import not_modified, page_etag, with_etag
 
 main_bp = Blueprint('main', __name__)
 
+# Gráficos del dashboard sin filtros (se pre-serializan al guardar los datos)
+register_chart_payload(
+    'dashboard.equity', lambda data: equity_chart_points(equity_series_of(data), Config.EQUITY_CHART_POINTS)
+)
+register_chart_payload('dashboard.symbols', lambda data: top_k(data.get('symbol_performance', []), 'totalPL', 5))
+register_chart_payload('dashboard.buysell', lambda data: data.get('buysell_performance', []))
+
 @main_bp.route('/')
 def index():
     """Página principal con formulario para cargar archivos"""
@@ -20,31 +35,122 @@ def index():
     # Usar os.path.exists para verificar archivos
     has_default_files = all(os.path.exists(path) for path in default_files)
     
-    return render_template('index.html', has_default_files=has_default_files)
+    # Exportaciones diarias disponibles para la ingesta por lotes
+    export_days = len(discover_export_sets(Config.EXPORTS_FOLDER))
+    
+    return render_template('index.html', has_default_files=has_default_files, export_days=export_days)
+
+def dashboard_data(processed_data, query):
+    """
+    Métricas, análisis y serie de equidad del dashboard
+
+    Sin filtros se usan los resultados precalculados; con filtros se
+    agregan solo las órdenes seleccionadas con el índice por tiempo y símbolo.
+
+    Args:
+        processed_data (dict): Datos procesados
+        query (dict): Filtros de services.cube.query_filters
+
+    Returns:
+        dict: metrics, symbol_performance, buysell_performance y equity_series
+    """
+    if not is_filtered(query):
+        return {
+            'metrics': processed_data.get('metrics', {}),
+            'symbol_performance': processed_data.get('symbol_performance', []),
+            'buysell_performance': processed_data.get('buysell_performance', []),
+            'equity_series': equity_series_of(processed_data)
+        }
+    
+    rows = filtered_rows(processed_data, **query)
+    orders = as_processed_orders(processed_data.get('processed_orders') or []).take(rows)
+    # Sin sketches de distribución ni equity_curve: el dashboard solo usa equity_series
+    return PerformanceAccumulator(distributions=False).update(orders).to_result(equity_curve=False)
 
 @main_bp.route('/dashboard')
 def dashboard():
     """Muestra el dashboard con resumen de métricas"""
     # Intentar cargar desde caché
-    processed_data = load_processed_data(Config.DATA_CACHE_PATH)
+    processed_data = current_processed_data(Config.DATA_CACHE_PATH)
     
     if processed_data is None:
         flash('No hay datos disponibles. Por favor, sube los archivos primero.', 'error')
         return redirect(url_for('main.index'))
     
-    metrics = processed_data.get('metrics', {})
+    # Si el navegador ya tiene esta versión de la página no se calcula nada
+    etag = page_etag()
+    response = not_modified(etag)
+    if response is not None:
+        return response
+    
+    # Datos del dashboard (filtrados por ?from=&to=&symbols= si se indican)
+    query = query_filters(request.args)
+    filtered = is_filtered(query)
+    data = dashboard_data(processed_data, query)
+    metrics = data['metrics']
     
-    # Preparar datos para gráficos
-    equity_curve_data = json.dumps(processed_data.get('equity_curve', []))
-    symbols_data = json.dumps(processed_data.get('symbol_performance', [])[:5])  # Top 5 símbolos
-    buysell_data = json.dumps(processed_data.get('buysell_performance', []))
+    # Preparar datos para gráficos (curva de equidad submuestreada con LTTB);
+    # sin filtros se usa el JSON generado al procesar los datos
+    equity_series = data['equity_series']
+    equity_curve_data = chart_json(
+        processed_data, 'dashboard.equity',
+        lambda: equity_chart_points(equity_series, Config.EQUITY_CHART_POINTS), filtered
+    )
+    symbols_data = chart_json(  # Top 5 símbolos
+        processed_data, 'dashboard.symbols', lambda: top_k(data['symbol_performance'], 'totalPL', 5), filtered
+    )
+    buysell_data = chart_json(processed_data, 'dashboard.buysell', lambda: data['buysell_performance'], filtered)
     
-    return render_template(
+    return with_etag(render_template(
         'dashboard.html', 
         metrics=metrics, 
         equity_curve_data=equity_curve_data,
+        equity_total_points=len(equity_series['equity']),
         symbols_data=symbols_data,
         buysell_data=buysell_data,
+        filter_symbols=order_index_of(processed_data).symbols(),
         processed_data=processed_data,
         sidebar_items=AddonRegistry.get_sidebar_items()
-    )
+    ), etag)
+
+@main_bp.route('/dashboard/equity')
+def equity_curve():
+    """Devuelve en JSON un tramo de la curva de equidad (para ampliar el gráfico)"""
+    processed_data = current_processed_data(Config.DATA_CACHE_PATH)
+    
+    if processed_data is None:
+        return jsonify({'points': [], 'total': 0}), 404
+    
+    # Tramo de operaciones [start, end] y número máximo de puntos
+    start = request.args.get('start', type=int)
+    end = request.args.get('end', type=int)
+    points = request.args.get('points', Config.EQUITY_CHART_POINTS, type=int)
+    points = max(3, min(points, Config.EQUITY_MAX_POINTS))
+    
+    equity_series = dashboard_data(processed_data, query_filters(request.args))['equity_series']
+    
+    return jsonify({
+        'points': equity_chart_points(equity_series, points, start, end),
+        'total': len(equity_series['equity'])
+    })
+
+@main_bp.route('/chart-data/<name>')
+def chart_data(name):
+    """Devuelve el JSON pre-serializado (sin filtros) de un gráfico, con ETag y gzip"""
+    processed_data = current_processed_data(Config.DATA_CACHE_PATH)
+    payload = chart_payload(processed_data, name) if processed_data is not None else None
+    
+    if payload is None:
+        return jsonify({'error': f'No hay datos pre-serializados para {name}'}), 404
+    
+    # Cada codificación es una representación distinta con su propio ETag
+    compressed = payload['gzip'] is not None and 'gzip' in request.accept_encodings
+    etag = payload['etag'] + ('-gzip' if compressed else '')
+    response = not_modified(etag)
+    if response is None:
+        response = Response(payload['gzip'] if compressed else payload['json'], mimetype='application/json')
+        if compressed:
+            response.headers['Content-Encoding'] = 'gzip'
+        response = with_etag(response, etag)
+    response.vary.add('Accept-Encoding')
+    return response
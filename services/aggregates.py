@@ -0,0 +1,390 @@
+"""
+Acumuladores combinables de métricas de rendimiento
+
+Un PerformanceAccumulator recibe lotes de órdenes procesadas y mantiene
+agregados parciales (totales, ganadoras/perdedoras, buckets por símbolo,
+hora y tipo, incrementos de la curva de equidad y sketches de distribución
+de services.distributions). Dos acumuladores se
+pueden combinar con merge(), lo que permite procesar los datos por trozos
+y obtener al final el mismo diccionario de resultados que el proceso
+completo.
+"""
+import numpy as np
+import pandas as pd
+
+from services.distributions import DistributionSketches
+from services.equity import build_equity_series, concat_equity_series, drawdown_series, equity_series_of
+from services.processed_orders import as_processed_orders, to_native
+from services.timestamps import NAT, chronological_order, order_timestamps
+
+# Etiquetas de los tipos de operación en buysell_performance
+SIDE_LABELS = (('B', 'Compras'), ('S', 'Ventas'))
+
+# Campos de cada incremento de la curva de equidad
+EQUITY_FIELDS = ('timestamp', 'time', 'date', 'symbol', 'pnl')
+
+
+def empty_metrics():
+    """Devuelve el diccionario de métricas vacío"""
+    return {
+        'totalPL': 0,
+        'winRate': 0,
+        'profitFactor': 0,
+        'avgWin': 0,
+        'avgLoss': 0,
+        'maxDrawdown': 0,
+        'totalTrades': 0,
+        'winningTrades': 0,
+        'losingTrades': 0
+    }
+
+
+class PerformanceAccumulator:
+    """Agregados parciales y combinables del rendimiento de un conjunto de órdenes"""
+
+    def __init__(self, distributions=True):
+        """
+        Args:
+            distributions (bool, optional): Mantener los sketches de distribución;
+                con False solo se calculan las métricas, los buckets y la curva de
+                equidad (p. ej. para responder a una consulta con filtros)
+        """
+        self.total_trades = 0
+        self.winning_trades = 0
+        self.total_pl = 0.0
+        self.total_gain = 0.0
+        self.total_loss = 0.0
+
+        # Clave -> [totalPL, totalTrades, winningTrades]
+        self.by_symbol = {}
+        self.by_hour = {}
+        self.by_side = {}
+
+        # Incrementos de la curva de equidad (un dict de arrays por lote)
+        self._equity_parts = []
+
+        # Final de la curva de equidad del último resultado generado
+        self.equity_state = None
+
+        # Distribuciones de P&L, cantidad y comisión (total, por símbolo y por trader)
+        self.distributions = DistributionSketches() if distributions else None
+
+    def __setstate__(self, state):
+        # Acumuladores guardados antes de existir las distribuciones
+        state.setdefault('distributions', None)
+        self.__dict__.update(state)
+
+    def update(self, orders, sequence=None):
+        """
+        Incorpora un lote de órdenes procesadas
+
+        Es el núcleo de agregación: ordena el lote una sola vez por tiempo y
+        en una pasada sobre los arrays obtiene los totales, los buckets por
+        símbolo, hora y tipo (np.bincount sobre códigos enteros) y el tramo
+        ya ordenado de la curva de equidad.
+
+        Args:
+            orders (ProcessedOrders or list): Órdenes procesadas del lote
+            sequence (ndarray, optional): Posición global de cada orden; si todos
+                los lotes la indican, desempata las órdenes con el mismo
+                timestamp al combinar lotes de particiones no consecutivas
+
+        Returns:
+            PerformanceAccumulator: El propio acumulador (para encadenar)
+        """
+        orders = as_processed_orders(orders)
+        if not len(orders):
+            return self
+
+        timestamps = order_timestamps(orders)
+        order = chronological_order(timestamps)
+
+        pnl = orders.column('pnl').astype(float)[order]
+        wins = pnl > 0
+
+        self.total_trades += len(pnl)
+        self.winning_trades += int(wins.sum())
+        self.total_pl += float(pnl.sum())
+        self.total_gain += float(pnl[wins].sum())
+        self.total_loss += float(-pnl[~wins].sum())
+
+        symbols = orders.categorical('symb')[order]
+        _update_buckets(self.by_symbol, symbols, pnl, wins)
+        _update_buckets(self.by_hour, orders.column('hour')[order], pnl, wins)
+        _update_buckets(self.by_side, orders.categorical('B/S')[order], pnl, wins)
+
+        if self.distributions is not None:
+            self.distributions.update(orders)
+
+        part = {
+            'timestamp': timestamps[order],
+            'time': orders.column('time')[order],
+            'date': orders.column('date')[order],
+            'symbol': np.asarray(symbols, dtype=object),
+            'pnl': pnl
+        }
+        if sequence is not None:
+            part['sequence'] = np.asarray(sequence)[order]
+        self._equity_parts.append(part)
+        return self
+
+    def merge(self, other):
+        """
+        Combina otro acumulador en este
+
+        Args:
+            other (PerformanceAccumulator): Acumulador con agregados parciales
+
+        Returns:
+            PerformanceAccumulator: El propio acumulador (para encadenar)
+        """
+        self.total_trades += other.total_trades
+        self.winning_trades += other.winning_trades
+        self.total_pl += other.total_pl
+        self.total_gain += other.total_gain
+        self.total_loss += other.total_loss
+
+        for target, source in ((self.by_symbol, other.by_symbol),
+                               (self.by_hour, other.by_hour),
+                               (self.by_side, other.by_side)):
+            for key, stats in source.items():
+                bucket = target.setdefault(key, [0.0, 0, 0])
+                bucket[0] += stats[0]
+                bucket[1] += stats[1]
+                bucket[2] += stats[2]
+
+        if self.distributions is not None and other.distributions is not None:
+            self.distributions.merge(other.distributions)
+        else:
+            # Sin distribuciones en alguno de los dos: se recalculan desde las órdenes
+            self.distributions = None
+
+        self._equity_parts.extend(other._equity_parts)
+        return self
+
+    def equity_increments(self):
+        """
+        Devuelve los incrementos de equidad ordenados por tiempo
+
+        Returns:
+            dict: Arrays 'timestamp', 'time', 'date', 'symbol' y 'pnl' en orden cronológico
+        """
+        if not self._equity_parts:
+            return {key: np.array([]) for key in EQUITY_FIELDS}
+        if len(self._equity_parts) == 1:
+            # Cada lote se guarda ya ordenado
+            return {key: self._equity_parts[0][key] for key in EQUITY_FIELDS}
+
+        merged = {
+            key: np.concatenate([part[key] for part in self._equity_parts])
+            for key in EQUITY_FIELDS
+        }
+        if all('sequence' in part for part in self._equity_parts):
+            sequence = np.concatenate([part['sequence'] for part in self._equity_parts])
+            order = np.lexsort((sequence, merged['timestamp'].astype(np.int64)))
+        else:
+            order = chronological_order(merged['timestamp'])
+        return {key: values[order] for key, values in merged.items()}
+
+    def to_result(self, equity_curve=True):
+        """
+        Genera los agregados finales con el formato de process_trading_data
+
+        También guarda en equity_state el final de la curva de equidad para
+        poder añadir después nuevas órdenes con append().
+
+        Args:
+            equity_curve (bool, optional): Generar también equity_curve (un
+                diccionario por orden); con False solo se genera equity_series
+
+        Returns:
+            dict: metrics, symbol_performance, time_performance,
+                  buysell_performance, equity_curve y equity_series
+        """
+        increments = self.equity_increments()
+        equity = np.cumsum(increments['pnl'])
+        self.equity_state = _extend_equity_state(None, increments['timestamp'], equity)
+
+        result = self._summary()
+        if equity_curve:
+            result['equity_curve'] = _equity_entries(increments, equity, 0)
+        result['equity_series'] = build_equity_series(increments, equity)
+        return result
+
+    def append(self, other, result):
+        """
+        Añade a un resultado ya generado las órdenes de otro acumulador
+
+        Solo es posible si todas las órdenes nuevas son posteriores a la última
+        orden existente; en ese caso el coste es proporcional al número de
+        órdenes nuevas: la curva de equidad se extiende (en el sitio) y el
+        drawdown máximo se actualiza a partir del pico y la equidad finales.
+
+        Args:
+            other (PerformanceAccumulator): Agregados de las órdenes nuevas
+            result (dict): Resultado generado previamente con to_result()/append()
+
+        Returns:
+            dict or None: Resultado actualizado, o None si las órdenes nuevas no son
+                          posteriores a las existentes (hay que recalcular todo)
+        """
+        increments = other.equity_increments()
+        state = self.equity_state
+
+        if state is None:
+            return None
+        if len(increments['timestamp']) and increments['timestamp'][0] < state['last_timestamp']:
+            return None
+
+        equity = state['equity'] + np.cumsum(increments['pnl'])
+        start_number = state['count']
+        equity_series = concat_equity_series(
+            equity_series_of(result), build_equity_series(increments, equity, state['peak'])
+        )
+
+        self.merge(other)
+        self.equity_state = _extend_equity_state(state, increments['timestamp'], equity)
+        self.compact()
+
+        updated = self._summary()
+        equity_curve = result.get('equity_curve', [])
+        equity_curve.extend(_equity_entries(increments, equity, start_number))
+        updated['equity_curve'] = equity_curve
+        updated['equity_series'] = equity_series
+        return updated
+
+    def compact(self):
+        """
+        Descarta los incrementos de equidad ya volcados en el resultado
+
+        Deja el acumulador listo para guardarse junto a los datos procesados
+        ocupando solo los totales y los buckets.
+
+        Returns:
+            PerformanceAccumulator: El propio acumulador
+        """
+        self._equity_parts = []
+        return self
+
+    def _summary(self):
+        """Métricas y análisis por símbolo, hora y tipo"""
+        return {
+            'metrics': self._metrics(),
+            'symbol_performance': sorted(
+                _bucket_stats(self.by_symbol, 'symbol'), key=lambda x: x['totalPL'], reverse=True
+            ),
+            'time_performance': sorted(_bucket_stats(self.by_hour, 'hour'), key=lambda x: x['hour']),
+            'buysell_performance': self._buysell()
+        }
+
+    def _metrics(self):
+        """Calcula el diccionario de métricas a partir de los totales"""
+        if self.total_trades == 0:
+            return empty_metrics()
+
+        losing_trades = self.total_trades - self.winning_trades
+        total_gain = self.total_gain
+        total_loss = abs(self.total_loss)
+
+        return {
+            'totalPL': self.total_pl,
+            'winRate': self.winning_trades / self.total_trades * 100,
+            'profitFactor': (total_gain / total_loss) if total_loss > 0 else total_gain,
+            'avgWin': (total_gain / self.winning_trades) if self.winning_trades > 0 else 0,
+            'avgLoss': (total_loss / losing_trades) if losing_trades > 0 else 0,
+            'maxDrawdown': self.equity_state['max_drawdown'] if self.equity_state else 0,
+            'totalTrades': self.total_trades,
+            'winningTrades': self.winning_trades,
+            'losingTrades': losing_trades
+        }
+
+    def _buysell(self):
+        """Genera buysell_performance a partir de los buckets por tipo"""
+        result = []
+        for side, label in SIDE_LABELS:
+            total_pl, total_trades, winning_trades = self.by_side.get(side, [0, 0, 0])
+            result.append({
+                'type': label,
+                'totalPL': total_pl,
+                'totalTrades': total_trades,
+                'winRate': (winning_trades / total_trades * 100) if total_trades > 0 else 0
+            })
+        return result
+
+
+def _update_buckets(buckets, keys, pnl, wins):
+    """
+    Suma P&L, número de operaciones y ganadoras por clave
+
+    Las claves se factorizan a códigos enteros (sin recodificar si ya son
+    category) y las sumas se obtienen con np.bincount. Las claves nuevas se
+    añaden en orden de aparición; las ausentes (NaN) se agrupan bajo np.nan.
+    """
+    codes, uniques = pd.factorize(keys)
+    labels = [np.nan] + list(uniques)
+    codes = codes + 1
+
+    size = len(labels)
+    pnl_sums = np.bincount(codes, weights=pnl, minlength=size)
+    trade_counts = np.bincount(codes, minlength=size)
+    win_counts = np.bincount(codes, weights=wins, minlength=size)
+
+    for index in list(range(1, size)) + [0]:
+        if trade_counts[index] == 0:
+            continue
+        bucket = buckets.setdefault(to_native(labels[index]), [0.0, 0, 0])
+        bucket[0] += float(pnl_sums[index])
+        bucket[1] += int(trade_counts[index])
+        bucket[2] += int(win_counts[index])
+
+
+def _bucket_stats(buckets, key_name):
+    """Convierte los buckets en la lista de estadísticas de la vista"""
+    return [
+        {
+            key_name: key,
+            'totalPL': total_pl,
+            'totalTrades': total_trades,
+            'winRate': (winning_trades / total_trades * 100) if total_trades > 0 else 0
+        }
+        for key, (total_pl, total_trades, winning_trades) in buckets.items()
+    ]
+
+
+def _extend_equity_state(state, timestamps, equity):
+    """
+    Actualiza el estado final de la curva de equidad con un nuevo tramo
+
+    El pico parte de 0 igual que en el cálculo del drawdown por órdenes.
+    """
+    state = dict(state or {'last_timestamp': NAT, 'equity': 0.0, 'peak': 0.0, 'max_drawdown': 0, 'count': 0})
+    if not len(equity):
+        return state
+
+    drawdown, peak = drawdown_series(equity, state['peak'])
+    state.update({
+        'last_timestamp': int(timestamps[-1]),
+        'equity': float(equity[-1]),
+        'peak': float(peak[-1]),
+        'max_drawdown': max(state['max_drawdown'], float(drawdown.max())),
+        'count': state['count'] + len(equity)
+    })
+    return state
+
+
+def _equity_entries(increments, equity, start_number):
+    """Genera las entradas de equity_curve de un tramo de incrementos"""
+    return [
+        {
+            'tradeNumber': start_number + i + 1,
+            'time': time,
+            'date': date,
+            'symbol': symbol,
+            'pnl': pnl,
+            'equity': running_pl
+        }
+        for i, (time, date, symbol, pnl, running_pl) in enumerate(zip(
+            increments['time'].tolist(), increments['date'].tolist(),
+            increments['symbol'].tolist(), increments['pnl'].tolist(), equity.tolist()
+        ))
+    ]
@@ -0,0 +1,210 @@
+"""
+Análisis de rendimiento agrupado por cualquier dimensión de las órdenes
+
+group_performance() agrupa las órdenes procesadas por una o varias
+dimensiones y calcula en forma vectorizada (códigos enteros + np.bincount)
+el P&L, número de operaciones, ganadoras/perdedoras, win rate, P&L medio,
+comisiones y profit factor de cada grupo.
+
+Una dimensión puede ser cualquier columna de las órdenes procesadas
+('Trader', 'Account', 'route', 'Market', 'SHORT', 'hour', 'date'...) o una
+de las claves derivadas de DERIVED_DIMENSIONS ('symbol', 'side', 'weekday').
+Para añadir una dimensión derivada basta con registrar en ese diccionario
+una función que reciba las órdenes y devuelva un array o pd.Categorical.
+"""
+import numpy as np
+import pandas as pd
+
+from services.processed_orders import as_processed_orders, to_native
+from services.timestamps import order_timestamps, weekdays_of
+
+
+def _weekday_key(orders):
+    """Día de la semana (0 = lunes); las fechas no válidas quedan como ausentes"""
+    return pd.Categorical.from_codes(weekdays_of(order_timestamps(orders)), categories=range(7))
+
+
+# Claves derivadas: nombre -> función(órdenes) -> array o pd.Categorical
+DERIVED_DIMENSIONS = {
+    'symbol': lambda orders: orders.categorical('symb'),
+    'side': lambda orders: orders.categorical('B/S'),
+    'weekday': _weekday_key
+}
+
+
+def dimension_values(orders, name):
+    """
+    Valores de una dimensión para cada orden
+
+    Args:
+        orders (ProcessedOrders): Órdenes procesadas
+        name (str): Columna de las órdenes o clave de DERIVED_DIMENSIONS
+
+    Returns:
+        ndarray or Categorical: Un valor por orden
+    """
+    if name in DERIVED_DIMENSIONS:
+        return DERIVED_DIMENSIONS[name](orders)
+    if name not in orders.columns:
+        raise ValueError(f"Dimensión desconocida: '{name}'")
+    return orders.categorical(name)
+
+
+def group_performance(orders, dimensions, filters=None, dropna=True, date_from=None, date_to=None):
+    """
+    Calcula el rendimiento de las órdenes agrupadas por una o varias dimensiones
+
+    Args:
+        orders (ProcessedOrders or list): Órdenes procesadas
+        dimensions (str or list): Dimensión o lista de dimensiones (combinación de claves)
+        filters (dict, optional): Dimensión -> valor o lista de valores permitidos
+        dropna (bool, optional): Descartar las órdenes con alguna clave ausente;
+            si es False se agrupan bajo NaN
+        date_from (str, optional): Primera fecha incluida ('YYYY-MM-DD')
+        date_to (str, optional): Última fecha incluida ('YYYY-MM-DD')
+
+    Returns:
+        list: Un diccionario por grupo (en orden de aparición) con las claves de
+              cada dimensión y totalPL, totalTrades, winningTrades, losingTrades,
+              winRate, avgPL, grossProfit, grossLoss, profitFactor,
+              totalCommission y totalRouteFee
+    """
+    orders = as_processed_orders(orders)
+    dimensions = [dimensions] if isinstance(dimensions, str) else list(dimensions)
+    if not len(orders):
+        return []
+
+    mask = np.ones(len(orders), dtype=bool)
+    for name, allowed in (filters or {}).items():
+        mask &= _filter_mask(dimension_values(orders, name), allowed)
+    if date_from or date_to:
+        mask &= _date_mask(dimension_values(orders, 'date'), date_from, date_to)
+
+    codes_list, labels = [], []
+    for name in dimensions:
+        codes, uniques = pd.factorize(dimension_values(orders, name))
+        if dropna:
+            mask &= codes >= 0
+        codes_list.append(codes)
+        labels.append([to_native(value) for value in uniques] + [np.nan])
+
+    group_codes, key_codes, size = combine_codes(
+        [codes[mask] for codes in codes_list], [len(values) - 1 for values in labels], int(mask.sum())
+    )
+    if size == 0:
+        return []
+
+    pnl = orders.column('pnl').astype(float)[mask]
+    wins = pnl > 0
+
+    def group_sum(weights=None):
+        return np.bincount(group_codes, weights=weights, minlength=size)
+
+    totals = {
+        'totalPL': group_sum(pnl),
+        'totalTrades': group_sum(),
+        'winningTrades': group_sum(wins),
+        'grossProfit': group_sum(np.where(wins, pnl, 0.0)),
+        'grossLoss': -group_sum(np.where(wins, 0.0, pnl)),
+        'totalCommission': group_sum(_optional_column(orders, 'totalCommission')[mask]),
+        'totalRouteFee': group_sum(_optional_column(orders, 'totalRouteFee')[mask])
+    }
+
+    result = []
+    for index in range(size):
+        row = {name: labels[d][key_codes[d][index]] for d, name in enumerate(dimensions)}
+        row.update(performance_stats({field: values[index] for field, values in totals.items()}))
+        result.append(row)
+    return result
+
+
+def combine_codes(codes_list, sizes, length):
+    """
+    Combina los códigos enteros de varias claves en un código de grupo
+
+    Cada clave se trata como un dígito en base (número de valores + 1); el
+    valor size (o -1) representa la clave ausente.
+
+    Args:
+        codes_list (list): Un array de códigos por clave (misma longitud)
+        sizes (list): Número de valores distintos de cada clave
+        length (int): Número de filas (sin claves, todas forman un único grupo)
+
+    Returns:
+        tuple: (código de grupo de cada fila en orden de aparición,
+                lista con el código de cada clave para cada grupo,
+                número de grupos)
+    """
+    combined = np.zeros(length, dtype=np.int64)
+    for codes, size in zip(codes_list, sizes):
+        combined = combined * (size + 1) + np.where(codes < 0, size, codes)
+
+    group_codes, group_keys = pd.factorize(combined)
+    return group_codes, _split_codes(group_keys, [size + 1 for size in sizes]), len(group_keys)
+
+
+def _filter_mask(values, allowed):
+    """Máscara de las órdenes cuyo valor está entre los permitidos"""
+    if not isinstance(allowed, (list, tuple, set, frozenset, np.ndarray)):
+        allowed = [allowed]
+    return pd.Series(values).isin(list(allowed)).to_numpy()
+
+
+def _date_mask(values, date_from, date_to):
+    """Máscara de las órdenes con fecha dentro del rango (las fechas ausentes quedan fuera)"""
+    dates = pd.Series(values, dtype=object)
+    mask = dates.notna().to_numpy()
+    dates = dates.astype(str).to_numpy()
+    if date_from:
+        mask &= dates >= date_from
+    if date_to:
+        mask &= dates <= date_to
+    return mask & (dates != '')
+
+
+def _optional_column(orders, name):
+    """Columna numérica de las órdenes o ceros si no existe"""
+    if name not in orders.columns:
+        return np.zeros(len(orders))
+    return orders.column(name).astype(float)
+
+
+def _split_codes(group_keys, radices):
+    """Separa los códigos combinados en el código de cada dimensión"""
+    remaining = np.asarray(group_keys, dtype=np.int64)
+    codes = []
+    for radix in reversed(radices):
+        remaining, code = np.divmod(remaining, radix)
+        codes.append(code.tolist())
+    return codes[::-1]
+
+
+def performance_stats(totals):
+    """
+    Estadísticas de rendimiento a partir de las sumas de un grupo
+
+    Args:
+        totals (dict): totalPL, totalTrades, winningTrades, grossProfit,
+            grossLoss, totalCommission y totalRouteFee
+
+    Returns:
+        dict: Sumas y estadísticas derivadas (winRate, avgPL, profitFactor...)
+    """
+    total_trades = int(totals['totalTrades'])
+    winning_trades = int(totals['winningTrades'])
+    gross_profit = float(totals['grossProfit'])
+    gross_loss = float(totals['grossLoss'])
+
+    return {
+        'totalPL': float(totals['totalPL']),
+        'totalTrades': total_trades,
+        'winningTrades': winning_trades,
+        'losingTrades': total_trades - winning_trades,
+        'winRate': (winning_trades / total_trades * 100) if total_trades > 0 else 0,
+        'avgPL': float(totals['totalPL']) / total_trades if total_trades > 0 else 0,
+        'grossProfit': gross_profit,
+        'grossLoss': gross_loss,
+        'profitFactor': (gross_profit / gross_loss) if gross_loss > 0 else gross_profit,
+        'totalCommission': float(totals['totalCommission']),
+        'totalRouteFee': float(totals['totalRouteFee'])
+    }
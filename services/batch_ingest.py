@@ -0,0 +1,142 @@
+"""
+Ingesta en paralelo de un directorio de exportaciones diarias
+
+DAS Trader genera un trío Orders/Trades/Tickets por día de trading. Este
+módulo descubre los tríos de un directorio, procesa cada día en un proceso
+de un ProcessPoolExecutor y combina los resultados parciales (acumuladores
+de métricas y órdenes procesadas) en un único conjunto de datos.
+
+Se reconocen dos organizaciones del directorio:
+
+- Archivos con el día en el nombre: Orders_2025-03-25.csv, Trades_2025-03-25.csv...
+- Un subdirectorio por día: 2025-03-25/Orders.csv, 2025-03-25/Trades.csv...
+"""
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from services.aggregates import PerformanceAccumulator
+from services.cube import PerformanceCube
+from services.data_processor import _get_empty_result
+from services.engines import get_engine
+from services.file_handler import get_files_in_directory
+from services.order_index import OrderIndex
+from services.positions import RoundTripBook
+from services.processed_orders import ProcessedOrders
+
+# Nombre de archivo: tipo de exportación seguido (opcionalmente) de la clave del día
+_EXPORT_FILE_PATTERN = re.compile(r'^(?P<kind>orders|trades|tickets)[\s_\-]*(?P<day>.*)$', re.IGNORECASE)
+
+
+def discover_export_sets(directory):
+    """
+    Descubre los conjuntos de exportación (uno por día) de un directorio
+
+    Args:
+        directory (str): Directorio con las exportaciones
+
+    Returns:
+        list: Diccionarios {'day', 'orders', 'trades', 'tickets'} ordenados por día;
+              solo se incluyen los días con Orders y Trades ('tickets' puede ser None)
+    """
+    if not os.path.isdir(directory):
+        return []
+
+    sets = {}
+    _collect_export_files(get_files_in_directory(directory), '', sets)
+
+    for entry in sorted(os.scandir(directory), key=lambda e: e.name):
+        if entry.is_dir():
+            _collect_export_files(get_files_in_directory(entry.path), entry.name, sets)
+
+    return [
+        {
+            'day': day,
+            'orders': files['orders'],
+            'trades': files['trades'],
+            'tickets': files.get('tickets')
+        }
+        for day, files in sorted(sets.items())
+        if 'orders' in files and 'trades' in files
+    ]
+
+
+def _collect_export_files(paths, prefix, sets):
+    """Clasifica los CSV por día y tipo de exportación"""
+    for path in paths:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        match = _EXPORT_FILE_PATTERN.match(stem)
+        if not match:
+            continue
+
+        day = '_'.join(part for part in (prefix, match.group('day')) if part)
+        sets.setdefault(day, {})[match.group('kind').lower()] = path
+
+
+def process_export_set(export_set, engine=None):
+    """
+    Procesa un único día (se ejecuta en un proceso del pool)
+
+    Args:
+        export_set (dict): Conjunto devuelto por discover_export_sets
+        engine (str, optional): Motor usado para la ingesta y la unión
+
+    Returns:
+        tuple: (día, PerformanceAccumulator, ProcessedOrders)
+    """
+    processing_engine = get_engine(engine)
+    frames = processing_engine.ingest(export_set['orders'], export_set['trades'], export_set.get('tickets'))
+    processed_orders = ProcessedOrders.from_records(processing_engine.join(*frames))
+    return export_set['day'], PerformanceAccumulator().update(processed_orders), processed_orders
+
+
+def process_export_directory(directory, max_workers=None, engine=None):
+    """
+    Procesa en paralelo todos los días de un directorio de exportaciones
+
+    Args:
+        directory (str): Directorio con las exportaciones
+        max_workers (int, optional): Número de procesos; por defecto os.cpu_count()
+        engine (str, optional): Motor usado para la ingesta y la unión
+
+    Returns:
+        dict: Mismo formato que process_trading_data
+    """
+    try:
+        export_sets = discover_export_sets(directory)
+        if not export_sets:
+            print(f"[INFO] No se encontraron exportaciones en: {directory}")
+            return _get_empty_result()
+
+        partials = _run_export_sets(export_sets, max_workers, engine)
+
+        # Reducir en orden de día para que el resultado sea determinista
+        accumulator = PerformanceAccumulator()
+        parts = []
+        for _, day_accumulator, processed_orders in sorted(partials, key=lambda partial: partial[0]):
+            accumulator.merge(day_accumulator)
+            parts.append(processed_orders)
+
+        result = accumulator.to_result()
+        result['processed_orders'] = ProcessedOrders.concat(parts)
+        result['aggregate_state'] = accumulator.compact()
+        result['performance_cube'] = PerformanceCube.from_orders(result['processed_orders'])
+        result['order_index'] = OrderIndex.from_orders(result['processed_orders'])
+        result['round_trips'] = RoundTripBook.from_orders(result['processed_orders'])
+        print(f"[INFO] Procesados {len(export_sets)} días de exportaciones desde: {directory}")
+        return result
+
+    except Exception as e:
+        print(f"Error procesando directorio de exportaciones: {e}")
+        return _get_empty_result()
+
+
+def _run_export_sets(export_sets, max_workers, engine):
+    """Ejecuta process_export_set para cada día, en paralelo si hay más de uno"""
+    max_workers = max_workers or os.cpu_count() or 1
+
+    if len(export_sets) == 1 or max_workers == 1:
+        return [process_export_set(export_set, engine) for export_set in export_sets]
+
+    with ProcessPoolExecutor(max_workers=min(max_workers, len(export_sets))) as executor:
+        return list(executor.map(process_export_set, export_sets, [engine] * len(export_sets)))
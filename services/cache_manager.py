@@ -1,42 +1,358 @@
+"""
+Caché de datos procesados
+
+save_processed_data / load_processed_data guardan y cargan el conjunto de
+datos activo (Config.DATA_CACHE_PATH), que es el que leen las vistas. Se
+guarda en el formato mapeable de services.mapped_dataset, por secciones que
+se cargan al usarlas y con arrays compartidos entre todos los procesos que
+lo cargan.
+
+Además, los resultados de procesar unas exportaciones se guardan en una
+caché direccionada por contenido (Config.PROCESSING_CACHE_FOLDER): la clave
+es el SHA-256 del contenido de los tres CSV junto con el motor y la versión
+del formato de los datos procesados (CACHE_SCHEMA_VERSION). Si se vuelve a
+procesar una exportación ya vista, el resultado guardado se enlaza como
+conjunto activo sin volver a ejecutar el pipeline ni deserializarlo.
+
+Un índice JSON guarda, por entrada, la versión, el motor, el tamaño y la
+fecha de último uso, y por archivo de origen su tamaño, mtime y SHA-256 (el
+contenido solo se vuelve a leer si cambian el tamaño o el mtime). Las
+entradas de otra versión, con el archivo ausente o de otro tamaño se
+eliminan sin deserializarlas, y se conservan como mucho max_entries
+entradas (se eliminan las usadas hace más tiempo).
+
+Las vistas no deserializan el conjunto activo en cada petición: lo leen de
+processed_data_cache (current_processed_data), que lo conserva en memoria
+del proceso y solo lo vuelve a cargar cuando cambia el archivo (inodo,
+tamaño o mtime) y lo mapea en memoria en lugar de copiarlo. Como
+save_processed_data y restore_cached_result sustituyen el archivo de forma
+atómica, cualquier cambio produce un sello distinto y se pasa a mapear el
+archivo nuevo; las vistas que todavía usan el anterior lo conservan.
+"""
+import hashlib
+import json
 import os
 import pickle
+import shutil
+import tempfile
+import threading
+import time
+
+from services.mapped_dataset import is_mapped_dataset, read_dataset, write_dataset
+from services.snapshot import file_fingerprint
+
+# Versión del formato de los datos procesados; subirla invalida la caché por contenido
+CACHE_SCHEMA_VERSION = 3
+
+_INDEX_FILE = 'index.json'
+
 
 def save_processed_data(data, cache_path):
     """
     Guarda los datos procesados en un archivo de caché
     
+    Se escribe en un archivo temporal que después sustituye al anterior, de
+    modo que un lector nunca ve un archivo a medio escribir y las entradas
+    de la caché por contenido enlazadas al archivo anterior no se modifican.
+    
     Args:
         data (dict): Datos procesados a guardar
         cache_path (str): Ruta del archivo de caché
+    
+    Returns:
+        bool: True si se han guardado los datos
     """
     try:
         # Crear directorio si no existe
-        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        directory = os.path.dirname(cache_path)
+        os.makedirs(directory, exist_ok=True)
         
         # Guardar datos en caché
-        with open(cache_path, 'wb') as f:
-            pickle.dump(data, f)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write_dataset(data, f)
+            os.replace(temp_path, cache_path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
         
         print(f"[INFO] Datos guardados en caché: {cache_path}")
+        return True
     except Exception as e:
         print(f"[ERROR] No se pudieron guardar los datos en caché: {e}")
+        return False
 
-def load_processed_data(cache_path):
+def load_processed_data(cache_path, mapped=False):
     """
     Carga los datos procesados desde un archivo de caché
     
     Args:
         cache_path (str): Ruta del archivo de caché
+        mapped (bool, optional): Mapear los arrays en memoria de solo lectura
+            (compartidos entre procesos) y cargar cada sección al usarla, en
+            lugar de leerlo todo
     
     Returns:
-        dict or None: Datos procesados o None si no se pueden cargar
+        dict or MappedDataset or None: Datos procesados o None si no se pueden cargar
     """
     if os.path.exists(cache_path):
         try:
-            with open(cache_path, 'rb') as f:
-                data = pickle.load(f)
+            if is_mapped_dataset(cache_path):
+                data = read_dataset(cache_path, mapped=mapped)
+            else:
+                # Cachés guardadas con pickle antes del formato mapeable
+                with open(cache_path, 'rb') as f:
+                    data = pickle.load(f)
             print(f"[INFO] Datos cargados desde caché: {cache_path}")
             return data
         except Exception as e:
             print(f"[ERROR] No se pudieron cargar datos desde caché: {e}")
     return None
+
+class ProcessedDataCache:
+    """
+    Conjunto de datos activo en memoria del proceso
+    
+    Cada acceso hace un único os.stat del archivo y compara su sello (inodo,
+    tamaño y mtime) con el de los datos en memoria; solo se vuelve a cargar
+    (mapeado) si el archivo ha cambiado. Los datos devueltos se comparten
+    entre peticiones y sus arrays son de solo lectura.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._path = None
+        self._stamp = None
+        self._data = None
+    
+    def get(self, cache_path):
+        """
+        Devuelve los datos de cache_path, recargándolos si el archivo ha cambiado
+        
+        Args:
+            cache_path (str): Ruta del archivo de caché
+        
+        Returns:
+            MappedDataset or None: Datos procesados o None si no se pueden cargar
+        """
+        stamp = _file_stamp(cache_path)
+        if stamp is None:
+            self.invalidate()
+            return None
+        
+        with self._lock:
+            if self._path != cache_path or self._stamp != stamp:
+                self._data = load_processed_data(cache_path, mapped=True)
+                self._path = cache_path
+                # Si no se ha podido cargar se reintenta en el siguiente acceso
+                self._stamp = stamp if self._data is not None else None
+            return self._data
+    
+    def invalidate(self):
+        """Descarta los datos en memoria"""
+        with self._lock:
+            self._path = None
+            self._stamp = None
+            self._data = None
+    
+    @property
+    def data(self):
+        """Datos en memoria (sin revalidar)"""
+        return self._data
+    
+    @property
+    def generation(self):
+        """Identificador de la versión de los datos en memoria (None si no hay datos)"""
+        stamp = self._stamp
+        if stamp is None:
+            return None
+        return '-'.join(format(value, 'x') for value in stamp)
+
+# Instancia compartida por todas las vistas del proceso
+processed_data_cache = ProcessedDataCache()
+
+def current_processed_data(cache_path):
+    """
+    Datos procesados activos, desde la memoria del proceso si el archivo no ha cambiado
+    
+    Args:
+        cache_path (str): Ruta del archivo de caché
+    
+    Returns:
+        MappedDataset or None: Datos procesados o None si no hay datos
+    """
+    return processed_data_cache.get(cache_path)
+
+def processing_cache_key(paths, engine, cache_dir):
+    """
+    Clave de la caché por contenido para unos archivos de entrada
+    
+    Args:
+        paths (list): Rutas de los CSV de órdenes, trades y tickets
+        engine (str): Motor de procesamiento
+        cache_dir (str): Directorio de la caché (guarda los SHA-256 ya calculados)
+    
+    Returns:
+        str: Clave hexadecimal (SHA-256)
+    """
+    index = _read_index(cache_dir)
+    known = index['files']
+    digests = []
+    
+    for path in paths:
+        if not os.path.exists(path):
+            digests.append(None)
+            continue
+        
+        source = os.path.abspath(path)
+        fingerprint = file_fingerprint(path, with_hash=False)
+        previous = known.get(source)
+        if previous and previous['size'] == fingerprint['size'] and previous['mtime_ns'] == fingerprint['mtime_ns']:
+            fingerprint['sha256'] = previous['sha256']
+        else:
+            fingerprint = file_fingerprint(path)
+            known[source] = fingerprint
+        digests.append(fingerprint['sha256'])
+    
+    _write_index(cache_dir, index)
+    payload = json.dumps({'schema': CACHE_SCHEMA_VERSION, 'engine': engine, 'inputs': digests}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def restore_cached_result(cache_dir, key, cache_path):
+    """
+    Activa el resultado guardado para una clave, si existe y es compatible
+    
+    El archivo de la entrada se enlaza (o copia) como cache_path sin
+    deserializarlo.
+    
+    Args:
+        cache_dir (str): Directorio de la caché por contenido
+        key (str): Clave de processing_cache_key
+        cache_path (str): Ruta del conjunto de datos activo
+    
+    Returns:
+        bool: True si se ha activado una entrada guardada
+    """
+    index = _read_index(cache_dir)
+    _evict_invalid(cache_dir, index)
+    
+    entry = index['entries'].get(key)
+    if entry is None:
+        _write_index(cache_dir, index)
+        return False
+    
+    try:
+        _link_or_copy(_entry_path(cache_dir, key), cache_path)
+    except OSError as e:
+        print(f"[ERROR] No se pudo activar la entrada de caché {key[:12]}: {e}")
+        _evict(cache_dir, index, key)
+        _write_index(cache_dir, index)
+        return False
+    
+    entry['last_used'] = time.time()
+    _write_index(cache_dir, index)
+    print(f"[INFO] Exportación sin cambios: datos procesados recuperados de la caché ({key[:12]})")
+    return True
+
+def store_cached_result(cache_dir, key, cache_path, engine, max_entries):
+    """
+    Guarda el conjunto de datos activo como entrada de la caché por contenido
+    
+    Args:
+        cache_dir (str): Directorio de la caché por contenido
+        key (str): Clave de processing_cache_key
+        cache_path (str): Ruta del conjunto de datos activo (ya guardado)
+        engine (str): Motor con el que se ha procesado
+        max_entries (int): Número máximo de entradas que se conservan
+    """
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        entry_path = _entry_path(cache_dir, key)
+        _link_or_copy(cache_path, entry_path)
+        
+        index = _read_index(cache_dir)
+        now = time.time()
+        index['entries'][key] = {
+            'schema': CACHE_SCHEMA_VERSION,
+            'engine': engine,
+            'size': os.path.getsize(entry_path),
+            'created': now,
+            'last_used': now
+        }
+        
+        # Conservar solo las entradas usadas más recientemente
+        by_use = sorted(index['entries'], key=lambda name: index['entries'][name]['last_used'], reverse=True)
+        for name in by_use[max(int(max_entries), 1):]:
+            _evict(cache_dir, index, name)
+        
+        _write_index(cache_dir, index)
+        print(f"[INFO] Resultado guardado en la caché por contenido ({key[:12]})")
+    except Exception as e:
+        print(f"[ERROR] No se pudo guardar la entrada de caché: {e}")
+
+def _file_stamp(path):
+    """Sello (inodo, tamaño, mtime) de un archivo o None si no existe"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+def _entry_path(cache_dir, key):
+    """Archivo de una entrada de la caché por contenido"""
+    return os.path.join(cache_dir, f'{key}.pkl')
+
+def _evict_invalid(cache_dir, index):
+    """Elimina las entradas de otra versión o cuyo archivo falta o ha cambiado de tamaño"""
+    for key, entry in list(index['entries'].items()):
+        path = _entry_path(cache_dir, key)
+        if entry.get('schema') != CACHE_SCHEMA_VERSION:
+            print(f"[INFO] Entrada de caché incompatible eliminada ({key[:12]})")
+            _evict(cache_dir, index, key)
+        elif not os.path.exists(path) or os.path.getsize(path) != entry.get('size'):
+            print(f"[INFO] Entrada de caché dañada o ausente eliminada ({key[:12]})")
+            _evict(cache_dir, index, key)
+
+def _evict(cache_dir, index, key):
+    """Quita una entrada del índice y borra su archivo"""
+    index['entries'].pop(key, None)
+    try:
+        os.remove(_entry_path(cache_dir, key))
+    except OSError:
+        pass
+
+def _link_or_copy(source, target):
+    """Sustituye target por source de forma atómica (enlace duro o, si no es posible, copia)"""
+    directory = os.path.dirname(target)
+    os.makedirs(directory, exist_ok=True)
+    if os.path.exists(target) and os.path.samefile(source, target):
+        # Ya es el mismo archivo: os.replace no haría nada y dejaría el enlace temporal
+        return
+    temp_path = os.path.join(directory, f'.{os.path.basename(target)}.{os.getpid()}.tmp')
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+    try:
+        os.link(source, temp_path)
+    except OSError:
+        shutil.copyfile(source, temp_path)
+    os.replace(temp_path, target)
+
+def _read_index(cache_dir):
+    """Lee el índice de la caché por contenido (vacío si no existe o no es válido)"""
+    try:
+        with open(os.path.join(cache_dir, _INDEX_FILE), encoding='utf-8') as f:
+            index = json.load(f)
+        if isinstance(index.get('entries'), dict) and isinstance(index.get('files'), dict):
+            return index
+    except (OSError, ValueError):
+        pass
+    return {'entries': {}, 'files': {}}
+
+def _write_index(cache_dir, index):
+    """Escribe el índice de forma atómica"""
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(index, f)
+    os.replace(temp_path, os.path.join(cache_dir, _INDEX_FILE))
@@ -0,0 +1,368 @@
+"""
+Cubo de rendimiento pre-agregado
+
+Durante la ingesta las órdenes procesadas se agregan en un cubo con una
+celda por combinación (fecha, hora, símbolo, trader, tipo) presente en los
+datos. Cada celda guarda medidas aditivas: número de operaciones,
+ganadoras, P&L, ganancias, pérdidas, comisiones, route fees y cantidad.
+
+Las vistas de análisis responden desde el cubo: cualquier filtro o
+desglose por un subconjunto de dimensiones se resuelve sumando celdas, de
+modo que el coste depende del número de celdas y no del de órdenes. Como
+las medidas son aditivas, dos cubos se combinan con merge() (ingesta
+incremental).
+"""
+import numpy as np
+import pandas as pd
+
+from services.aggregates import SIDE_LABELS
+from services.analytics import combine_codes, dimension_values, group_performance, performance_stats
+from services.processed_orders import as_processed_orders, to_native
+from services.timestamps import weekdays_of
+
+# Dimensiones del cubo (mismos nombres que en services.analytics)
+CUBE_DIMENSIONS = ('date', 'hour', 'symbol', 'Trader', 'side')
+
+# Medidas aditivas de cada celda
+CUBE_MEASURES = ('totalTrades', 'winningTrades', 'totalPL', 'grossProfit', 'grossLoss',
+                 'totalCommission', 'totalRouteFee', 'totalQty')
+
+
+class PerformanceCube:
+    """Medidas aditivas agregadas por fecha, hora, símbolo, trader y tipo"""
+
+    def __init__(self, labels, codes, measures):
+        """
+        Args:
+            labels (dict): Dimensión -> array con los valores distintos
+            codes (dict): Dimensión -> código (índice en labels, -1 = ausente) de cada celda
+            measures (dict): Medida -> array con el valor de cada celda
+        """
+        self.labels = labels
+        self.codes = codes
+        self.measures = measures
+
+    @classmethod
+    def empty(cls):
+        """Cubo sin celdas"""
+        return cls(
+            {name: np.array([], dtype=object) for name in CUBE_DIMENSIONS},
+            {name: np.array([], dtype=np.int32) for name in CUBE_DIMENSIONS},
+            {name: np.array([], dtype=float) for name in CUBE_MEASURES}
+        )
+
+    @classmethod
+    def from_orders(cls, orders):
+        """
+        Construye el cubo a partir de las órdenes procesadas
+
+        Args:
+            orders (ProcessedOrders or list): Órdenes procesadas
+
+        Returns:
+            PerformanceCube: Cubo con una celda por combinación presente
+        """
+        orders = as_processed_orders(orders)
+        if not len(orders):
+            return cls.empty()
+
+        pnl = orders.column('pnl').astype(float)
+        wins = pnl > 0
+        weights = {
+            'totalTrades': np.ones(len(orders)),
+            'winningTrades': wins.astype(float),
+            'totalPL': pnl,
+            'grossProfit': np.where(wins, pnl, 0.0),
+            'grossLoss': np.where(wins, 0.0, -pnl),
+            'totalCommission': _numeric_column(orders, 'totalCommission'),
+            'totalRouteFee': _numeric_column(orders, 'totalRouteFee'),
+            'totalQty': _numeric_column(orders, 'totalQty')
+        }
+        keys = {name: dimension_values(orders, name) for name in CUBE_DIMENSIONS}
+        return cls._aggregate(keys, weights)
+
+    @classmethod
+    def _aggregate(cls, keys, weights):
+        """Agrupa filas (órdenes o celdas) por todas las dimensiones y suma las medidas"""
+        labels, row_codes = {}, []
+        for name in CUBE_DIMENSIONS:
+            codes, uniques = pd.factorize(keys[name])
+            labels[name] = np.array([to_native(value) for value in uniques], dtype=object)
+            row_codes.append(codes)
+
+        length = len(row_codes[0])
+        group_codes, key_codes, size = combine_codes(
+            row_codes, [len(labels[name]) for name in CUBE_DIMENSIONS], length
+        )
+
+        codes = {
+            name: np.where(np.asarray(key_codes[d]) >= len(labels[name]), -1, key_codes[d]).astype(np.int32)
+            for d, name in enumerate(CUBE_DIMENSIONS)
+        }
+        measures = {
+            name: np.bincount(group_codes, weights=values, minlength=size)
+            for name, values in weights.items()
+        }
+        return cls(labels, codes, measures)
+
+    def merge(self, other):
+        """
+        Combina otro cubo con este
+
+        Args:
+            other (PerformanceCube): Cubo con las medidas de otras órdenes
+
+        Returns:
+            PerformanceCube: Nuevo cubo con la suma de ambos
+        """
+        keys = {
+            name: np.concatenate([self.cell_values(name), other.cell_values(name)])
+            for name in CUBE_DIMENSIONS
+        }
+        weights = {
+            name: np.concatenate([self.measures[name], other.measures[name]])
+            for name in CUBE_MEASURES
+        }
+        return PerformanceCube._aggregate(keys, weights)
+
+    def __len__(self):
+        return len(self.measures['totalTrades'])
+
+    def cell_values(self, name):
+        """Valor de una dimensión en cada celda (NaN si falta)"""
+        if name == 'weekday':
+            return _decode(self._weekday_codes(), np.arange(7, dtype=object))
+        return _decode(self.codes[name], self.labels[name])
+
+    def group(self, dimensions, filters=None, date_from=None, date_to=None, dropna=True):
+        """
+        Agrega las celdas por un subconjunto de dimensiones
+
+        Args:
+            dimensions (str or list): Dimensiones del resultado (de CUBE_DIMENSIONS o 'weekday')
+            filters (dict, optional): Dimensión -> valor o lista de valores permitidos
+            date_from (str, optional): Primera fecha incluida ('YYYY-MM-DD')
+            date_to (str, optional): Última fecha incluida ('YYYY-MM-DD')
+            dropna (bool, optional): Descartar las celdas con alguna clave ausente
+
+        Returns:
+            list: Un diccionario por grupo con las claves y las estadísticas de
+                  services.analytics.performance_stats más totalQty
+        """
+        dimensions = [dimensions] if isinstance(dimensions, str) else list(dimensions)
+        mask = self.filter_mask(filters, date_from, date_to)
+
+        codes_list, labels = [], []
+        for name in dimensions:
+            codes, values = self._dimension(name)
+            if dropna:
+                mask &= codes >= 0
+            codes_list.append(codes)
+            labels.append(values)
+
+        group_codes, key_codes, size = combine_codes(
+            [codes[mask] for codes in codes_list], [len(values) for values in labels], int(mask.sum())
+        )
+
+        sums = {
+            name: np.bincount(group_codes, weights=values[mask], minlength=size)
+            for name, values in self.measures.items()
+        }
+
+        result = []
+        for index in range(size):
+            row = {
+                name: labels[d][key_codes[d][index]] if key_codes[d][index] < len(labels[d]) else np.nan
+                for d, name in enumerate(dimensions)
+            }
+            row.update(performance_stats({name: values[index] for name, values in sums.items()}))
+            row['totalQty'] = float(sums['totalQty'][index])
+            result.append(row)
+        return result
+
+    def totals(self, filters=None, date_from=None, date_to=None):
+        """Estadísticas del total de las celdas que cumplen los filtros"""
+        rows = self.group([], filters, date_from, date_to)
+        if rows:
+            return rows[0]
+        return performance_stats({name: 0 for name in CUBE_MEASURES})
+
+    def filter_mask(self, filters=None, date_from=None, date_to=None):
+        """
+        Máscara de las celdas que cumplen los filtros
+
+        Los filtros se evalúan sobre las tablas de valores (pocas entradas) y
+        se trasladan a las celdas a través de sus códigos.
+        """
+        mask = np.ones(len(self), dtype=bool)
+
+        for name, allowed in (filters or {}).items():
+            if not isinstance(allowed, (list, tuple, set, frozenset, np.ndarray)):
+                allowed = [allowed]
+            codes, values = self._dimension(name)
+            allowed_values = np.append(pd.Series(values, dtype=object).isin(list(allowed)).to_numpy(), False)
+            mask &= allowed_values[codes]
+
+        if date_from or date_to:
+            dates = self.labels['date'].astype(str)
+            allowed_dates = np.ones(len(dates), dtype=bool)
+            if date_from:
+                allowed_dates &= (dates >= date_from) & (dates != '')
+            if date_to:
+                allowed_dates &= (dates <= date_to) & (dates != '')
+            mask &= np.append(allowed_dates, False)[self.codes['date']]
+
+        return mask
+
+    def _dimension(self, name):
+        """Códigos por celda (-1 = ausente) y tabla de valores de una dimensión"""
+        if name == 'weekday':
+            return self._weekday_codes(), list(range(7))
+        if name not in self.codes:
+            raise ValueError(f"Dimensión no disponible en el cubo: '{name}'")
+        return self.codes[name], list(self.labels[name])
+
+    def _weekday_codes(self):
+        """Día de la semana de cada celda a partir de su fecha"""
+        dates = pd.to_datetime(pd.Series(self.labels['date'], dtype=object), format='%Y-%m-%d', errors='coerce')
+        timestamps = dates.to_numpy(dtype='datetime64[ns]').view(np.int64)
+        weekday_of_label = np.append(weekdays_of(timestamps), -1)
+        return weekday_of_label[self.codes['date']]
+
+
+def performance_cube_of(processed_data):
+    """
+    Devuelve el cubo de unos datos procesados
+
+    Los datos procesados antes de existir el cubo (o generados por la base de
+    datos) se agregan al vuelo a partir de processed_orders.
+
+    Args:
+        processed_data (dict): Datos procesados
+
+    Returns:
+        PerformanceCube: Cubo de rendimiento
+    """
+    cube = processed_data.get('performance_cube')
+    if cube is None:
+        cube = PerformanceCube.from_orders(processed_data.get('processed_orders') or [])
+    return cube
+
+
+def group_performance_of(processed_data, dimensions, filters=None, date_from=None, date_to=None, dropna=True):
+    """
+    Rendimiento agrupado por cualquier dimensión de unos datos procesados
+
+    Si las dimensiones y los filtros son del cubo (CUBE_DIMENSIONS o
+    'weekday') el resultado se obtiene sumando celdas; para el resto de
+    dimensiones ('route', 'Account', 'Market'...) se agrupan las órdenes con
+    services.analytics.group_performance.
+
+    Args:
+        processed_data (dict): Datos procesados
+        dimensions (str or list): Dimensiones del resultado
+        filters (dict, optional): Dimensión -> valor o lista de valores permitidos
+        date_from (str, optional): Primera fecha incluida ('YYYY-MM-DD')
+        date_to (str, optional): Última fecha incluida ('YYYY-MM-DD')
+        dropna (bool, optional): Descartar los grupos con alguna clave ausente
+
+    Returns:
+        list: Un diccionario por grupo con las claves y las estadísticas de
+              services.analytics.performance_stats (más totalQty si viene del cubo)
+    """
+    dimensions = [dimensions] if isinstance(dimensions, str) else list(dimensions)
+    if set(dimensions).union(filters or {}) <= set(CUBE_DIMENSIONS + ('weekday',)):
+        return performance_cube_of(processed_data).group(dimensions, filters, date_from, date_to, dropna)
+
+    return group_performance(
+        processed_data.get('processed_orders') or [], dimensions, filters,
+        dropna=dropna, date_from=date_from, date_to=date_to
+    )
+
+
+def query_filters(args):
+    """
+    Filtros del cubo a partir de los parámetros de una petición
+
+    Parámetros admitidos: symbols, traders y sides (valores separados por
+    comas o repetidos) y from / to (fechas 'YYYY-MM-DD'; las no válidas se
+    ignoran).
+
+    Args:
+        args (MultiDict): request.args
+
+    Returns:
+        dict: Argumentos filters, date_from y date_to de PerformanceCube.group
+    """
+    filters = {}
+    for param, dimension in (('symbols', 'symbol'), ('traders', 'Trader'), ('sides', 'side')):
+        values = [value.strip() for raw in args.getlist(param) for value in raw.split(',') if value.strip()]
+        if values:
+            filters[dimension] = values
+
+    return {
+        'filters': filters,
+        'date_from': _date_arg(args.get('from')),
+        'date_to': _date_arg(args.get('to'))
+    }
+
+
+def _date_arg(value):
+    """Fecha 'YYYY-MM-DD' de un parámetro; None si falta o no es válida"""
+    if not value:
+        return None
+    try:
+        return pd.Timestamp(value).strftime('%Y-%m-%d')
+    except (ValueError, TypeError):
+        print(f"[ERROR] Fecha de filtro no válida: {value}")
+        return None
+
+
+def is_filtered(query):
+    """Indica si unos filtros de query_filters restringen los datos"""
+    return bool(query['filters'] or query['date_from'] or query['date_to'])
+
+
+def symbol_breakdown(cube, **query):
+    """symbol_performance (ordenado por P&L descendente) desde el cubo"""
+    rows = [_view_row('symbol', row) for row in cube.group('symbol', dropna=False, **query)]
+    return sorted(rows, key=lambda x: x['totalPL'], reverse=True)
+
+
+def hour_breakdown(cube, **query):
+    """time_performance (ordenado por hora) desde el cubo"""
+    rows = [_view_row('hour', row) for row in cube.group('hour', dropna=False, **query)]
+    return sorted(rows, key=lambda x: x['hour'])
+
+
+def side_breakdown(cube, **query):
+    """buysell_performance (compras y ventas) desde el cubo"""
+    by_side = {row['side']: row for row in cube.group('side', **query)}
+    empty = performance_stats({name: 0 for name in CUBE_MEASURES})
+    return [
+        dict(_view_row('type', by_side.get(side, empty)), type=label)
+        for side, label in SIDE_LABELS
+    ]
+
+
+def _view_row(key_name, row):
+    """Fila con el formato de las vistas de análisis"""
+    return {
+        key_name: row.get(key_name),
+        'totalPL': row['totalPL'],
+        'totalTrades': row['totalTrades'],
+        'winRate': row['winRate']
+    }
+
+
+def _numeric_column(orders, name):
+    """Columna numérica de las órdenes o ceros si no existe"""
+    if name not in orders.columns:
+        return np.zeros(len(orders))
+    return orders.column(name).astype(float)
+
+
+def _decode(codes, labels):
+    """Valores de una dimensión a partir de sus códigos (-1 -> NaN)"""
+    values = np.append(np.asarray(labels, dtype=object), np.nan)
+    return values[codes]
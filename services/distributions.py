@@ -0,0 +1,429 @@
+"""
+Distribuciones aproximadas y combinables de P&L, cantidad y comisiones
+
+Para cada medida (P&L, cantidad y comisión por orden) se mantiene, en total
+y por símbolo y por trader, un DistributionSketch con:
+
+- conteo, suma, suma de cuadrados, mínimo y máximo exactos;
+- un sketch de cuantiles KLL (QuantileSketch) para percentiles y colas;
+- un histograma de bins fijos (FixedHistogram).
+
+Todos se actualizan por lotes durante la agregación y se combinan con
+merge(), por lo que se pueden calcular por días o por procesos y unirlos
+después, igual que PerformanceAccumulator.
+
+Precisión:
+
+- Conteo, media, desviación típica, mínimo y máximo son exactos (el sketch
+  KLL guarda el mínimo y el máximo).
+- Los conteos del histograma son exactos; un percentil leído del histograma
+  tiene como error el ancho de su bin.
+- El sketch KLL es exacto mientras el grupo tiene como mucho k valores.
+  Por encima, el error de rango normalizado (|rango estimado - rango real| / n)
+  de cualquier cuantil está acotado por ~1.65% con un 99% de confianza para
+  k = 200 (el valor por defecto), y decrece proporcionalmente a 1/k. La
+  memoria es O(k) por grupo, independiente del número de órdenes.
+  benchmarks/sketch_accuracy.py compara los cuantiles con np.quantile
+  exacto, también tras combinar sketches parciales.
+- Las medias de cola (tailLow / tailHigh) se integran sobre la función de
+  cuantiles del sketch: heredan su error de rango, pero en distribuciones
+  de colas pesadas dependen de unos pocos valores extremos y su error
+  relativo puede ser de varios puntos porcentuales.
+"""
+import numpy as np
+import pandas as pd
+
+from services.analytics import dimension_values
+from services.processed_orders import as_processed_orders, to_native
+
+# Tamaño por defecto del sketch KLL (error de rango ~1.65% con 99% de confianza)
+DEFAULT_SKETCH_K = 200
+
+# Factor de reducción de la capacidad entre niveles del sketch KLL
+_CAPACITY_DECAY = 2.0 / 3.0
+
+# Puntos con que se integra la función de cuantiles en tail_mean
+_TAIL_GRID = 256
+
+# Medidas: nombre -> columna de las órdenes procesadas
+DISTRIBUTION_MEASURES = {
+    'pnl': 'pnl',
+    'qty': 'totalQty',
+    'commission': 'totalCommission'
+}
+
+# Agrupaciones mantenidas ('all' = todas las órdenes)
+DISTRIBUTION_DIMENSIONS = ('all', 'symbol', 'Trader')
+
+# Percentiles del resumen
+SUMMARY_QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+
+
+def _series_125(low, high):
+    """Bordes 1-2-5 entre dos potencias de 10 (incluidas)"""
+    exponents = range(int(np.log10(low)), int(np.log10(high)) + 1)
+    edges = [mantissa * 10.0 ** exponent for exponent in exponents for mantissa in (1, 2, 5)]
+    return np.array([edge for edge in edges if low <= edge <= high])
+
+
+# Bordes de los histogramas de cada medida (escala 1-2-5; P&L simétrico con 0)
+_PNL_EDGES = _series_125(0.01, 100_000)
+HISTOGRAM_EDGES = {
+    'pnl': np.concatenate([-_PNL_EDGES[::-1], [0.0], _PNL_EDGES]),
+    'qty': _series_125(1, 1_000_000),
+    'commission': np.concatenate([[0.0], _series_125(0.001, 1_000)])
+}
+
+
+class QuantileSketch:
+    """
+    Sketch de cuantiles KLL (Karnin, Lang y Liberty, 2016)
+
+    Los valores se guardan en niveles; un valor del nivel h representa 2**h
+    valores originales. Cuando un nivel supera su capacidad se ordena y se
+    promueve al nivel siguiente uno de cada dos valores (empezando al azar
+    por el primero o el segundo), lo que mantiene el peso total igual al
+    número de valores y el error de rango acotado.
+    """
+
+    def __init__(self, k=DEFAULT_SKETCH_K, seed=0):
+        """
+        Args:
+            k (int, optional): Capacidad del nivel superior (precisión ~1/k)
+            seed (int, optional): Semilla de las elecciones aleatorias
+        """
+        self.k = int(k)
+        self.count = 0
+        self.minimum = np.inf
+        self.maximum = -np.inf
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values):
+        """
+        Añade un lote de valores (los NaN se ignoran)
+
+        Returns:
+            QuantileSketch: El propio sketch
+        """
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if len(values):
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self.count += len(values)
+            self.minimum = min(self.minimum, float(values.min()))
+            self.maximum = max(self.maximum, float(values.max()))
+            self._compress()
+        return self
+
+    def merge(self, other):
+        """
+        Combina otro sketch en este
+
+        Returns:
+            QuantileSketch: El propio sketch
+        """
+        self.k = min(self.k, other.k)
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for height, items in enumerate(other.levels):
+            self.levels[height] = np.concatenate([self.levels[height], items])
+        self.count += other.count
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+        self._compress()
+        return self
+
+    def _capacity(self, height):
+        """Capacidad de un nivel (mayor cuanto más alto)"""
+        depth = len(self.levels) - height - 1
+        return max(int(np.ceil(self.k * _CAPACITY_DECAY ** depth)), 2)
+
+    def _compress(self):
+        """
+        Compacta niveles mientras el sketch supere su capacidad total
+
+        Como en KLL, en cada paso se compacta el nivel más bajo que ha
+        alcanzado su capacidad.
+        """
+        while sum(len(items) for items in self.levels) > sum(self._capacity(h) for h in range(len(self.levels))):
+            height = next(
+                h for h, items in enumerate(self.levels) if len(items) >= self._capacity(h)
+            )
+            if height + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+
+            items = np.sort(self.levels[height])
+            # Con un número impar de valores, el último se queda en el nivel
+            even = len(items) - len(items) % 2
+            offset = int(self._rng.integers(2))
+            self.levels[height] = items[even:]
+            self.levels[height + 1] = np.concatenate([self.levels[height + 1], items[offset:even:2]])
+
+    def _weighted_items(self):
+        """Valores ordenados y su peso acumulado"""
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 2 ** height) for height, level in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        return items[order], weights[order]
+
+    def quantiles(self, fractions):
+        """
+        Cuantiles aproximados
+
+        Args:
+            fractions (list): Fracciones entre 0 y 1
+
+        Returns:
+            ndarray: Un valor por fracción (NaN si el sketch está vacío)
+        """
+        fractions = np.asarray(fractions, dtype=float)
+        if not self.count:
+            return np.full(len(fractions), np.nan)
+
+        items, weights = self._weighted_items()
+        cumulative = np.cumsum(weights)
+        positions = np.searchsorted(cumulative, np.maximum(fractions * self.count, 1), side='left')
+        values = items[np.minimum(positions, len(items) - 1)]
+        # Los extremos se conocen exactamente
+        return np.where(fractions <= 0, self.minimum, np.where(fractions >= 1, self.maximum, values))
+
+    def rank(self, value):
+        """Fracción aproximada de valores menores o iguales que value"""
+        if not self.count:
+            return np.nan
+        items, weights = self._weighted_items()
+        return float(weights[items <= value].sum() / self.count)
+
+    def tail_mean(self, fraction, upper=False):
+        """
+        Media aproximada de la cola inferior (o superior) que contiene fraction de los valores
+
+        Returns:
+            float: Media de la cola (NaN si el sketch está vacío)
+        """
+        if not self.count:
+            return np.nan
+        items, weights = self._weighted_items()
+        if upper:
+            items, weights = items[::-1], weights[::-1]
+
+        # Cada valor retenido representa los rangos (acumulado - peso, acumulado]:
+        # se sitúa en el centro de su tramo y la función de cuantiles se
+        # interpola linealmente y se promedia sobre la cola
+        centers = np.cumsum(weights) - weights / 2.0
+        target = max(fraction * self.count, 1)
+        grid = (np.arange(_TAIL_GRID) + 0.5) / _TAIL_GRID * target
+        return float(np.interp(grid, centers, items).mean())
+
+
+class FixedHistogram:
+    """Histograma de bins fijos (más un bin inferior y otro superior abiertos)"""
+
+    def __init__(self, edges):
+        """
+        Args:
+            edges (ndarray): Bordes crecientes de los bins
+        """
+        self.edges = np.asarray(edges, dtype=float)
+        self.counts = np.zeros(len(self.edges) + 1, dtype=np.int64)
+
+    def update(self, values):
+        """Añade un lote de valores (los NaN se ignoran)"""
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        bins = np.searchsorted(self.edges, values, side='right')
+        self.counts += np.bincount(bins, minlength=len(self.counts))
+        return self
+
+    def merge(self, other):
+        """Combina otro histograma con los mismos bordes"""
+        if not np.array_equal(self.edges, other.edges):
+            raise ValueError('Los histogramas tienen bordes distintos')
+        self.counts += other.counts
+        return self
+
+    def bins(self):
+        """
+        Bins con valores
+
+        Returns:
+            list: Diccionarios from, to (None = abierto) y count
+        """
+        lower = [None] + self.edges.tolist()
+        upper = self.edges.tolist() + [None]
+        return [
+            {'from': lower[index], 'to': upper[index], 'count': int(count)}
+            for index, count in enumerate(self.counts) if count
+        ]
+
+
+class DistributionSketch:
+    """Resumen exacto, sketch de cuantiles e histograma de una medida"""
+
+    def __init__(self, edges, k=DEFAULT_SKETCH_K):
+        self.count = 0
+        self.total = 0.0
+        self.squares = 0.0
+        self.quantile_sketch = QuantileSketch(k)
+        self.histogram = FixedHistogram(edges)
+
+    def update(self, values):
+        """Añade un lote de valores (los NaN se ignoran)"""
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return self
+
+        self.count += len(values)
+        self.total += float(values.sum())
+        self.squares += float((values * values).sum())
+        self.quantile_sketch.update(values)
+        self.histogram.update(values)
+        return self
+
+    def merge(self, other):
+        """Combina otro sketch de la misma medida"""
+        self.count += other.count
+        self.total += other.total
+        self.squares += other.squares
+        self.quantile_sketch.merge(other.quantile_sketch)
+        self.histogram.merge(other.histogram)
+        return self
+
+    def summary(self):
+        """
+        Estadísticas de la distribución
+
+        Returns:
+            dict: count, mean, std, min, max, p1...p99 (aproximados),
+                  tailLow / tailHigh (media del 5% inferior / superior, aproximadas)
+        """
+        if not self.count:
+            return {'count': 0}
+
+        mean = self.total / self.count
+        variance = max(self.squares / self.count - mean * mean, 0.0) * self.count / max(self.count - 1, 1)
+        quantiles = self.quantile_sketch.quantiles(SUMMARY_QUANTILES)
+        minimum, maximum = self.quantile_sketch.minimum, self.quantile_sketch.maximum
+
+        summary = {
+            'count': self.count,
+            'mean': mean,
+            'std': float(np.sqrt(variance)),
+            'min': minimum,
+            'max': maximum
+        }
+        for fraction, value in zip(SUMMARY_QUANTILES, quantiles.tolist()):
+            summary[f'p{int(round(fraction * 100))}'] = value
+        summary['tailLow'] = self.quantile_sketch.tail_mean(0.05)
+        summary['tailHigh'] = self.quantile_sketch.tail_mean(0.05, upper=True)
+        return summary
+
+
+class DistributionSketches:
+    """DistributionSketch de cada medida, en total y por símbolo y trader"""
+
+    def __init__(self, k=DEFAULT_SKETCH_K):
+        self.k = k
+        # Medida -> dimensión -> clave -> DistributionSketch ('all' usa la clave None)
+        self.sketches = {
+            measure: {dimension: {} for dimension in DISTRIBUTION_DIMENSIONS}
+            for measure in DISTRIBUTION_MEASURES
+        }
+
+    def _sketch(self, measure, dimension, key):
+        groups = self.sketches[measure][dimension]
+        if key not in groups:
+            groups[key] = DistributionSketch(HISTOGRAM_EDGES[measure], self.k)
+        return groups[key]
+
+    def update(self, orders):
+        """
+        Incorpora un lote de órdenes procesadas
+
+        Las órdenes se agrupan una vez por dimensión (orden estable por código)
+        y cada grupo actualiza sus sketches con un tramo contiguo de valores.
+
+        Args:
+            orders (ProcessedOrders or list): Órdenes procesadas del lote
+
+        Returns:
+            DistributionSketches: El propio objeto
+        """
+        orders = as_processed_orders(orders)
+        if not len(orders):
+            return self
+
+        measures = {
+            measure: orders.column(column).astype(float) if column in orders.columns else np.zeros(len(orders))
+            for measure, column in DISTRIBUTION_MEASURES.items()
+        }
+
+        for measure, values in measures.items():
+            self._sketch(measure, 'all', None).update(values)
+
+        for dimension in DISTRIBUTION_DIMENSIONS[1:]:
+            codes, uniques = pd.factorize(dimension_values(orders, dimension))
+            order = np.argsort(codes, kind='stable')
+            bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1), side='left')
+            for code, key in enumerate(uniques):
+                rows = order[bounds[code]:bounds[code + 1]]
+                for measure, values in measures.items():
+                    self._sketch(measure, dimension, to_native(key)).update(values[rows])
+        return self
+
+    def merge(self, other):
+        """Combina los sketches de otro objeto (otro día, trozo o proceso)"""
+        for measure, dimensions in other.sketches.items():
+            for dimension, groups in dimensions.items():
+                for key, sketch in groups.items():
+                    self._sketch(measure, dimension, key).merge(sketch)
+        return self
+
+    def summary(self, measure, dimension='all'):
+        """
+        Resumen de una medida por grupo
+
+        Args:
+            measure (str): Clave de DISTRIBUTION_MEASURES
+            dimension (str, optional): Clave de DISTRIBUTION_DIMENSIONS
+
+        Returns:
+            list: Diccionarios con 'key' y las estadísticas de DistributionSketch.summary
+        """
+        groups = self._groups(measure, dimension)
+        return [dict({'key': key}, **sketch.summary()) for key, sketch in groups.items()]
+
+    def histogram(self, measure, dimension='all', key=None):
+        """Bins con valores del histograma de un grupo (lista vacía si no existe)"""
+        sketch = self._groups(measure, dimension).get(key)
+        return sketch.histogram.bins() if sketch else []
+
+    def _groups(self, measure, dimension):
+        if measure not in self.sketches:
+            raise ValueError(f"Medida desconocida: '{measure}'")
+        if dimension not in self.sketches[measure]:
+            raise ValueError(f"Dimensión desconocida: '{dimension}'")
+        return self.sketches[measure][dimension]
+
+
+def distributions_of(processed_data):
+    """
+    Devuelve los sketches de distribución de unos datos procesados
+
+    Se guardan en el PerformanceAccumulator de 'aggregate_state'; para
+    cachés anteriores (o del motor de referencia) se calculan a partir de
+    processed_orders.
+
+    Args:
+        processed_data (dict): Datos procesados
+
+    Returns:
+        DistributionSketches: Sketches de distribución
+    """
+    state = processed_data.get('aggregate_state')
+    distributions = getattr(state, 'distributions', None)
+    if distributions is None:
+        distributions = DistributionSketches().update(processed_data.get('processed_orders') or [])
+    return distributions
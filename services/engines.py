@@ -0,0 +1,400 @@
+"""
+Motores de procesamiento intercambiables
+
+Un ProcessingEngine implementa las tres fases del pipeline:
+ingest (CSV -> DataFrames), join (órdenes + trades + tickets -> órdenes
+procesadas) y aggregate (órdenes procesadas -> métricas, análisis y curva de
+equidad). Los motores se registran por nombre y se eligen con
+Config.PROCESSING_ENGINE:
+
+- 'reference': implementación en Python puro, fila a fila. Es lenta pero
+  sirve como referencia de los resultados.
+- 'vectorized': unión y agregación con operaciones de NumPy/pandas.
+
+compare_engines() ejecuta varios motores sobre las mismas entradas y lista
+las diferencias, para poder adoptar el motor rápido sin desviaciones
+silenciosas en las métricas.
+"""
+import math
+
+from services.aggregates import PerformanceAccumulator, empty_metrics
+from services.cube import PerformanceCube
+from services.ingest import load_export_frames
+from services.join_engine import compare_processed_orders, join_orders, join_orders_reference
+from services.order_index import OrderIndex
+from services.positions import RoundTripBook
+from services.timestamps import order_timestamp
+
+# Motor usado cuando no se indica ninguno
+DEFAULT_ENGINE = 'vectorized'
+
+# Registro de motores disponibles: nombre -> clase
+_ENGINES = {}
+
+
+def register_engine(engine_class):
+    """
+    Registra una clase de motor bajo su atributo name (usable como decorador)
+
+    Args:
+        engine_class (type): Subclase de ProcessingEngine
+
+    Returns:
+        type: La misma clase
+    """
+    if not engine_class.name:
+        raise ValueError('El motor debe definir el atributo name')
+    _ENGINES[engine_class.name] = engine_class
+    return engine_class
+
+
+def get_engine(name=None):
+    """
+    Obtiene una instancia del motor indicado
+
+    Args:
+        name (str, optional): Nombre del motor; por defecto DEFAULT_ENGINE
+
+    Returns:
+        ProcessingEngine: Instancia del motor
+    """
+    name = name or DEFAULT_ENGINE
+    if name not in _ENGINES:
+        raise ValueError(f"Motor de procesamiento desconocido: '{name}'. Disponibles: {available_engines()}")
+    return _ENGINES[name]()
+
+
+def available_engines():
+    """Devuelve los nombres de los motores registrados"""
+    return sorted(_ENGINES)
+
+
+class ProcessingEngine:
+    """Interfaz base de los motores de procesamiento"""
+    name = None
+
+    def ingest(self, orders_path, trades_path, tickets_path, snapshot_dir=None):
+        """
+        Carga los CSV de la exportación
+
+        Args:
+            snapshot_dir (str, optional): Directorio de instantáneas binarias de los CSV
+
+        Returns:
+            tuple: (orders_df, trades_df, tickets_df) normalizados
+        """
+        return load_export_frames(orders_path, trades_path, tickets_path, snapshot_dir)
+
+    def join(self, orders_df, trades_df, tickets_df):
+        """Relaciona órdenes con trades y tickets"""
+        raise NotImplementedError
+
+    def aggregate(self, processed_orders):
+        """
+        Calcula métricas y análisis a partir de las órdenes procesadas
+
+        Returns:
+            dict: metrics, symbol_performance, time_performance,
+                  buysell_performance y equity_curve
+        """
+        raise NotImplementedError
+
+    def run(self, orders_path, trades_path, tickets_path, snapshot_dir=None):
+        """
+        Ejecuta el pipeline completo
+
+        Args:
+            snapshot_dir (str, optional): Directorio de instantáneas binarias de los CSV
+
+        Returns:
+            dict: Resultado con el formato de process_trading_data
+        """
+        frames = self.ingest(orders_path, trades_path, tickets_path, snapshot_dir)
+        processed_orders = self.join(*frames)
+
+        result = self.aggregate(processed_orders)
+        result['processed_orders'] = processed_orders
+        result['performance_cube'] = PerformanceCube.from_orders(processed_orders)
+        result['order_index'] = OrderIndex.from_orders(processed_orders)
+        result['round_trips'] = RoundTripBook.from_orders(processed_orders)
+        return result
+
+
+@register_engine
+class ReferenceEngine(ProcessingEngine):
+    """Motor de referencia en Python puro (fila a fila)"""
+    name = 'reference'
+
+    def join(self, orders_df, trades_df, tickets_df):
+        return join_orders_reference(orders_df, trades_df, tickets_df)
+
+    def aggregate(self, processed_orders):
+        return {
+            'metrics': _calculate_metrics(processed_orders),
+            'symbol_performance': _analyze_by_symbol(processed_orders),
+            'time_performance': _analyze_by_time_of_day(processed_orders),
+            'buysell_performance': _analyze_by_buysell(processed_orders),
+            'equity_curve': _create_equity_curve(processed_orders)
+        }
+
+
+@register_engine
+class VectorizedEngine(ProcessingEngine):
+    """Motor vectorizado con NumPy/pandas"""
+    name = 'vectorized'
+
+    def join(self, orders_df, trades_df, tickets_df):
+        return join_orders(orders_df, trades_df, tickets_df)
+
+    def aggregate(self, processed_orders):
+        accumulator = PerformanceAccumulator().update(processed_orders)
+        result = accumulator.to_result()
+        result['aggregate_state'] = accumulator.compact()
+        return result
+
+
+def compare_engines(orders_path, trades_path, tickets_path, engines=('reference', 'vectorized'),
+                    rel_tol=1e-9, abs_tol=1e-9):
+    """
+    Ejecuta varios motores sobre las mismas entradas y compara sus resultados
+
+    El primer motor de la lista se toma como referencia.
+
+    Args:
+        orders_path (str): Ruta del CSV de órdenes
+        trades_path (str): Ruta del CSV de trades
+        tickets_path (str): Ruta del CSV de tickets
+        engines (tuple, optional): Nombres de los motores a comparar
+        rel_tol (float, optional): Tolerancia relativa para valores numéricos
+        abs_tol (float, optional): Tolerancia absoluta para valores numéricos
+
+    Returns:
+        dict: Nombre de motor -> lista de diferencias respecto a la referencia
+    """
+    reference_name, *other_names = engines
+    expected = get_engine(reference_name).run(orders_path, trades_path, tickets_path)
+
+    report = {}
+    for name in other_names:
+        actual = get_engine(name).run(orders_path, trades_path, tickets_path)
+        differences = compare_processed_orders(
+            expected['processed_orders'], actual['processed_orders'], rel_tol, abs_tol
+        )
+        for section in ('metrics', 'symbol_performance', 'time_performance', 'buysell_performance', 'equity_curve'):
+            differences.extend(_compare_values(section, expected[section], actual[section], rel_tol, abs_tol))
+        report[name] = differences
+
+    return report
+
+
+def _compare_values(path, expected, actual, rel_tol, abs_tol):
+    """Compara recursivamente dos estructuras de resultados"""
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        if expected.keys() != actual.keys():
+            return [f"{path}: campos distintos {sorted(expected)} != {sorted(actual)}"]
+        differences = []
+        for key in expected:
+            differences.extend(_compare_values(f"{path}.{key}", expected[key], actual[key], rel_tol, abs_tol))
+        return differences
+
+    if isinstance(expected, list) and isinstance(actual, list):
+        if len(expected) != len(actual):
+            return [f"{path}: longitud distinta {len(expected)} != {len(actual)}"]
+        differences = []
+        for index, (left, right) in enumerate(zip(expected, actual)):
+            differences.extend(_compare_values(f"{path}[{index}]", left, right, rel_tol, abs_tol))
+        return differences
+
+    if isinstance(expected, (int, float)) and isinstance(actual, (int, float)):
+        if math.isclose(expected, actual, rel_tol=rel_tol, abs_tol=abs_tol):
+            return []
+        return [f"{path}: {expected!r} != {actual!r}"]
+
+    if expected != actual:
+        return [f"{path}: {expected!r} != {actual!r}"]
+    return []
+
+
+# ----------------------------------------------------------------------
+# Agregaciones de referencia (Python puro)
+# ----------------------------------------------------------------------
+def _calculate_metrics(orders):
+    """Calcula métricas a partir de las órdenes procesadas"""
+    if not orders:
+        return empty_metrics()
+    
+    # Identificar operaciones ganadoras y perdedoras
+    winning_orders = [o for o in orders if o['pnl'] > 0]
+    losing_orders = [o for o in orders if o['pnl'] <= 0]
+    
+    # Calcular métricas básicas
+    total_trades = len(orders)
+    winning_trades = len(winning_orders)
+    losing_trades = len(losing_orders)
+    
+    total_pl = sum(o['pnl'] for o in orders)
+    win_rate = (winning_trades / total_trades * 100) if total_trades > 0 else 0
+    
+    # Calcular ganancias y pérdidas totales
+    total_gain = sum(o['pnl'] for o in winning_orders) if winning_orders else 0
+    total_loss = abs(sum(o['pnl'] for o in losing_orders)) if losing_orders else 0
+    
+    # Profit factor
+    profit_factor = (total_gain / total_loss) if total_loss > 0 else total_gain
+    
+    # Promedios
+    avg_win = (total_gain / winning_trades) if winning_trades > 0 else 0
+    avg_loss = (total_loss / losing_trades) if losing_trades > 0 else 0
+    
+    # Calcular drawdown
+    sorted_orders = sorted(orders, key=order_timestamp)
+    max_drawdown = 0
+    peak = 0
+    running_pl = 0
+    
+    for order in sorted_orders:
+        running_pl += order['pnl']
+        if running_pl > peak:
+            peak = running_pl
+        
+        drawdown = peak - running_pl
+        if drawdown > max_drawdown:
+            max_drawdown = drawdown
+    
+    return {
+        'totalPL': total_pl,
+        'winRate': win_rate,
+        'profitFactor': profit_factor,
+        'avgWin': avg_win,
+        'avgLoss': avg_loss,
+        'maxDrawdown': max_drawdown,
+        'totalTrades': total_trades,
+        'winningTrades': winning_trades,
+        'losingTrades': losing_trades
+    }
+
+
+def _analyze_by_symbol(orders):
+    """Analiza rendimiento por símbolo"""
+    symbols = {}
+    
+    for order in orders:
+        symbol = order.get('symb', 'Unknown')
+        
+        if symbol not in symbols:
+            symbols[symbol] = {
+                'totalPL': 0,
+                'totalTrades': 0,
+                'winningTrades': 0
+            }
+        
+        symbols[symbol]['totalPL'] += order['pnl']
+        symbols[symbol]['totalTrades'] += 1
+        if order['pnl'] > 0:
+            symbols[symbol]['winningTrades'] += 1
+    
+    # Convertir a lista y calcular win rate
+    symbol_stats = []
+    for symbol, stats in symbols.items():
+        win_rate = (stats['winningTrades'] / stats['totalTrades'] * 100) if stats['totalTrades'] > 0 else 0
+        
+        symbol_stats.append({
+            'symbol': symbol,
+            'totalPL': stats['totalPL'],
+            'totalTrades': stats['totalTrades'],
+            'winRate': win_rate
+        })
+    
+    # Ordenar por P&L total (descendente)
+    return sorted(symbol_stats, key=lambda x: x['totalPL'], reverse=True)
+
+
+def _analyze_by_time_of_day(orders):
+    """Analiza rendimiento por hora del día"""
+    hours = {}
+    
+    for order in orders:
+        hour = order.get('hour', 0)
+        
+        if hour not in hours:
+            hours[hour] = {
+                'totalPL': 0,
+                'totalTrades': 0,
+                'winningTrades': 0
+            }
+        
+        hours[hour]['totalPL'] += order['pnl']
+        hours[hour]['totalTrades'] += 1
+        if order['pnl'] > 0:
+            hours[hour]['winningTrades'] += 1
+    
+    # Convertir a lista y calcular win rate
+    hour_stats = []
+    for hour, stats in hours.items():
+        win_rate = (stats['winningTrades'] / stats['totalTrades'] * 100) if stats['totalTrades'] > 0 else 0
+        
+        hour_stats.append({
+            'hour': hour,
+            'totalPL': stats['totalPL'],
+            'totalTrades': stats['totalTrades'],
+            'winRate': win_rate
+        })
+    
+    # Ordenar por hora
+    return sorted(hour_stats, key=lambda x: x['hour'])
+
+
+def _analyze_by_buysell(orders):
+    """Analiza rendimiento por tipo (compra/venta)"""
+    buys = [o for o in orders if o.get('B/S') == 'B']
+    sells = [o for o in orders if o.get('B/S') == 'S']
+    
+    # Estadísticas de compras
+    buy_pl = sum(o['pnl'] for o in buys)
+    buy_count = len(buys)
+    buy_winners = len([o for o in buys if o['pnl'] > 0])
+    buy_win_rate = (buy_winners / buy_count * 100) if buy_count > 0 else 0
+    
+    # Estadísticas de ventas
+    sell_pl = sum(o['pnl'] for o in sells)
+    sell_count = len(sells)
+    sell_winners = len([o for o in sells if o['pnl'] > 0])
+    sell_win_rate = (sell_winners / sell_count * 100) if sell_count > 0 else 0
+    
+    return [
+        {
+            'type': 'Compras',
+            'totalPL': buy_pl,
+            'totalTrades': buy_count,
+            'winRate': buy_win_rate
+        },
+        {
+            'type': 'Ventas',
+            'totalPL': sell_pl,
+            'totalTrades': sell_count,
+            'winRate': sell_win_rate
+        }
+    ]
+
+
+def _create_equity_curve(orders):
+    """Crea la curva de equidad"""
+    # Ordenar cronológicamente (por timestamp, no por el texto de 'time')
+    sorted_orders = sorted(orders, key=order_timestamp)
+    
+    equity_curve = []
+    running_pl = 0
+    
+    for i, order in enumerate(sorted_orders):
+        running_pl += order['pnl']
+        
+        equity_curve.append({
+            'tradeNumber': i + 1,
+            'time': order.get('time', ''),
+            'date': order.get('date', ''),
+            'symbol': order.get('symb', ''),
+            'pnl': order['pnl'],
+            'equity': running_pl
+        })
+    
+    return equity_curve
@@ -0,0 +1,176 @@
+"""
+Serie de equidad y drawdown en arrays y submuestreo para gráficos
+
+La curva de equidad se guarda, además de como lista de diccionarios
+(equity_curve), como un diccionario de arrays (equity_series) con la
+equidad, el drawdown, el P&L, el símbolo y la fecha/hora de cada operación.
+La equidad es la suma acumulada del P&L y el drawdown la distancia al máximo
+acumulado (np.maximum.accumulate), partiendo de un pico de 0.
+
+Para el dashboard la serie completa se reduce con LTTB (Largest Triangle
+Three Buckets), que conserva la forma visual de la curva (picos y valles)
+con unos pocos cientos de puntos; la serie completa queda en el servidor
+para servir tramos ampliados (zoom).
+"""
+import numpy as np
+
+# Campos de equity_series
+EQUITY_SERIES_FIELDS = ('equity', 'drawdown', 'pnl', 'timestamp', 'time', 'date', 'symbol')
+
+
+def drawdown_series(equity, initial_peak=0.0):
+    """
+    Calcula el drawdown de una serie de equidad
+
+    Args:
+        equity (ndarray): Equidad acumulada tras cada operación
+        initial_peak (float, optional): Máximo previo (para continuar una serie)
+
+    Returns:
+        tuple: (drawdown, máximo acumulado) como arrays de la misma longitud
+    """
+    equity = np.asarray(equity, dtype=float)
+    peak = np.maximum.accumulate(np.maximum(equity, initial_peak))
+    return peak - equity, peak
+
+
+def build_equity_series(increments, equity, initial_peak=0.0):
+    """
+    Construye equity_series a partir de los incrementos ordenados por tiempo
+
+    Args:
+        increments (dict): Arrays 'timestamp', 'time', 'date', 'symbol' y 'pnl'
+        equity (ndarray): Equidad acumulada tras cada incremento
+        initial_peak (float, optional): Máximo previo de la equidad
+
+    Returns:
+        dict: Arrays de EQUITY_SERIES_FIELDS
+    """
+    drawdown, _ = drawdown_series(equity, initial_peak)
+    # Texto de ancho fijo (y no objetos) para que se guarde como array mapeable
+    series = {key: np.asarray(increments[key]).astype(str) for key in ('time', 'date', 'symbol')}
+    series['pnl'] = np.asarray(increments['pnl'], dtype=float)
+    series['timestamp'] = np.asarray(increments['timestamp'], dtype=np.int64)
+    series['equity'] = np.asarray(equity, dtype=float)
+    series['drawdown'] = drawdown
+    return series
+
+
+def concat_equity_series(first, second):
+    """Concatena dos tramos consecutivos de equity_series"""
+    return {key: np.concatenate([first[key], second[key]]) for key in EQUITY_SERIES_FIELDS}
+
+
+def equity_series_of(processed_data):
+    """
+    Devuelve la serie de equidad de unos datos procesados
+
+    Los datos procesados antes de existir equity_series (o generados por el
+    motor de referencia o la base de datos) solo tienen equity_curve; en ese
+    caso la serie se construye a partir de la lista.
+
+    Args:
+        processed_data (dict): Datos procesados
+
+    Returns:
+        dict: Arrays de EQUITY_SERIES_FIELDS
+    """
+    series = processed_data.get('equity_series')
+    if series is not None:
+        return series
+
+    curve = processed_data.get('equity_curve', [])
+    equity = np.array([point.get('equity', 0) for point in curve], dtype=float)
+    drawdown, _ = drawdown_series(equity)
+    return {
+        'equity': equity,
+        'drawdown': drawdown,
+        'pnl': np.array([point.get('pnl', 0) for point in curve], dtype=float),
+        'timestamp': np.zeros(len(curve), dtype=np.int64),
+        'time': np.array([point.get('time', '') for point in curve], dtype=object),
+        'date': np.array([point.get('date', '') for point in curve], dtype=object),
+        'symbol': np.array([point.get('symbol', '') for point in curve], dtype=object)
+    }
+
+
+def lttb_indices(y, threshold):
+    """
+    Selecciona los puntos de una serie con Largest Triangle Three Buckets
+
+    El eje x es la posición del punto. Se conservan siempre el primero y el
+    último; los demás se reparten en threshold - 2 buckets y de cada uno se
+    elige el punto que forma el triángulo de mayor área con el punto elegido
+    en el bucket anterior y la media del bucket siguiente.
+
+    Args:
+        y (ndarray): Valores de la serie
+        threshold (int): Número de puntos a conservar
+
+    Returns:
+        ndarray: Índices seleccionados en orden creciente
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_start, next_end = end, edges[bucket + 2] if bucket + 2 < len(edges) else n
+        next_x = (next_start + next_end - 1) / 2.0
+        next_y = y[next_start:next_end].mean()
+
+        x = np.arange(start, end)
+        area = np.abs(
+            (previous - next_x) * (y[start:end] - y[previous])
+            - (previous - x) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(area))
+        selected[bucket + 1] = previous
+
+    return selected
+
+
+def equity_chart_points(series, points, start=None, end=None):
+    """
+    Puntos de la curva de equidad para el gráfico
+
+    Args:
+        series (dict): Arrays de EQUITY_SERIES_FIELDS
+        points (int): Número máximo de puntos a devolver
+        start (int, optional): Primer número de operación del tramo (desde 1)
+        end (int, optional): Último número de operación del tramo (incluido)
+
+    Returns:
+        list: Diccionarios tradeNumber, time, date, symbol, pnl, equity y drawdown
+              (todos los puntos del tramo si caben; si no, submuestreados con LTTB)
+    """
+    total = len(series['equity'])
+    first = max((start or 1) - 1, 0)
+    last = min(end or total, total)
+    if first >= last:
+        return []
+
+    window = lttb_indices(series['equity'][first:last], points) + first
+    columns = {key: series[key][window].tolist() for key in ('time', 'date', 'symbol', 'pnl', 'equity', 'drawdown')}
+    return [
+        {
+            'tradeNumber': index + 1,
+            'time': time,
+            'date': date,
+            'symbol': symbol,
+            'pnl': pnl,
+            'equity': equity,
+            'drawdown': drawdown
+        }
+        for index, time, date, symbol, pnl, equity, drawdown in zip(
+            window.tolist(), columns['time'], columns['date'], columns['symbol'],
+            columns['pnl'], columns['equity'], columns['drawdown']
+        )
+    ]
@@ -0,0 +1,119 @@
+"""
+Ingesta incremental: añadir una nueva exportación a los datos ya procesados
+
+Los datos procesados guardan en 'aggregate_state' el PerformanceAccumulator
+con los totales, los buckets por símbolo/hora/tipo y el final de la curva de
+equidad (equidad, pico y drawdown máximo). Al añadir una exportación solo se
+unen y agregan las órdenes nuevas y se combinan con ese estado, de modo que
+el coste es proporcional a las filas nuevas y no al histórico. El cubo de
+rendimiento (services.cube) se combina del mismo modo con el de las órdenes
+nuevas y el índice por tiempo (services.order_index) se extiende con ellas.
+Los round trips (services.positions) solo se recalculan para los símbolos
+con fills nuevos.
+
+Si las órdenes nuevas no son todas posteriores a las existentes (exportación
+fuera de orden), los agregados se recalculan completos a partir de las
+órdenes procesadas.
+"""
+import numpy as np
+import pandas as pd
+
+from services.aggregates import PerformanceAccumulator
+from services.cube import PerformanceCube, performance_cube_of
+from services.distributions import DistributionSketches
+from services.engines import get_engine
+from services.order_index import OrderIndex, order_index_of
+from services.positions import round_trips_of, update_round_trips
+from services.processed_orders import ProcessedOrders
+from services.timestamps import order_timestamps
+
+
+def append_trading_data(processed_data, orders_path, trades_path, tickets_path, engine=None):
+    """
+    Añade los datos de una nueva exportación a los datos procesados
+
+    Las órdenes que ya están en los datos procesados (mismo OrderID, hora y
+    Account) se ignoran, por lo que volver a subir una exportación no duplica
+    operaciones. El OrderID solo no basta: DAS lo reinicia cada día, así que
+    las órdenes de otro día con el mismo OrderID se conservan.
+
+    Args:
+        processed_data (dict): Resultado de process_trading_data (o de un append anterior)
+        orders_path (str): Ruta del CSV de órdenes nuevo
+        trades_path (str): Ruta del CSV de trades nuevo
+        tickets_path (str): Ruta del CSV de tickets nuevo
+        engine (str, optional): Motor usado para la ingesta y la unión
+
+    Returns:
+        dict: Datos procesados actualizados con el formato de process_trading_data
+    """
+    processing_engine = get_engine(engine)
+    existing = ProcessedOrders.from_records(processed_data.get('processed_orders') or [])
+
+    frames = processing_engine.ingest(orders_path, trades_path, tickets_path)
+    new_orders = ProcessedOrders.from_records(processing_engine.join(*frames))
+    new_orders = _drop_known_orders(existing, new_orders)
+
+    accumulator = processed_data.get('aggregate_state')
+    if accumulator is None:
+        # Cachés anteriores (o del motor de referencia): reconstruir el estado una vez
+        accumulator = PerformanceAccumulator().update(existing)
+        processed_data = dict(processed_data, **accumulator.to_result())
+        accumulator.compact()
+    elif accumulator.distributions is None:
+        # Estado anterior a los sketches de distribución: calcularlos una vez
+        accumulator.distributions = DistributionSketches().update(existing)
+
+    all_orders = ProcessedOrders.concat([existing, new_orders])
+    result = accumulator.append(PerformanceAccumulator().update(new_orders), processed_data)
+
+    if result is None:
+        print("[INFO] Órdenes nuevas anteriores a las existentes: recalculando todos los agregados")
+        accumulator = PerformanceAccumulator().update(all_orders)
+        result = accumulator.to_result()
+        accumulator.compact()
+
+    result['processed_orders'] = all_orders
+    result['aggregate_state'] = accumulator
+    result['performance_cube'] = performance_cube_of(processed_data).merge(PerformanceCube.from_orders(new_orders))
+
+    order_index = order_index_of(processed_data).extend(OrderIndex.from_orders(new_orders))
+    result['order_index'] = order_index if order_index is not None else OrderIndex.from_orders(all_orders)
+    result['round_trips'] = update_round_trips(round_trips_of(processed_data), all_orders, new_orders)
+    print(f"[INFO] Añadidas {len(new_orders)} órdenes a los datos procesados")
+    return result
+
+
+def _drop_known_orders(existing, new_orders):
+    """Descarta las órdenes nuevas ya procesadas (mismo OrderID, hora y Account)"""
+    if not len(existing) or not len(new_orders):
+        return new_orders
+
+    # Solo se comparan las claves completas de las órdenes con OrderID repetido
+    new_ids = _order_ids(new_orders)
+    existing_ids = _order_ids(existing)
+    candidates = np.flatnonzero(np.isin(new_ids, existing_ids))
+    if not len(candidates):
+        return new_orders
+
+    previous = existing.take(np.flatnonzero(np.isin(existing_ids, new_ids[candidates])))
+    known = np.zeros(len(new_orders), dtype=bool)
+    known[candidates] = np.isin(_execution_keys(new_orders.take(candidates)), _execution_keys(previous))
+    if not known.any():
+        return new_orders
+
+    print(f"[INFO] Se ignoran {int(known.sum())} órdenes ya procesadas")
+    return new_orders.take(np.flatnonzero(~known))
+
+
+def _order_ids(orders):
+    """OrderID de cada orden como texto"""
+    return pd.Series(orders.column('OrderID')).astype(str).str.strip().to_numpy(dtype=object)
+
+
+def _execution_keys(orders):
+    """Clave de cada orden que identifica una ejecución: OrderID, timestamp y Account"""
+    keys = pd.Series(_order_ids(orders)) + '|' + pd.Series(order_timestamps(orders)).astype(str)
+    if 'Account' in orders.columns:
+        keys = keys + '|' + pd.Series(orders.column('Account')).astype(str)
+    return keys.to_numpy(dtype=object)
@@ -0,0 +1,183 @@
+"""
+Carga y normalización de las exportaciones CSV de DAS Trader
+
+Define los tipos de cada columna de Orders/Trades/Tickets y una única
+forma de convertir los valores numéricos, de modo que todos los motores de
+procesamiento (y la ingesta por trozos) partan de los mismos DataFrames.
+
+Si pyarrow está instalado los CSV se parsean con pyarrow.csv, que reparte el
+trabajo entre varios hilos; si no, se usa pd.read_csv. Ambos lectores
+aplican los mismos tipos y devuelven DataFrames equivalentes.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+except ImportError:
+    pa = None
+    pa_csv = None
+
+# Columnas de texto de cada archivo (se leen siempre como str)
+STRING_COLUMNS = {
+    'orders': ['Trader', 'Branch', 'route', 'bkrsym', 'rrno', 'B/S', 'SHORT', 'Market', 'stop', 'symb', 'time'],
+    'trades': ['Trader', 'Branch', 'route', 'bkrsym', 'rrno', 'B/S', 'SHORT', 'Market', 'symb', 'time'],
+    'tickets': ['Trader', 'Branch', 'route', 'bkrsym', 'rrno', 'B/S', 'SHORT', 'Market', 'symb', 'time']
+}
+
+# Columnas numéricas de cada archivo (valores no numéricos o vacíos -> 0.0)
+NUMERIC_COLUMNS = {
+    'orders': ['qty', 'lvsqty', 'price', 'stopprice', 'trailprice'],
+    'trades': ['qty', 'price'],
+    'tickets': ['qty', 'price', 'commission', 'RouteFee']
+}
+
+EXPORT_KINDS = ('orders', 'trades', 'tickets')
+
+# Columnas de baja cardinalidad que se codifican como category (códigos
+# enteros + tabla de valores) desde la lectura hasta la caché
+CATEGORICAL_COLUMNS = ('symb', 'Trader', 'Account', 'Branch', 'route', 'B/S', 'SHORT', 'Market')
+
+# Lectores de CSV: 'auto' usa pyarrow si está instalado y pandas si no
+CSV_READERS = ('auto', 'pyarrow', 'pandas')
+
+
+def available_csv_readers():
+    """Lectores de CSV utilizables en este entorno"""
+    return ['pyarrow', 'pandas'] if pa_csv is not None else ['pandas']
+
+
+def read_export_csv(path, kind, reader='auto', **kwargs):
+    """
+    Lee un CSV de exportación con los tipos de texto explícitos
+
+    Las columnas de texto de CATEGORICAL_COLUMNS se codifican ya al parsear.
+
+    Args:
+        path (str): Ruta del archivo CSV
+        kind (str): 'orders', 'trades' o 'tickets'
+        reader (str, optional): 'auto', 'pyarrow' o 'pandas'
+        **kwargs: Argumentos adicionales para pd.read_csv (fuerzan el lector de pandas)
+
+    Returns:
+        DataFrame: Datos leídos (sin normalizar las columnas numéricas)
+    """
+    if reader not in CSV_READERS:
+        raise ValueError(f"Lector de CSV desconocido: '{reader}'. Disponibles: {CSV_READERS}")
+    if reader == 'pyarrow' and pa_csv is None:
+        raise ImportError('pyarrow no está instalado')
+
+    if reader != 'pandas' and pa_csv is not None and not kwargs:
+        return _read_csv_pyarrow(path, kind)
+    return _read_csv_pandas(path, kind, **kwargs)
+
+
+def _read_csv_pandas(path, kind, **kwargs):
+    """Lee un CSV de exportación con pd.read_csv (un solo hilo)"""
+    dtypes = {
+        column: 'category' if column in CATEGORICAL_COLUMNS else str
+        for column in STRING_COLUMNS[kind]
+    }
+    return pd.read_csv(path, dtype=dtypes, **kwargs)
+
+
+def _read_csv_pyarrow(path, kind):
+    """Lee un CSV de exportación con pyarrow.csv (varios hilos)"""
+    column_types = {
+        column: pa.dictionary(pa.int32(), pa.string()) if column in CATEGORICAL_COLUMNS else pa.string()
+        for column in STRING_COLUMNS[kind]
+    }
+    table = pa_csv.read_csv(
+        path,
+        read_options=pa_csv.ReadOptions(use_threads=True),
+        convert_options=pa_csv.ConvertOptions(column_types=column_types, strings_can_be_null=True)
+    )
+    frame = table.to_pandas()
+
+    # pyarrow devuelve None para los textos ausentes; pandas usa NaN
+    for column in STRING_COLUMNS[kind]:
+        if column in frame.columns and frame[column].dtype == object:
+            frame[column] = frame[column].where(frame[column].notna(), np.nan)
+    return frame
+
+
+def normalize_frame(frame, kind):
+    """
+    Convierte (en el sitio) las columnas numéricas de un DataFrame de exportación
+
+    También codifica como category las columnas de CATEGORICAL_COLUMNS que no
+    lo estén (p. ej. Account, que conserva su tipo numérico).
+
+    Args:
+        frame (DataFrame): Datos de una exportación
+        kind (str): 'orders', 'trades' o 'tickets'
+
+    Returns:
+        DataFrame: El mismo DataFrame normalizado
+    """
+    for column in NUMERIC_COLUMNS[kind]:
+        if column in frame.columns:
+            frame[column] = pd.to_numeric(frame[column], errors='coerce').fillna(0.0).astype(float)
+    for column in CATEGORICAL_COLUMNS:
+        if column in frame.columns and not isinstance(frame[column].dtype, pd.CategoricalDtype):
+            frame[column] = frame[column].astype('category')
+    return frame
+
+
+def load_export_frames(orders_path, trades_path, tickets_path, snapshot_dir=None):
+    """
+    Carga y normaliza los tres archivos de una exportación
+
+    El archivo de tickets es opcional: si no existe o está vacío se devuelve
+    un DataFrame vacío y los trades quedan sin comisiones.
+
+    Args:
+        orders_path (str): Ruta del CSV de órdenes
+        trades_path (str): Ruta del CSV de trades
+        tickets_path (str): Ruta del CSV de tickets
+        snapshot_dir (str, optional): Directorio de instantáneas binarias
+            (services.snapshot); si se indica, cada CSV se carga de su
+            instantánea cuando está al día y se crea tras parsearlo si no
+
+    Returns:
+        tuple: (orders_df, trades_df, tickets_df)
+    """
+    orders_df = load_export_frame(orders_path, 'orders', snapshot_dir)
+    trades_df = load_export_frame(trades_path, 'trades', snapshot_dir)
+
+    if tickets_path and os.path.exists(tickets_path) and os.path.getsize(tickets_path) > 0:
+        tickets_df = load_export_frame(tickets_path, 'tickets', snapshot_dir)
+    else:
+        tickets_df = pd.DataFrame()
+
+    return orders_df, trades_df, tickets_df
+
+
+def load_export_frame(path, kind, snapshot_dir=None):
+    """
+    Carga y normaliza un CSV de exportación (o su instantánea binaria)
+
+    Args:
+        path (str): Ruta del CSV
+        kind (str): 'orders', 'trades' o 'tickets'
+        snapshot_dir (str, optional): Directorio de instantáneas binarias
+
+    Returns:
+        DataFrame: Datos normalizados
+    """
+    if snapshot_dir:
+        # Importación diferida: las instantáneas solo se usan si se configuran
+        from services.snapshot import load_snapshot, write_snapshot
+
+        frame = load_snapshot(snapshot_dir, path, kind)
+        if frame is not None:
+            return frame
+
+    frame = normalize_frame(read_export_csv(path, kind), kind)
+
+    if snapshot_dir:
+        write_snapshot(snapshot_dir, path, kind, frame)
+    return frame
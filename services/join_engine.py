@@ -0,0 +1,290 @@
+"""
+Motor de unión vectorizado entre órdenes, trades y tickets
+
+Sustituye el recorrido fila a fila (iterrows + get_group) por operaciones
+sobre arrays: los trades se ordenan una sola vez por OrderID y todas las
+sumas por orden se obtienen con np.add.reduceat sobre esos segmentos.
+"""
+import math
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from services.processed_orders import ProcessedOrders, TRADES_KEY
+from services.timestamps import KNOWN_TIME_FORMATS, NAT, dates_of, hours_of, parse_timestamps
+
+# Formatos de fecha/hora de las exportaciones de DAS Trader
+DEFAULT_TIME_FORMATS = KNOWN_TIME_FORMATS
+
+# Campos calculados que se añaden a cada orden tras la unión
+ORDER_RESULT_FIELDS = ['totalQty', 'avgPrice', 'totalCommission', 'totalRouteFee', 'pnl', 'hour', 'date', 'timestamp']
+
+
+def join_orders(orders_df, trades_df, tickets_df, time_formats=DEFAULT_TIME_FORMATS):
+    """
+    Relaciona órdenes con trades y tickets de forma vectorizada
+
+    Args:
+        orders_df (DataFrame): Órdenes exportadas de DAS Trader
+        trades_df (DataFrame): Ejecuciones (fills) de las órdenes
+        tickets_df (DataFrame): Tickets con comisiones y RouteFee por trade
+        time_formats (tuple, optional): Formatos candidatos para la columna 'time'
+            (se detecta automáticamente cuál usa la exportación)
+
+    Returns:
+        ProcessedOrders: Órdenes procesadas con los mismos campos que la implementación por filas
+    """
+    if orders_df.empty or trades_df.empty:
+        return ProcessedOrders.empty()
+
+    trades = _attach_ticket_fees(trades_df, tickets_df)
+
+    # Ordenar los trades una única vez por OrderID (orden estable para
+    # conservar el orden original de los fills dentro de cada orden)
+    trade_order_ids = trades['OrderID'].to_numpy()
+    perm = np.argsort(trade_order_ids, kind='stable')
+    trades = trades.iloc[perm].reset_index(drop=True)
+    sorted_ids = trade_order_ids[perm]
+
+    starts = np.flatnonzero(np.r_[True, sorted_ids[1:] != sorted_ids[:-1]])
+    ends = np.r_[starts[1:], len(sorted_ids)]
+    group_ids = sorted_ids[starts]
+
+    # Sumas por orden en una sola pasada
+    qty = trades['qty'].to_numpy()
+    price = trades['price'].to_numpy()
+    group_qty = np.add.reduceat(qty, starts)
+    group_notional = np.add.reduceat(qty * price, starts)
+    group_commission = np.add.reduceat(trades['commission'].to_numpy(dtype=float), starts)
+    group_route_fee = np.add.reduceat(trades['routeFee'].to_numpy(dtype=float), starts)
+
+    # Localizar el grupo de trades de cada orden
+    order_ids = orders_df['OrderID'].to_numpy()
+    pos = np.searchsorted(group_ids, order_ids)
+    pos = np.clip(pos, 0, len(group_ids) - 1)
+    has_trades = group_ids[pos] == order_ids
+
+    # Solo incluir órdenes que tienen trades
+    orders = orders_df.loc[has_trades]
+    pos = pos[has_trades]
+
+    total_qty = group_qty[pos]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        avg_price = np.where(total_qty > 0, group_notional[pos] / total_qty, 0.0)
+    total_commission = group_commission[pos]
+    total_route_fee = group_route_fee[pos]
+
+    # Calcular P&L: compra -> precio orden - precio medio; venta -> al revés
+    order_price = pd.to_numeric(orders['price'], errors='coerce').to_numpy(dtype=float)
+    is_buy = (orders['B/S'] == 'B').to_numpy()
+    spread = np.where(is_buy, order_price - avg_price, avg_price - order_price)
+    pnl = np.where(total_qty > 0, spread * total_qty, 0.0)
+    pnl = pnl - total_commission - total_route_fee
+
+    # Parsear la fecha/hora una sola vez; hora y fecha se derivan del timestamp
+    timestamps = parse_timestamps(orders['time'], time_formats)
+
+    # Reordenar los fills para que los de cada orden queden contiguos
+    # (en el mismo orden que las órdenes) y queden indexados por offsets
+    fill_starts = starts[pos]
+    fill_lengths = ends[pos] - fill_starts
+    fill_offsets = np.r_[0, np.cumsum(fill_lengths)].astype(np.int64)
+    fill_index = np.arange(fill_offsets[-1], dtype=np.int64) - np.repeat(fill_offsets[:-1] - fill_starts, fill_lengths)
+
+    # .values conserva las columnas category (códigos + tabla de valores)
+    columns = {name: orders[name].values for name in orders.columns}
+    columns.update({
+        'totalQty': total_qty,
+        'avgPrice': avg_price,
+        'totalCommission': total_commission,
+        'totalRouteFee': total_route_fee,
+        'pnl': pnl,
+        'hour': hours_of(timestamps),
+        'date': dates_of(timestamps),
+        'timestamp': timestamps
+    })
+    fill_columns = {name: trades[name].values[fill_index] for name in trades.columns}
+    order_keys = list(orders.columns) + [TRADES_KEY] + ORDER_RESULT_FIELDS
+
+    return ProcessedOrders(columns, fill_columns, fill_offsets, order_keys)
+
+
+def _attach_ticket_fees(trades_df, tickets_df):
+    """Añade las columnas commission y routeFee del ticket de cada trade"""
+    trades = trades_df.copy()
+
+    if tickets_df.empty or 'TradeID' not in tickets_df.columns:
+        trades['commission'] = 0.0
+        trades['routeFee'] = 0.0
+        return trades
+
+    # Si hay tickets repetidos para un TradeID prevalece el último
+    tickets = tickets_df.drop_duplicates('TradeID', keep='last').set_index('TradeID')
+    matched = trades['TradeID'].isin(tickets.index)
+
+    for source, target in (('commission', 'commission'), ('RouteFee', 'routeFee')):
+        if source in tickets.columns:
+            values = pd.to_numeric(tickets[source], errors='coerce').fillna(0.0)
+            trades[target] = trades['TradeID'].map(values).where(matched, 0.0).astype(float)
+        else:
+            trades[target] = 0.0
+
+    return trades
+
+
+def join_orders_reference(orders_df, trades_df, tickets_df, time_formats=DEFAULT_TIME_FORMATS):
+    """
+    Implementación de referencia fila a fila (la original de _process_orders)
+
+    Se conserva para verificar la paridad del motor vectorizado; no debe
+    usarse en el flujo normal porque es O(n) en llamadas a iterrows.
+    Devuelve una lista de diccionarios.
+    """
+    processed_orders = []
+
+    trades_by_order = trades_df.groupby('OrderID')
+    tickets_dict = {row['TradeID']: row for _, row in tickets_df.iterrows()} if not tickets_df.empty else {}
+
+    for _, order in orders_df.iterrows():
+        order_id = order['OrderID']
+        order_trades = []
+
+        if order_id in trades_by_order.groups:
+            order_trades_df = trades_by_order.get_group(order_id)
+
+            for _, trade in order_trades_df.iterrows():
+                trade_dict = trade.to_dict()
+                trade_id = trade['TradeID']
+
+                if trade_id in tickets_dict:
+                    ticket = tickets_dict[trade_id]
+                    trade_dict['commission'] = _safe_float(ticket.get('commission', 0))
+                    trade_dict['routeFee'] = _safe_float(ticket.get('RouteFee', 0))
+                else:
+                    trade_dict['commission'] = 0.0
+                    trade_dict['routeFee'] = 0.0
+
+                order_trades.append(trade_dict)
+
+        total_qty = sum(_safe_float(t['qty']) for t in order_trades) if order_trades else 0
+
+        if total_qty > 0:
+            avg_price = sum(_safe_float(t['qty']) * _safe_float(t['price']) for t in order_trades) / total_qty
+        else:
+            avg_price = 0
+
+        total_commission = sum(_safe_float(t['commission']) for t in order_trades)
+        total_route_fee = sum(_safe_float(t['routeFee']) for t in order_trades)
+
+        pnl = 0
+        order_price = _safe_float(order['price'])
+
+        if order['B/S'] == 'B':
+            pnl = (order_price - avg_price) * total_qty if total_qty > 0 else 0
+        else:
+            pnl = (avg_price - order_price) * total_qty if total_qty > 0 else 0
+
+        pnl = pnl - total_commission - total_route_fee
+
+        time_str = order['time']
+        hour = 0
+        date = ""
+        timestamp = NAT
+
+        for fmt in time_formats:
+            try:
+                dt = datetime.strptime(time_str, fmt)
+                hour = dt.hour
+                date = dt.strftime('%Y-%m-%d')
+                timestamp = pd.Timestamp(dt).value
+                break
+            except (ValueError, TypeError):
+                continue
+
+        processed_order = order.to_dict()
+        processed_order.update({
+            'trades': order_trades,
+            'totalQty': total_qty,
+            'avgPrice': avg_price,
+            'totalCommission': total_commission,
+            'totalRouteFee': total_route_fee,
+            'pnl': pnl,
+            'hour': hour,
+            'date': date,
+            'timestamp': timestamp
+        })
+
+        if order_trades:
+            processed_orders.append(processed_order)
+
+    return processed_orders
+
+
+def compare_processed_orders(expected, actual, rel_tol=1e-9, abs_tol=1e-9):
+    """
+    Compara dos listas de órdenes procesadas campo a campo
+
+    Args:
+        expected (list): Resultado de la implementación de referencia
+        actual (list or ProcessedOrders): Resultado a verificar
+        rel_tol (float, optional): Tolerancia relativa para valores numéricos
+        abs_tol (float, optional): Tolerancia absoluta para valores numéricos
+
+    Returns:
+        list: Descripción de cada diferencia encontrada (vacía si hay paridad)
+    """
+    differences = []
+
+    if len(expected) != len(actual):
+        differences.append(f"Número de órdenes distinto: {len(expected)} != {len(actual)}")
+        return differences
+
+    for index, (left, right) in enumerate(zip(expected, actual)):
+        if list(left.keys()) != list(right.keys()):
+            differences.append(f"Orden {index}: campos distintos {list(left.keys())} != {list(right.keys())}")
+            continue
+
+        for key, left_value in left.items():
+            right_value = right[key]
+
+            if key == 'trades':
+                nested = compare_processed_orders(left_value, right_value, rel_tol, abs_tol)
+                differences.extend(f"Orden {index} -> trades: {diff}" for diff in nested)
+            elif not _values_match(left_value, right_value, rel_tol, abs_tol):
+                differences.append(f"Orden {index}, campo '{key}': {left_value!r} != {right_value!r}")
+
+    return differences
+
+
+def verify_join_parity(orders_df, trades_df, tickets_df, time_formats=DEFAULT_TIME_FORMATS):
+    """
+    Ejecuta la implementación de referencia y la vectorizada sobre los mismos datos
+
+    Returns:
+        list: Diferencias encontradas (vacía si ambas implementaciones coinciden)
+    """
+    expected = join_orders_reference(orders_df, trades_df, tickets_df, time_formats)
+    actual = join_orders(orders_df, trades_df, tickets_df, time_formats)
+    return compare_processed_orders(expected, actual)
+
+
+def _values_match(left, right, rel_tol, abs_tol):
+    """Compara dos valores escalares tolerando NaN y pequeñas diferencias numéricas"""
+    left_is_number = isinstance(left, (int, float, np.integer, np.floating)) and not isinstance(left, bool)
+    right_is_number = isinstance(right, (int, float, np.integer, np.floating)) and not isinstance(right, bool)
+
+    if left_is_number and right_is_number:
+        if math.isnan(left) or math.isnan(right):
+            return math.isnan(left) and math.isnan(right)
+        return math.isclose(left, right, rel_tol=rel_tol, abs_tol=abs_tol)
+
+    return left == right
+
+
+def _safe_float(value):
+    """Convierte un valor a float de forma segura"""
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return 0.0
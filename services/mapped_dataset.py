@@ -0,0 +1,197 @@
+"""
+Formato en disco del conjunto de datos procesado, mapeable en memoria
+
+Cada clave del diccionario de datos procesados (metrics, cada desglose,
+equity_series, equity_curve, processed_orders, el cubo, los índices...) se
+guarda como una sección independiente: un pickle (protocolo 5) cuyos arrays
+de NumPy se escriben fuera de banda, cada uno alineado a ALIGNMENT bytes, en
+el mismo archivo. Las columnas de texto de ProcessedOrders se guardan
+codificadas (códigos y tabla de valores de ancho fijo) para que también sean
+arrays:
+
+    MAGIC | offset y longitud de la cabecera | secciones | cabecera JSON
+
+La cabecera indica, por sección, la posición de su pickle y de cada uno de
+sus arrays. Al cargar con mapped=True el archivo se mapea en memoria de solo
+lectura y se devuelve un MappedDataset: cada sección se deserializa la
+primera vez que se accede a ella y sus arrays son vistas del mapeo, sin
+copiarse. Así una vista solo lee las secciones que usa (el dashboard no toca
+las órdenes ni sus fills) y todos los procesos que cargan el mismo archivo
+(por ejemplo, los workers de gunicorn) comparten sus páginas a través de la
+caché de páginas del sistema.
+
+El archivo nunca se modifica en el sitio (se sustituye con os.replace): un
+proceso que siga usando el mapeo anterior conserva el archivo antiguo hasta
+que lo suelta, y el siguiente acceso mapea el nuevo.
+"""
+import io
+import json
+import mmap
+import pickle
+import struct
+import threading
+from collections.abc import Mapping
+
+from services.processed_orders import ProcessedOrders
+
+# Firma y versión del formato
+MAGIC = b'DASMAP02'
+
+# Alineación de cada array dentro del archivo
+ALIGNMENT = 64
+
+# MAGIC + offset y longitud de la cabecera JSON
+_PREFIX = struct.Struct('<8sQQ')
+
+
+class _DatasetPickler(pickle.Pickler):
+    """Pickler que guarda ProcessedOrders con las columnas de texto codificadas"""
+
+    def reducer_override(self, obj):
+        if type(obj) is ProcessedOrders:
+            return obj.with_encoded_text().__reduce_ex__(5)
+        return NotImplemented
+
+
+class MappedDataset(Mapping):
+    """
+    Datos procesados mapeados en memoria, con carga perezosa por sección
+
+    Se comporta como un diccionario de solo lectura con las mismas claves que
+    el resultado de process_trading_data. Comprobar si existe una clave,
+    recorrer las claves o contarlas no deserializa ninguna sección.
+    """
+
+    def __init__(self, view, sections):
+        """
+        Args:
+            view (memoryview): Contenido del archivo
+            sections (dict): Nombre -> posición del pickle y de los arrays
+        """
+        self._view = view
+        self._sections = sections
+        self._loaded = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name):
+        if name in self._loaded:
+            return self._loaded[name]
+
+        section = self._sections[name]
+        with self._lock:
+            if name not in self._loaded:
+                self._loaded[name] = _load_section(self._view, section)
+            return self._loaded[name]
+
+    def __iter__(self):
+        return iter(self._sections)
+
+    def __len__(self):
+        return len(self._sections)
+
+    def __contains__(self, name):
+        return name in self._sections
+
+    @property
+    def loaded_sections(self):
+        """Secciones ya deserializadas"""
+        return list(self._loaded)
+
+    def section_size(self, name):
+        """Bytes en disco de una sección (pickle y arrays)"""
+        section = self._sections[name]
+        return section['pickle'][1] + sum(size for _, size in section['buffers'])
+
+    def to_dict(self):
+        """Deserializa todas las secciones en un diccionario"""
+        return {name: self[name] for name in self}
+
+
+def is_mapped_dataset(path):
+    """
+    Indica si un archivo tiene el formato mapeable
+
+    Args:
+        path (str): Ruta del archivo
+
+    Returns:
+        bool: True si empieza por MAGIC
+    """
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def write_dataset(data, f):
+    """
+    Escribe los datos procesados, una sección por clave, en un archivo binario
+
+    Args:
+        data (dict): Datos procesados
+        f (file): Archivo abierto para escritura (al inicio)
+    """
+    f.write(_PREFIX.pack(MAGIC, 0, 0))
+    position = _PREFIX.size
+    sections = {}
+
+    for name, value in data.items():
+        buffers = []
+        output = io.BytesIO()
+        _DatasetPickler(output, protocol=5, buffer_callback=buffers.append).dump(value)
+        payload = output.getbuffer()
+
+        section = {'pickle': [position, len(payload)], 'buffers': []}
+        f.write(payload)
+        position += len(payload)
+
+        for buffer in buffers:
+            raw = buffer.raw()
+            padding = -position % ALIGNMENT
+            f.write(b'\0' * padding)
+            position += padding
+            section['buffers'].append([position, raw.nbytes])
+            f.write(raw)
+            position += raw.nbytes
+        sections[name] = section
+
+    header = json.dumps({'sections': sections}).encode('utf-8')
+    f.write(header)
+    f.seek(0)
+    f.write(_PREFIX.pack(MAGIC, position, len(header)))
+
+
+def read_dataset(path, mapped=True):
+    """
+    Carga los datos procesados escritos con write_dataset
+
+    Args:
+        path (str): Ruta del archivo
+        mapped (bool, optional): Mapear el archivo y cargar cada sección al
+            usarla (arrays de solo lectura y compartidos entre procesos); con
+            False se lee todo en memoria propia y los arrays se pueden modificar
+
+    Returns:
+        MappedDataset or dict: Datos procesados
+    """
+    with open(path, 'rb') as f:
+        if mapped:
+            content = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            content = bytearray(f.read())
+
+    view = memoryview(content)
+    magic, header_offset, header_length = _PREFIX.unpack_from(view)
+    if magic != MAGIC:
+        raise ValueError(f"{path} no tiene el formato de datos mapeable")
+
+    layout = json.loads(bytes(view[header_offset:header_offset + header_length]))
+    dataset = MappedDataset(view, layout['sections'])
+    return dataset if mapped else dataset.to_dict()
+
+
+def _load_section(view, section):
+    """Deserializa una sección con sus arrays como vistas del contenido"""
+    start, length = section['pickle']
+    return pickle.loads(
+        view[start:start + length],
+        buffers=[view[offset:offset + size] for offset, size in section['buffers']]
+    )
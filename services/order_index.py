@@ -0,0 +1,209 @@
+"""
+Índice de órdenes por tiempo y por símbolo
+
+Al procesar los datos se guarda, junto a las órdenes, un índice con:
+
+- la permutación que las ordena cronológicamente y los timestamps ya
+  ordenados, de modo que un rango de fechas se resuelve con dos búsquedas
+  binarias (np.searchsorted);
+- una lista de posiciones (posting list) por símbolo, en orden
+  cronológico, de modo que filtrar por símbolos solo recorre las órdenes de
+  esos símbolos dentro del rango.
+
+Así las vistas filtradas (dashboard, operaciones) solo tocan las órdenes
+seleccionadas y no recorren la lista completa.
+"""
+import numpy as np
+import pandas as pd
+
+from services.analytics import dimension_values
+from services.processed_orders import as_processed_orders, to_native
+from services.timestamps import NAT, NS_PER_DAY, chronological_order, order_timestamps
+
+
+class OrderIndex:
+    """Índice cronológico y por símbolo de las órdenes procesadas"""
+
+    def __init__(self, order, timestamps, postings):
+        """
+        Args:
+            order (ndarray): Índices de las órdenes en orden cronológico
+            timestamps (ndarray): Timestamps (ns) ya ordenados
+            postings (dict): Símbolo -> posiciones (en el orden cronológico) de sus órdenes
+        """
+        self.order = order
+        self.timestamps = timestamps
+        self.postings = postings
+
+    @classmethod
+    def from_orders(cls, orders):
+        """
+        Construye el índice de unas órdenes procesadas
+
+        Args:
+            orders (ProcessedOrders or list): Órdenes procesadas
+
+        Returns:
+            OrderIndex: Índice de las órdenes
+        """
+        orders = as_processed_orders(orders)
+        timestamps = order_timestamps(orders)
+        order = chronological_order(timestamps)
+
+        postings = {}
+        if len(orders) and 'symb' in orders.columns:
+            codes, uniques = pd.factorize(orders.categorical('symb')[order])
+            # Orden estable por símbolo: cada grupo conserva el orden cronológico
+            # (las órdenes sin símbolo, código -1, quedan al principio)
+            by_symbol = np.argsort(codes, kind='stable')
+            counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+            ends = np.cumsum(counts) + int((codes < 0).sum())
+            for code, symbol in enumerate(uniques):
+                postings[to_native(symbol)] = by_symbol[ends[code] - counts[code]:ends[code]]
+
+        return cls(order, timestamps[order], postings)
+
+    def __len__(self):
+        return len(self.order)
+
+    def symbols(self):
+        """Símbolos indexados en orden alfabético"""
+        return sorted(self.postings, key=str)
+
+    def extend(self, other):
+        """
+        Añade el índice de órdenes nuevas concatenadas a continuación
+
+        Solo es posible si las órdenes nuevas no son anteriores a las
+        existentes; en ese caso basta con concatenar desplazando las
+        posiciones, sin volver a ordenar.
+
+        Args:
+            other (OrderIndex): Índice de las órdenes nuevas
+
+        Returns:
+            OrderIndex or None: Índice combinado o None si hay que reconstruirlo
+        """
+        offset = len(self.order)
+        if offset and len(other) and other.timestamps[0] < self.timestamps[-1]:
+            return None
+
+        postings = dict(self.postings)
+        for symbol, positions in other.postings.items():
+            shifted = positions + offset
+            postings[symbol] = np.concatenate([postings[symbol], shifted]) if symbol in postings else shifted
+
+        return OrderIndex(
+            np.concatenate([self.order, other.order + offset]),
+            np.concatenate([self.timestamps, other.timestamps]),
+            postings
+        )
+
+    def select(self, start=None, end=None, symbols=None):
+        """
+        Índices de las órdenes de un rango de tiempo y de unos símbolos
+
+        Args:
+            start (int, optional): Primer timestamp incluido (ns)
+            end (int, optional): Primer timestamp excluido (ns)
+            symbols (list, optional): Símbolos permitidos
+
+        Returns:
+            ndarray: Índices de las órdenes seleccionadas en orden cronológico
+        """
+        if start is None and end is not None:
+            # Con un límite de fechas se excluyen las órdenes sin hora válida
+            # (NAT, al principio del índice), igual que en el filtro del cubo
+            start = NAT + 1
+        low = 0 if start is None else int(np.searchsorted(self.timestamps, start, side='left'))
+        high = len(self.order) if end is None else int(np.searchsorted(self.timestamps, end, side='left'))
+        high = max(low, high)
+
+        if symbols is None:
+            return self.order[low:high]
+
+        parts = []
+        for symbol in symbols:
+            positions = self.postings.get(symbol)
+            if positions is None:
+                continue
+            first, last = np.searchsorted(positions, [low, high], side='left')
+            parts.append(positions[first:last])
+
+        if not parts:
+            return np.array([], dtype=self.order.dtype)
+        positions = parts[0] if len(parts) == 1 else np.sort(np.concatenate(parts), kind='stable')
+        return self.order[positions]
+
+
+def order_index_of(processed_data):
+    """
+    Devuelve el índice de órdenes de unos datos procesados
+
+    Para cachés anteriores al índice se construye a partir de processed_orders.
+
+    Args:
+        processed_data (dict): Datos procesados
+
+    Returns:
+        OrderIndex: Índice de las órdenes
+    """
+    index = processed_data.get('order_index')
+    if index is None:
+        index = OrderIndex.from_orders(processed_data.get('processed_orders') or [])
+    return index
+
+
+def filtered_rows(processed_data, filters=None, date_from=None, date_to=None):
+    """
+    Índices de las órdenes que cumplen unos filtros (formato de services.cube.query_filters)
+
+    El rango de fechas y los símbolos se resuelven con el índice; el resto de
+    filtros (trader, tipo) se aplican solo sobre las órdenes ya seleccionadas.
+
+    Args:
+        processed_data (dict): Datos procesados
+        filters (dict, optional): Dimensión -> valores permitidos
+        date_from (str, optional): Primera fecha incluida ('YYYY-MM-DD')
+        date_to (str, optional): Última fecha incluida ('YYYY-MM-DD')
+
+    Returns:
+        ndarray: Índices de las órdenes seleccionadas en orden cronológico
+    """
+    filters = dict(filters or {})
+    start, end = time_range(date_from, date_to)
+    rows = order_index_of(processed_data).select(start, end, filters.pop('symbol', None))
+
+    if filters and len(rows):
+        orders = as_processed_orders(processed_data.get('processed_orders') or []).take(rows)
+        mask = np.ones(len(rows), dtype=bool)
+        for name, allowed in filters.items():
+            mask &= pd.Series(dimension_values(orders, name)).isin(list(allowed)).to_numpy()
+        rows = rows[mask]
+
+    return rows
+
+
+def time_range(date_from=None, date_to=None):
+    """
+    Convierte un rango de fechas en timestamps para OrderIndex.select
+
+    Args:
+        date_from (str, optional): Primera fecha incluida ('YYYY-MM-DD')
+        date_to (str, optional): Última fecha incluida ('YYYY-MM-DD')
+
+    Returns:
+        tuple: (start, end) en ns; None donde no hay límite o la fecha no es válida
+    """
+    return _parse_date(date_from), _parse_date(date_to, NS_PER_DAY)
+
+
+def _parse_date(value, offset=0):
+    """Timestamp (ns) de una fecha más un desplazamiento; None si no es válida"""
+    if not value:
+        return None
+    try:
+        return pd.Timestamp(value).normalize().value + offset
+    except (ValueError, TypeError):
+        print(f"[ERROR] Fecha de filtro no válida: {value}")
+        return None
@@ -0,0 +1,179 @@
+"""
+Procesamiento en paralelo particionado por cuenta (Account)
+
+Todos los fills de una orden pertenecen a la cuenta de la orden, así que la
+unión órdenes/trades/tickets y la agregación se pueden hacer por separado
+para cada cuenta. Los CSV se cargan una sola vez; las órdenes se reparten
+por Account, cada trade va a la partición de su orden y cada ticket a la de
+su trade. Las particiones se agrupan en bloques de tamaño parecido y se
+procesan en un ProcessPoolExecutor; cada proceso devuelve su
+PerformanceAccumulator, sus órdenes procesadas, su cubo de rendimiento y
+sus round trips (que también son independientes por cuenta).
+
+Los resultados parciales se combinan en el mismo diccionario que produce
+process_trading_data: el cubo combinado alimenta las vistas por trader y
+las órdenes procesadas conservan el orden del CSV. La posición de cada
+orden en el CSV desempata los timestamps iguales de cuentas distintas, de
+modo que la curva de equidad es la misma que sin particionar.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from services.aggregates import PerformanceAccumulator
+from services.cube import PerformanceCube
+from services.data_processor import _get_empty_result
+from services.engines import get_engine
+from services.order_index import OrderIndex
+from services.positions import RoundTripBook
+from services.processed_orders import ProcessedOrders
+
+# Bloques de cuentas por proceso (equilibra cuentas con muchas órdenes)
+_BLOCKS_PER_WORKER = 4
+
+
+def process_trading_data_partitioned(orders_path, trades_path, tickets_path, max_workers=None, engine=None,
+                                     snapshot_dir=None):
+    """
+    Procesa los datos de trading repartiendo las cuentas entre procesos
+
+    Args:
+        orders_path (str): Ruta del CSV de órdenes
+        trades_path (str): Ruta del CSV de trades
+        tickets_path (str): Ruta del CSV de tickets
+        max_workers (int, optional): Número de procesos; por defecto os.cpu_count()
+        engine (str, optional): Motor usado para la ingesta y la unión de cada partición
+        snapshot_dir (str, optional): Directorio de instantáneas binarias de los CSV
+
+    Returns:
+        dict: Mismo formato que process_trading_data
+    """
+    try:
+        processing_engine = get_engine(engine)
+        frames = processing_engine.ingest(orders_path, trades_path, tickets_path, snapshot_dir)
+        max_workers = max_workers or os.cpu_count() or 1
+
+        partitions = partition_by_account(*frames, blocks=max_workers * _BLOCKS_PER_WORKER)
+        partials = _run_partitions(partitions, max_workers, engine)
+
+        accumulator = PerformanceAccumulator()
+        cube = PerformanceCube.empty()
+        parts, positions, books = [], [], []
+        for rows, partition_accumulator, processed_orders, partition_cube, book in partials:
+            accumulator.merge(partition_accumulator)
+            cube = cube.merge(partition_cube)
+            parts.append(processed_orders)
+            positions.append(rows)
+            books.append(book)
+
+        # Volver al orden del CSV de órdenes
+        processed_orders = ProcessedOrders.concat(parts)
+        if len(processed_orders):
+            processed_orders = processed_orders.take(np.argsort(np.concatenate(positions), kind='stable'))
+
+        result = accumulator.to_result()
+        result['processed_orders'] = processed_orders
+        result['aggregate_state'] = accumulator.compact()
+        result['performance_cube'] = cube
+        result['order_index'] = OrderIndex.from_orders(processed_orders)
+        result['round_trips'] = RoundTripBook.concat(books)
+        print(f"[INFO] Procesadas {len(partitions)} particiones por cuenta con {min(max_workers, len(partitions))} procesos")
+        return result
+
+    except Exception as e:
+        print(f"Error procesando datos por cuentas: {e}")
+        return _get_empty_result()
+
+
+def partition_by_account(orders_df, trades_df, tickets_df, blocks=1):
+    """
+    Reparte órdenes, trades y tickets en bloques de cuentas completas
+
+    Args:
+        orders_df (DataFrame): Órdenes normalizadas
+        trades_df (DataFrame): Trades normalizados
+        tickets_df (DataFrame): Tickets normalizados
+        blocks (int, optional): Número máximo de bloques
+
+    Returns:
+        list: Tuplas (posiciones de las órdenes en el CSV, orders_df, trades_df, tickets_df) por bloque
+    """
+    if orders_df.empty or 'Account' not in orders_df.columns:
+        return [(np.arange(len(orders_df)), orders_df, trades_df, tickets_df)]
+
+    # Cuenta -> bloque: asignación voraz de las cuentas más grandes al bloque con menos órdenes
+    accounts, names = pd.factorize(orders_df['Account'], use_na_sentinel=False)
+    sizes = np.bincount(accounts, minlength=len(names))
+    blocks = max(1, min(int(blocks), len(names)))
+    loads = np.zeros(blocks, dtype=np.int64)
+    block_of_account = np.zeros(len(names), dtype=np.int64)
+    for account in np.argsort(-sizes, kind='stable'):
+        block = int(np.argmin(loads))
+        block_of_account[account] = block
+        loads[block] += sizes[account]
+    order_blocks = block_of_account[accounts]
+
+    # Cada trade va al bloque de su orden y cada ticket al de su trade
+    order_block_by_id = pd.Series(order_blocks, index=orders_df['OrderID'].to_numpy())
+    order_block_by_id = order_block_by_id[~order_block_by_id.index.duplicated(keep='first')]
+    trade_blocks = trades_df['OrderID'].map(order_block_by_id).fillna(-1).to_numpy(dtype=np.int64)
+
+    ticket_blocks = np.full(len(tickets_df), -1, dtype=np.int64)
+    if len(tickets_df) and 'TradeID' in tickets_df.columns:
+        trade_block_by_id = pd.Series(trade_blocks, index=trades_df['TradeID'].to_numpy())
+        trade_block_by_id = trade_block_by_id[~trade_block_by_id.index.duplicated(keep='last')]
+        ticket_blocks = tickets_df['TradeID'].map(trade_block_by_id).fillna(-1).to_numpy(dtype=np.int64)
+
+    partitions = []
+    for block in range(blocks):
+        rows = np.flatnonzero(order_blocks == block)
+        if not len(rows):
+            continue
+        partitions.append((
+            rows,
+            orders_df.iloc[rows].reset_index(drop=True),
+            trades_df.iloc[np.flatnonzero(trade_blocks == block)].reset_index(drop=True),
+            tickets_df.iloc[np.flatnonzero(ticket_blocks == block)].reset_index(drop=True)
+        ))
+    return partitions
+
+
+def process_account_partition(partition, engine=None):
+    """
+    Une y agrega un bloque de cuentas (se ejecuta en un proceso del pool)
+
+    Args:
+        partition (tuple): Bloque devuelto por partition_by_account
+        engine (str, optional): Motor usado para la unión
+
+    Returns:
+        tuple: (posiciones en el CSV de las órdenes procesadas, PerformanceAccumulator,
+                ProcessedOrders, PerformanceCube, RoundTripBook)
+    """
+    rows, orders_df, trades_df, tickets_df = partition
+    processed_orders = ProcessedOrders.from_records(get_engine(engine).join(orders_df, trades_df, tickets_df))
+
+    # Las uniones solo conservan (en su orden) las órdenes con algún trade
+    if trades_df.empty:
+        rows = rows[:0]
+    else:
+        rows = rows[orders_df['OrderID'].isin(trades_df['OrderID']).to_numpy()]
+
+    return (
+        rows,
+        PerformanceAccumulator().update(processed_orders, sequence=rows),
+        processed_orders,
+        PerformanceCube.from_orders(processed_orders),
+        RoundTripBook.from_orders(processed_orders, max_workers=1)
+    )
+
+
+def _run_partitions(partitions, max_workers, engine):
+    """Ejecuta process_account_partition para cada bloque, en paralelo si hay más de uno"""
+    if len(partitions) == 1 or max_workers == 1:
+        return [process_account_partition(partition, engine) for partition in partitions]
+
+    with ProcessPoolExecutor(max_workers=min(max_workers, len(partitions))) as executor:
+        return list(executor.map(process_account_partition, partitions, [engine] * len(partitions)))
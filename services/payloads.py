@@ -0,0 +1,117 @@
+"""
+JSON pre-serializado de los gráficos
+
+Las vistas incrustan en la página los datos de sus gráficos como JSON. Sin
+filtros, esos datos solo cambian cuando cambia el conjunto de datos, así que
+se serializan una sola vez al guardar los datos procesados: cada vista
+registra con register_chart_payload cómo se construyen los datos de sus
+gráficos y with_chart_payloads guarda el JSON resultante (y, si se pide, una
+copia comprimida con gzip) bajo la clave 'chart_payloads'. Al ser una
+sección más de los datos procesados, solo se carga en las vistas que la usan.
+
+chart_json devuelve el JSON guardado cuando la petición no tiene filtros y,
+si no existe (datos anteriores o generados fuera de la aplicación) o hay
+filtros, lo serializa como antes.
+"""
+import gzip
+import hashlib
+import json
+
+# Clave de los JSON pre-serializados en los datos procesados
+CHART_PAYLOADS_KEY = 'chart_payloads'
+
+# Solo se comprimen los JSON a partir de este tamaño
+GZIP_MIN_BYTES = 1024
+
+# Nombre -> función que construye los datos (sin filtros) a partir de los datos procesados
+_BUILDERS = {}
+
+
+def register_chart_payload(name, build):
+    """
+    Registra los datos de un gráfico que se pre-serializan al guardar
+
+    Args:
+        name (str): Nombre del gráfico (p. ej. 'time' o 'dashboard.equity')
+        build (callable): Recibe los datos procesados y devuelve los datos sin filtros
+    """
+    _BUILDERS[name] = build
+
+
+def build_chart_payloads(processed_data, compress=True):
+    """
+    Serializa los datos de todos los gráficos registrados
+
+    Args:
+        processed_data (dict): Datos procesados
+        compress (bool, optional): Guardar también el JSON comprimido con gzip
+
+    Returns:
+        dict: Nombre -> {'json': bytes, 'gzip': bytes o None, 'etag': str}
+    """
+    payloads = {}
+    for name, build in _BUILDERS.items():
+        try:
+            body = json.dumps(build(processed_data)).encode('utf-8')
+        except Exception as e:
+            print(f"[ERROR] No se pudo pre-serializar el gráfico {name}: {e}")
+            continue
+
+        compressed = None
+        if compress and len(body) >= GZIP_MIN_BYTES:
+            compressed = gzip.compress(body, mtime=0)
+        payloads[name] = {
+            'json': body,
+            'gzip': compressed,
+            'etag': hashlib.sha1(body).hexdigest()
+        }
+    return payloads
+
+
+def with_chart_payloads(processed_data, compress=True):
+    """
+    Devuelve los datos procesados con los JSON de los gráficos recién generados
+
+    Args:
+        processed_data (dict): Datos procesados
+        compress (bool, optional): Guardar también el JSON comprimido con gzip
+
+    Returns:
+        dict: Copia superficial de processed_data con 'chart_payloads'
+    """
+    data = {key: value for key, value in processed_data.items() if key != CHART_PAYLOADS_KEY}
+    data[CHART_PAYLOADS_KEY] = build_chart_payloads(data, compress)
+    return data
+
+
+def chart_payload(processed_data, name):
+    """
+    JSON pre-serializado de un gráfico
+
+    Args:
+        processed_data (dict): Datos procesados
+        name (str): Nombre del gráfico
+
+    Returns:
+        dict or None: {'json', 'gzip', 'etag'} o None si no se ha generado
+    """
+    return (processed_data.get(CHART_PAYLOADS_KEY) or {}).get(name)
+
+
+def chart_json(processed_data, name, build, filtered=False):
+    """
+    JSON de un gráfico para incrustarlo en la página
+
+    Args:
+        processed_data (dict): Datos procesados
+        name (str): Nombre del gráfico
+        build (callable): Devuelve los datos a serializar si no hay JSON guardado
+        filtered (bool, optional): La petición tiene filtros (no se usa el JSON guardado)
+
+    Returns:
+        str: JSON de los datos del gráfico
+    """
+    payload = None if filtered else chart_payload(processed_data, name)
+    if payload is not None:
+        return payload['json'].decode('utf-8')
+    return json.dumps(build())
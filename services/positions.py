@@ -0,0 +1,482 @@
+"""
+Reconstrucción de posiciones y round trips a partir de los fills
+
+El P&L por orden compara el precio límite con el precio medio de ejecución
+(mide el deslizamiento). Este módulo calcula el P&L realizado: recorre los
+fills de cada (Account, símbolo) en orden cronológico y empareja compras y
+ventas FIFO contra los lotes abiertos.
+
+- Una compra con posición corta cubre los lotes cortos más antiguos; el
+  resto abre o amplía una posición larga.
+- Una venta con posición larga cierra los lotes largos más antiguos; el
+  resto solo abre o amplía una posición corta si el fill lleva SHORT = 'Y'
+  (o si ya hay una posición corta). Una venta sin SHORT sin posición larga
+  cierra una posición abierta antes del periodo exportado y se cuenta como
+  cantidad sin emparejar.
+
+Un round trip va desde que la posición sale de cero hasta que vuelve a cero
+e incluye entrada/salida (hora y precio medio), tiempo de permanencia y P&L
+realizado neto de la comisión y el RouteFee de los tickets de sus fills (la
+comisión de un fill que cierra una posición y abre la contraria se reparte
+en proporción a la cantidad de cada parte). Las posiciones que siguen
+abiertas al final se devuelven aparte.
+
+Los símbolos son independientes, así que los fills se ordenan una vez por
+(símbolo, Account, hora) y se reparten en bloques de símbolos contiguos
+entre un pool de procesos; cada bloque se recorre en una sola pasada, O(n).
+"""
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from services.order_index import time_range
+from services.processed_orders import as_processed_orders
+from services.timestamps import NS_PER_SECOND, fill_timestamps, valid_mask
+
+# Número mínimo de fills para repartir el emparejamiento entre procesos
+PARALLEL_MIN_FILLS = 250_000
+
+# Bloques de símbolos por proceso (equilibra símbolos con muchos fills)
+_BLOCKS_PER_WORKER = 4
+
+# Cantidades por debajo de este valor se consideran cero
+_QTY_EPSILON = 1e-9
+
+ROUND_TRIP_COLUMNS = (
+    'Account', 'symbol', 'Trader', 'side', 'entryTimestamp', 'exitTimestamp', 'holdingSeconds',
+    'qty', 'entryPrice', 'exitPrice', 'grossPnl', 'fees', 'netPnl', 'fills'
+)
+
+OPEN_POSITION_COLUMNS = (
+    'Account', 'symbol', 'Trader', 'side', 'entryTimestamp', 'qty', 'avgPrice',
+    'realizedPnl', 'fees', 'fills'
+)
+
+
+class RoundTripBook:
+    """Round trips cerrados y posiciones abiertas reconstruidos a partir de los fills"""
+
+    def __init__(self, round_trips, open_positions, unmatched=None):
+        """
+        Args:
+            round_trips (DataFrame): Un round trip por fila (ROUND_TRIP_COLUMNS), por hora de salida
+            open_positions (DataFrame): Posiciones abiertas al final (OPEN_POSITION_COLUMNS)
+            unmatched (dict, optional): Símbolo -> cantidad vendida sin posición ni marca SHORT
+        """
+        self.round_trips = round_trips
+        self.open_positions = open_positions
+        self.unmatched = unmatched or {}
+
+    @classmethod
+    def empty(cls):
+        """Libro sin round trips"""
+        return cls(_frame([], ROUND_TRIP_COLUMNS), _frame([], OPEN_POSITION_COLUMNS))
+
+    @classmethod
+    def from_orders(cls, orders, max_workers=None, parallel_min_fills=PARALLEL_MIN_FILLS):
+        """
+        Reconstruye los round trips de los fills de unas órdenes procesadas
+
+        Args:
+            orders (ProcessedOrders or list): Órdenes procesadas (con comisión y RouteFee por fill)
+            max_workers (int, optional): Número de procesos; por defecto os.cpu_count()
+            parallel_min_fills (int, optional): Fills a partir de los cuales se usa el pool
+
+        Returns:
+            RoundTripBook: Round trips y posiciones abiertas
+        """
+        orders = as_processed_orders(orders)
+        required = ('Account', 'symb', 'B/S', 'qty', 'price', 'time')
+        if not orders.fill_count or any(name not in orders._fill_columns for name in required):
+            return cls.empty()
+
+        fills = _fill_arrays(orders)
+        partitions = _partitions(fills, max_workers, parallel_min_fills)
+        max_workers = max_workers or os.cpu_count() or 1
+
+        if len(partitions) == 1 or max_workers == 1:
+            results = [_match_partition(partition) for partition in partitions]
+        else:
+            with ProcessPoolExecutor(max_workers=min(max_workers, len(partitions))) as executor:
+                results = list(executor.map(_match_partition, partitions))
+
+        trips = [row for part in results for row in part[0]]
+        positions = [row for part in results for row in part[1]]
+        unmatched = {}
+        for part in results:
+            for group, qty in part[2].items():
+                symbol = fills['group_symbols'][group]
+                unmatched[symbol] = unmatched.get(symbol, 0.0) + qty
+
+        round_trips = _label_rows(_frame(trips, _TRIP_FIELDS), fills)
+        round_trips = round_trips.sort_values('exitTimestamp', kind='stable').reset_index(drop=True)
+        open_positions = _label_rows(_frame(positions, _OPEN_FIELDS), fills)
+        return cls(round_trips[list(ROUND_TRIP_COLUMNS)], open_positions[list(OPEN_POSITION_COLUMNS)], unmatched)
+
+    @classmethod
+    def concat(cls, books):
+        """
+        Combina libros de particiones con (Account, símbolo) disjuntos
+
+        Args:
+            books (list): Libros de cada partición
+
+        Returns:
+            RoundTripBook: Libro combinado, ordenado por hora de salida
+        """
+        books = list(books)
+        if not books:
+            return cls.empty()
+
+        round_trips = pd.concat([book.round_trips for book in books], ignore_index=True)
+        round_trips = round_trips.sort_values('exitTimestamp', kind='stable').reset_index(drop=True)
+        open_positions = pd.concat([book.open_positions for book in books], ignore_index=True)
+        unmatched = {}
+        for book in books:
+            for symbol, qty in book.unmatched.items():
+                unmatched[symbol] = unmatched.get(symbol, 0.0) + qty
+        return cls(round_trips, open_positions, unmatched)
+
+    def __len__(self):
+        return len(self.round_trips)
+
+    def replace_symbols(self, other, symbols):
+        """
+        Sustituye los round trips de unos símbolos por los de otro libro
+
+        Se usa en la ingesta incremental: solo se recalculan los símbolos
+        con fills nuevos.
+
+        Args:
+            other (RoundTripBook): Libro recalculado para esos símbolos
+            symbols (list): Símbolos sustituidos
+
+        Returns:
+            RoundTripBook: Libro combinado
+        """
+        symbols = [str(symbol) for symbol in symbols]
+        keep_trips = ~self.round_trips['symbol'].astype(str).isin(symbols)
+        keep_open = ~self.open_positions['symbol'].astype(str).isin(symbols)
+
+        round_trips = pd.concat([self.round_trips[keep_trips], other.round_trips], ignore_index=True)
+        round_trips = round_trips.sort_values('exitTimestamp', kind='stable').reset_index(drop=True)
+        open_positions = pd.concat([self.open_positions[keep_open], other.open_positions], ignore_index=True)
+        unmatched = {symbol: qty for symbol, qty in self.unmatched.items() if str(symbol) not in symbols}
+        unmatched.update(other.unmatched)
+        return RoundTripBook(round_trips, open_positions, unmatched)
+
+    def select(self, filters=None, date_from=None, date_to=None):
+        """
+        Round trips que cumplen unos filtros (formato de services.cube.query_filters)
+
+        El rango de fechas se aplica a la hora de salida; se admiten los
+        filtros por símbolo y por trader.
+
+        Returns:
+            DataFrame: Round trips seleccionados
+        """
+        trips = self.round_trips
+        mask = np.ones(len(trips), dtype=bool)
+        start, end = time_range(date_from, date_to)
+        if start is not None:
+            mask &= trips['exitTimestamp'].to_numpy() >= start
+        if end is not None:
+            mask &= trips['exitTimestamp'].to_numpy() < end
+        for dimension, column in (('symbol', 'symbol'), ('Trader', 'Trader')):
+            allowed = (filters or {}).get(dimension)
+            if allowed:
+                mask &= trips[column].astype(str).isin([str(value) for value in allowed]).to_numpy()
+        return trips[mask]
+
+
+def round_trip_summary(round_trips):
+    """
+    Métricas de unos round trips
+
+    Args:
+        round_trips (DataFrame): Round trips (ROUND_TRIP_COLUMNS)
+
+    Returns:
+        dict: Número, ganadores, win rate, P&L bruto/neto, comisiones y permanencia media
+    """
+    count = len(round_trips)
+    net = round_trips['netPnl'].to_numpy(dtype=float)
+    winners = int((net > 0).sum())
+    gains = float(net[net > 0].sum())
+    losses = float(-net[net <= 0].sum())
+    return {
+        'roundTrips': count,
+        'winners': winners,
+        'winRate': winners / count * 100 if count else 0,
+        'grossPnl': float(round_trips['grossPnl'].sum()),
+        'fees': float(round_trips['fees'].sum()),
+        'netPnl': float(net.sum()),
+        'profitFactor': gains / losses if losses > 0 else gains,
+        'avgHoldingSeconds': float(round_trips['holdingSeconds'].mean()) if count else 0
+    }
+
+
+def round_trip_records(frame, limit=None):
+    """
+    Filas de round trips o posiciones abiertas como diccionarios para las plantillas
+
+    Args:
+        frame (DataFrame): Round trips o posiciones abiertas
+        limit (int, optional): Número máximo de filas (las más recientes)
+
+    Returns:
+        list: Diccionarios con las columnas y las horas como texto (más reciente primero)
+    """
+    if limit is not None:
+        frame = frame.iloc[-limit:] if limit > 0 else frame.iloc[:0]
+    frame = frame.iloc[::-1].copy()
+    for column in ('entryTimestamp', 'exitTimestamp'):
+        if column in frame:
+            times = pd.to_datetime(frame[column].to_numpy(dtype=np.int64))
+            frame[column.replace('Timestamp', 'Time')] = times.strftime('%Y-%m-%d %H:%M:%S')
+    return frame.to_dict('records')
+
+
+def round_trips_of(processed_data):
+    """
+    Devuelve el libro de round trips de unos datos procesados
+
+    Para cachés anteriores se reconstruye a partir de processed_orders.
+
+    Args:
+        processed_data (dict): Datos procesados
+
+    Returns:
+        RoundTripBook: Round trips y posiciones abiertas
+    """
+    book = processed_data.get('round_trips')
+    if book is None:
+        book = RoundTripBook.from_orders(processed_data.get('processed_orders') or [])
+    return book
+
+
+def update_round_trips(book, all_orders, new_orders):
+    """
+    Recalcula los round trips de los símbolos con fills nuevos
+
+    Args:
+        book (RoundTripBook): Libro de las órdenes existentes
+        all_orders (ProcessedOrders): Órdenes existentes y nuevas
+        new_orders (ProcessedOrders): Órdenes nuevas
+
+    Returns:
+        RoundTripBook: Libro actualizado
+    """
+    if not len(new_orders) or 'symb' not in new_orders.columns:
+        return book
+
+    symbols = pd.unique(new_orders.column('symb'))
+    rows = np.flatnonzero(np.isin(all_orders.column('symb'), symbols))
+    return book.replace_symbols(RoundTripBook.from_orders(all_orders.take(rows)), symbols)
+
+
+# ----------------------------------------------------------------------
+# Emparejamiento FIFO
+# ----------------------------------------------------------------------
+# Campos de las filas que devuelve _match_partition
+_TRIP_FIELDS = (
+    'group', 'direction', 'entryTimestamp', 'exitTimestamp', 'qty', 'entryNotional',
+    'exitNotional', 'grossPnl', 'fees', 'fills'
+)
+_OPEN_FIELDS = ('group', 'direction', 'entryTimestamp', 'qty', 'notional', 'realizedPnl', 'fees', 'fills')
+
+
+def _fill_arrays(orders):
+    """
+    Arrays de los fills ordenados por (símbolo, Account, hora, posición)
+
+    Los fills sin hora válida se descartan.
+    """
+    symbol_codes, symbols = pd.factorize(orders.fill_categorical('symb'))
+    account_codes, accounts = pd.factorize(orders.fill_categorical('Account'))
+    timestamps = fill_timestamps(orders)
+
+    valid = valid_mask(timestamps) & (symbol_codes >= 0) & (account_codes >= 0)
+    if not valid.all():
+        print(f"[INFO] Se ignoran {int((~valid).sum())} fills sin hora, símbolo o cuenta")
+
+    positions = np.flatnonzero(valid)
+    order = positions[np.lexsort((positions, timestamps[positions], account_codes[positions], symbol_codes[positions]))]
+
+    def numeric(name):
+        if name not in orders._fill_columns:
+            return np.zeros(len(order))
+        return pd.to_numeric(pd.Series(orders.fill_column(name)[order]), errors='coerce').fillna(0).to_numpy(float)
+
+    short = orders.fill_column('SHORT')[order] if 'SHORT' in orders._fill_columns else np.full(len(order), 'N')
+    # Los fills están ordenados por (símbolo, Account): cada grupo es un tramo contiguo
+    fill_symbols, fill_accounts = symbol_codes[order], account_codes[order]
+    boundaries = np.ones(len(order), dtype=bool)
+    boundaries[1:] = (fill_symbols[1:] != fill_symbols[:-1]) | (fill_accounts[1:] != fill_accounts[:-1])
+    groups = np.cumsum(boundaries) - 1
+    starts = np.flatnonzero(boundaries)
+    traders = orders.fill_column('Trader')[order] if 'Trader' in orders._fill_columns else np.full(len(order), '')
+
+    return {
+        'symbol_codes': fill_symbols,
+        'group': groups,
+        'group_symbols': np.asarray(symbols, dtype=object)[fill_symbols[starts]],
+        'group_accounts': np.asarray(accounts, dtype=object)[fill_accounts[starts]],
+        'group_traders': _first_per_group(traders, groups, len(starts)),
+        'direction': np.where(orders.fill_column('B/S')[order] == 'B', 1, -1),
+        'short': pd.Series(short).isin(['Y', 'y']).to_numpy(),
+        'qty': np.abs(numeric('qty')),
+        'price': numeric('price'),
+        'timestamp': timestamps[order],
+        'fee': numeric('commission') + numeric('routeFee')
+    }
+
+
+def _first_per_group(values, groups, count):
+    """Primer valor de cada grupo (grupos contiguos)"""
+    result = np.full(count, '', dtype=object)
+    if len(groups):
+        first = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+        result[groups[first]] = values[first]
+    return result
+
+
+def _partitions(fills, max_workers, parallel_min_fills):
+    """Reparte los fills en bloques de símbolos contiguos (listas nativas para el bucle)"""
+    count = len(fills['group'])
+    max_workers = max_workers or os.cpu_count() or 1
+
+    bounds = [0, count]
+    if count >= parallel_min_fills and max_workers > 1:
+        # Inicio de cada símbolo; cortes en el inicio de símbolo más cercano a cada fracción
+        starts = np.flatnonzero(np.r_[True, fills['symbol_codes'][1:] != fills['symbol_codes'][:-1]])
+        blocks = max_workers * _BLOCKS_PER_WORKER
+        targets = np.arange(1, blocks) * count // blocks
+        cuts = starts[np.minimum(np.searchsorted(starts, targets), len(starts) - 1)]
+        bounds = sorted(set([0, count] + [int(cut) for cut in cuts if 0 < cut < count]))
+
+    names = ('group', 'direction', 'short', 'qty', 'price', 'timestamp', 'fee')
+    return [
+        tuple(fills[name][start:end].tolist() for name in names)
+        for start, end in zip(bounds[:-1], bounds[1:])
+    ]
+
+
+def _match_partition(partition):
+    """
+    Empareja FIFO los fills de un bloque (se ejecuta en un proceso del pool)
+
+    Args:
+        partition (tuple): Listas group, direction, short, qty, price, timestamp y fee
+            ordenadas por (grupo, hora)
+
+    Returns:
+        tuple: (filas de round trips, filas de posiciones abiertas, grupo -> cantidad sin emparejar)
+    """
+    groups, directions, shorts, quantities, prices, timestamps, fees = partition
+    trips, positions = [], []
+    unmatched = {}
+
+    current = None
+    lots = deque()
+    side = size = 0
+    episode = None
+
+    for group, direction, short, qty, price, timestamp, fee in zip(
+            groups, directions, shorts, quantities, prices, timestamps, fees):
+        if group != current:
+            if side:
+                positions.append(_open_row(current, side, size, lots, episode))
+            current, lots, side, size, episode = group, deque(), 0, 0.0, None
+
+        if qty <= _QTY_EPSILON:
+            continue
+        remaining = qty
+        fee_per_share = fee / qty
+
+        if side and direction != side:
+            # Cierre FIFO contra los lotes abiertos
+            closing = min(remaining, size)
+            left = closing
+            gross = 0.0
+            while left > _QTY_EPSILON:
+                lot = lots[0]
+                matched = min(lot[0], left)
+                gross += (price - lot[1]) * matched * side
+                lot[0] -= matched
+                left -= matched
+                if lot[0] <= _QTY_EPSILON:
+                    lots.popleft()
+
+            episode[3] += closing * price
+            episode[4] += gross
+            episode[5] += closing * fee_per_share
+            episode[6] += 1
+            size -= closing
+            remaining -= closing
+
+            if size <= _QTY_EPSILON:
+                trips.append((current, side, episode[0], timestamp, *episode[1:]))
+                lots, side, size, episode = deque(), 0, 0.0, None
+
+        if remaining <= _QTY_EPSILON:
+            continue
+
+        if not side:
+            if direction < 0 and not short:
+                # Venta sin posición ni SHORT: cierra una posición anterior al periodo
+                unmatched[current] = unmatched.get(current, 0.0) + remaining
+                continue
+            side = direction
+            # [entrada, cantidad, nocional de entrada, nocional de salida, bruto, comisiones, fills]
+            episode = [timestamp, 0.0, 0.0, 0.0, 0.0, 0.0, 0]
+
+        episode[6] += 1
+        lots.append([remaining, price])
+        size += remaining
+        episode[1] += remaining
+        episode[2] += remaining * price
+        episode[5] += remaining * fee_per_share
+
+    if side:
+        positions.append(_open_row(current, side, size, lots, episode))
+
+    return trips, positions, unmatched
+
+
+def _open_row(group, side, size, lots, episode):
+    """Fila de una posición que sigue abierta al final de su grupo"""
+    notional = sum(lot[0] * lot[1] for lot in lots)
+    return (group, side, episode[0], size, notional, *episode[4:])
+
+
+def _frame(rows, fields):
+    """DataFrame de filas (tuplas) con las columnas indicadas"""
+    return pd.DataFrame.from_records(rows, columns=list(fields))
+
+
+def _label_rows(frame, fills):
+    """Añade Account, símbolo, trader y columnas derivadas a las filas de _match_partition"""
+    groups = frame['group'].to_numpy(dtype=np.int64)
+    frame = frame.assign(
+        Account=fills['group_accounts'][groups],
+        symbol=fills['group_symbols'][groups],
+        Trader=fills['group_traders'][groups],
+        side=np.where(frame['direction'].to_numpy() > 0, 'LONG', 'SHORT')
+    )
+    frame['entryTimestamp'] = frame['entryTimestamp'].astype(np.int64)
+
+    if 'exitTimestamp' in frame:
+        qty = frame['qty'].to_numpy(dtype=float)
+        frame['exitTimestamp'] = frame['exitTimestamp'].astype(np.int64)
+        frame['holdingSeconds'] = (frame['exitTimestamp'] - frame['entryTimestamp']) / NS_PER_SECOND
+        frame['entryPrice'] = np.divide(frame['entryNotional'], qty, out=np.zeros(len(qty)), where=qty > 0)
+        frame['exitPrice'] = np.divide(frame['exitNotional'], qty, out=np.zeros(len(qty)), where=qty > 0)
+        frame['netPnl'] = frame['grossPnl'] - frame['fees']
+    else:
+        qty = frame['qty'].to_numpy(dtype=float)
+        frame['avgPrice'] = np.divide(frame['notional'], qty, out=np.zeros(len(qty)), where=qty > 0)
+    return frame
@@ -0,0 +1,416 @@
+"""
+Almacén columnar de órdenes procesadas
+
+Las órdenes se guardan como un array de NumPy por columna y sus fills
+(trades) como otro conjunto de arrays indexado por offsets: los fills de la
+orden i son las filas fill_offsets[i]:fill_offsets[i + 1]. Para mantener la
+compatibilidad con plantillas, addons y alertas, cada orden se expone como
+una vista de solo lectura con la misma interfaz que un diccionario.
+
+Las columnas de baja cardinalidad (símbolo, trader, cuenta, ruta...) se
+guardan codificadas: un array de códigos enteros y la tabla de valores
+distintos de la columna. column() devuelve los valores decodificados y
+categorical() la columna como pd.Categorical para agrupar por códigos.
+"""
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+# Clave bajo la que cada vista expone la lista de fills de la orden
+TRADES_KEY = 'trades'
+
+# Columnas que se guardan codificadas (códigos enteros + tabla de valores)
+ENCODED_COLUMNS = ('symb', 'Trader', 'Account', 'Branch', 'route', 'B/S', 'SHORT', 'Market')
+
+
+def to_native(value):
+    """Convierte escalares de NumPy a tipos nativos de Python"""
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _encode_columns(columns):
+    """
+    Separa las columnas en arrays y tablas de valores de las codificadas
+
+    Se codifican las columnas de ENCODED_COLUMNS y cualquier pd.Categorical.
+
+    Returns:
+        tuple: (nombre -> array o códigos, nombre -> tabla de valores)
+    """
+    arrays, categories = {}, {}
+    for name, values in columns.items():
+        if isinstance(values, pd.Categorical) or name in ENCODED_COLUMNS:
+            categorical = values if isinstance(values, pd.Categorical) else pd.Categorical(values)
+            arrays[name] = categorical.codes
+            categories[name] = categorical.categories.to_numpy()
+        else:
+            arrays[name] = np.asarray(values)
+    return arrays, categories
+
+
+def _encode_text_columns(columns, categories):
+    """
+    Codifica las columnas de texto aún sin codificar para guardarlas
+
+    La tabla de valores se guarda como array de texto de ancho fijo en lugar
+    de objetos de Python, de modo que también se puede mapear en memoria
+    (ver services.mapped_dataset).
+
+    Returns:
+        tuple: (nombre -> array o códigos, nombre -> tabla de valores)
+    """
+    columns, categories = dict(columns), dict(categories)
+    for name, values in columns.items():
+        if name in categories or values.dtype != object:
+            continue
+        categorical = pd.Categorical(values)
+        if categorical.categories.inferred_type not in ('string', 'empty'):
+            continue
+        columns[name] = categorical.codes
+        categories[name] = categorical.categories.to_numpy().astype(str)
+    return columns, categories
+
+
+def _decode(codes, categories):
+    """Decodifica un array de códigos (-1 = valor ausente, NaN)"""
+    missing = codes < 0
+    if missing.any():
+        values = np.full(len(codes), np.nan, dtype=object)
+        values[~missing] = categories[codes[~missing]]
+        return values
+    return categories[codes]
+
+
+def _as_categorical(values, categories):
+    """Columna como pd.Categorical (sin recodificar si ya está codificada)"""
+    if categories is None:
+        return pd.Categorical(values)
+    return pd.Categorical.from_codes(values, pd.Index(categories))
+
+
+class OrderView(Mapping):
+    """Vista tipo diccionario (solo lectura) de una orden de ProcessedOrders"""
+    __slots__ = ('_store', '_index')
+
+    def __init__(self, store, index):
+        self._store = store
+        self._index = index
+
+    def __getitem__(self, key):
+        if key == TRADES_KEY:
+            return self._store.get_trades(self._index)
+        try:
+            return self._store._value(key, self._index)
+        except KeyError:
+            raise KeyError(key) from None
+
+    def __iter__(self):
+        return iter(self._store.keys())
+
+    def __len__(self):
+        return len(self._store.keys())
+
+    def __contains__(self, key):
+        return key == TRADES_KEY or key in self._store._columns
+
+    def to_dict(self):
+        """Materializa la orden como un diccionario independiente"""
+        return {key: self[key] for key in self}
+
+    def __repr__(self):
+        return f"OrderView({self.to_dict()!r})"
+
+
+class ProcessedOrders:
+    """
+    Colección compacta de órdenes procesadas
+
+    Se comporta como una secuencia de órdenes (len, iteración, indexado),
+    de modo que el código que recorre processed_data['processed_orders']
+    sigue funcionando, pero los datos se almacenan por columnas.
+    """
+
+    def __init__(self, columns, fill_columns, fill_offsets, order_keys=None):
+        """
+        Args:
+            columns (dict): Nombre de columna -> array con un valor por orden
+            fill_columns (dict): Nombre de columna -> array con un valor por fill
+            fill_offsets (ndarray): Offsets (longitud n + 1) de los fills de cada orden
+            order_keys (list, optional): Orden de los campos al exponer cada orden
+        """
+        self._columns, self._categories = _encode_columns(columns)
+        self._fill_columns, self._fill_categories = _encode_columns(fill_columns)
+        self._fill_offsets = np.asarray(fill_offsets, dtype=np.int64)
+
+        if order_keys is None:
+            order_keys = list(self._columns.keys()) + [TRADES_KEY]
+        self._order_keys = list(order_keys)
+
+        if len(self._fill_offsets) != len(self) + 1:
+            raise ValueError("fill_offsets debe tener una entrada más que el número de órdenes")
+
+    def __setstate__(self, state):
+        # Cachés anteriores a la codificación de columnas no tienen las tablas de valores
+        state.setdefault('_categories', {})
+        state.setdefault('_fill_categories', {})
+        self.__dict__.update(state)
+
+    @classmethod
+    def _from_encoded(cls, columns, categories, fill_columns, fill_categories, fill_offsets, order_keys):
+        """Crea la colección a partir de columnas ya codificadas (sin recodificar)"""
+        store = cls.__new__(cls)
+        store._columns = columns
+        store._categories = categories
+        store._fill_columns = fill_columns
+        store._fill_categories = fill_categories
+        store._fill_offsets = np.asarray(fill_offsets, dtype=np.int64)
+        store._order_keys = list(order_keys)
+        return store
+
+    # ------------------------------------------------------------------
+    # Construcción
+    # ------------------------------------------------------------------
+    @classmethod
+    def empty(cls):
+        """Crea una colección vacía"""
+        return cls({}, {}, np.zeros(1, dtype=np.int64), order_keys=[TRADES_KEY])
+
+    @classmethod
+    def from_records(cls, records):
+        """
+        Crea la colección a partir de una lista de órdenes en formato diccionario
+        (por ejemplo, una caché antigua o el resultado de la base de datos)
+        """
+        if isinstance(records, cls):
+            return records
+
+        records = list(records)
+        if not records:
+            return cls.empty()
+
+        order_keys = list(records[0].keys())
+        if TRADES_KEY not in order_keys:
+            order_keys.append(TRADES_KEY)
+        orders_frame = pd.DataFrame.from_records(
+            [{key: value for key, value in record.items() if key != TRADES_KEY} for record in records]
+        )
+
+        fills = [fill for record in records for fill in record.get(TRADES_KEY, [])]
+        lengths = [len(record.get(TRADES_KEY, [])) for record in records]
+        fills_frame = pd.DataFrame.from_records(fills) if fills else pd.DataFrame()
+
+        return cls.from_frames(orders_frame, fills_frame, np.r_[0, np.cumsum(lengths)], order_keys)
+
+    @classmethod
+    def from_frames(cls, orders_frame, fills_frame, fill_offsets, order_keys=None):
+        """Crea la colección a partir de DataFrames de órdenes y fills"""
+        columns = {name: orders_frame[name].values for name in orders_frame.columns}
+        fill_columns = {name: fills_frame[name].values for name in fills_frame.columns}
+        return cls(columns, fill_columns, fill_offsets, order_keys)
+
+    @classmethod
+    def concat(cls, parts):
+        """Concatena varias colecciones manteniendo el orden de las partes"""
+        parts = [cls.from_records(part) for part in parts if len(part)]
+        if not parts:
+            return cls.empty()
+        if len(parts) == 1:
+            return parts[0]
+
+        offsets = [np.zeros(1, dtype=np.int64)]
+        base = 0
+        for part in parts:
+            offsets.append(part._fill_offsets[1:] + base)
+            base += part._fill_offsets[-1]
+
+        columns = _concat_columns([(part._columns, part._categories, len(part)) for part in parts])
+        fill_columns = _concat_columns([(part._fill_columns, part._fill_categories, part.fill_count) for part in parts])
+        return cls(columns, fill_columns, np.concatenate(offsets), parts[0]._order_keys)
+
+    def with_encoded_text(self):
+        """
+        Devuelve la colección con las columnas de texto codificadas
+
+        Es la forma en que se guarda en el formato mapeable: los valores son
+        los mismos, pero todas las columnas quedan como arrays de NumPy.
+        """
+        columns, categories = _encode_text_columns(self._columns, self._categories)
+        fill_columns, fill_categories = _encode_text_columns(self._fill_columns, self._fill_categories)
+        return ProcessedOrders._from_encoded(
+            columns, categories, fill_columns, fill_categories, self._fill_offsets, self._order_keys
+        )
+
+    # ------------------------------------------------------------------
+    # Interfaz de secuencia
+    # ------------------------------------------------------------------
+    def __len__(self):
+        return len(self._fill_offsets) - 1
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield OrderView(self, index)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.take(np.arange(len(self))[index])
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('índice de orden fuera de rango')
+        return OrderView(self, index)
+
+    def __repr__(self):
+        return f"ProcessedOrders({len(self)} órdenes, {self.fill_count} fills)"
+
+    # ------------------------------------------------------------------
+    # Acceso columnar
+    # ------------------------------------------------------------------
+    def keys(self):
+        """Campos expuestos por cada orden"""
+        return self._order_keys
+
+    @property
+    def columns(self):
+        """Nombres de las columnas por orden"""
+        return list(self._columns.keys())
+
+    @property
+    def fill_count(self):
+        """Número total de fills almacenados"""
+        return int(self._fill_offsets[-1])
+
+    @property
+    def fill_offsets(self):
+        """Offsets de los fills de cada orden"""
+        return self._fill_offsets
+
+    def column(self, name):
+        """Devuelve el array (decodificado) de una columna por orden"""
+        values = self._columns[name]
+        if name in self._categories:
+            return _decode(values, self._categories[name])
+        return values
+
+    def fill_column(self, name):
+        """Devuelve el array (decodificado) de una columna de fills"""
+        values = self._fill_columns[name]
+        if name in self._fill_categories:
+            return _decode(values, self._fill_categories[name])
+        return values
+
+    def categorical(self, name):
+        """
+        Devuelve una columna por orden como pd.Categorical
+
+        Para las columnas codificadas no se recodifica nada: agrupar por el
+        resultado (groupby con observed=True) opera sobre los códigos enteros.
+        """
+        return _as_categorical(self._columns[name], self._categories.get(name))
+
+    def fill_categorical(self, name):
+        """Devuelve una columna de fills como pd.Categorical (sin recodificar si ya está codificada)"""
+        return _as_categorical(self._fill_columns[name], self._fill_categories.get(name))
+
+    def _value(self, name, index):
+        """Valor (decodificado) de una columna para una orden"""
+        value = self._columns[name][index]
+        categories = self._categories.get(name)
+        if categories is not None:
+            return np.nan if value < 0 else to_native(categories[value])
+        return to_native(value)
+
+    def get_trades(self, index):
+        """Materializa los fills de una orden como lista de diccionarios"""
+        start, end = self._fill_offsets[index], self._fill_offsets[index + 1]
+        names = list(self._fill_columns.keys())
+        arrays = [
+            _decode(self._fill_columns[name][start:end], self._fill_categories[name])
+            if name in self._fill_categories else self._fill_columns[name][start:end]
+            for name in names
+        ]
+        return [
+            {name: to_native(value) for name, value in zip(names, row)}
+            for row in zip(*arrays)
+        ]
+
+    def take(self, positions):
+        """Devuelve una nueva colección con las órdenes indicadas (en ese orden)"""
+        positions = np.asarray(positions, dtype=np.int64)
+        starts = self._fill_offsets[positions]
+        lengths = self._fill_offsets[positions + 1] - starts
+
+        offsets = np.r_[0, np.cumsum(lengths)].astype(np.int64)
+        fill_index = np.arange(offsets[-1], dtype=np.int64) - np.repeat(offsets[:-1] - starts, lengths)
+
+        columns = {name: values[positions] for name, values in self._columns.items()}
+        fill_columns = {name: values[fill_index] for name, values in self._fill_columns.items()}
+        return ProcessedOrders._from_encoded(
+            columns, self._categories, fill_columns, self._fill_categories, offsets, self._order_keys
+        )
+
+    def to_frame(self):
+        """Devuelve las columnas por orden como DataFrame (codificadas como category)"""
+        return pd.DataFrame({
+            name: _as_categorical(values, self._categories[name]) if name in self._categories else values
+            for name, values in self._columns.items()
+        }, copy=False)
+
+    def fills_frame(self):
+        """Devuelve los fills como DataFrame (codificados como category)"""
+        return pd.DataFrame({
+            name: _as_categorical(values, self._fill_categories[name]) if name in self._fill_categories else values
+            for name, values in self._fill_columns.items()
+        }, copy=False)
+
+    def to_records(self):
+        """Materializa todas las órdenes como lista de diccionarios"""
+        return [view.to_dict() for view in self]
+
+
+def _concat_columns(parts):
+    """
+    Concatena las columnas de varias partes
+
+    Las columnas codificadas en todas las partes se combinan uniendo sus
+    tablas de valores (union_categoricals), sin decodificar.
+
+    Args:
+        parts (list): Tuplas (columnas, tablas de valores, número de filas)
+
+    Returns:
+        dict: Nombre -> array o pd.Categorical
+    """
+    names = list(dict.fromkeys(name for columns, _, _ in parts for name in columns))
+    result = {}
+    for name in names:
+        if all(name in categories for _, categories, _ in parts):
+            try:
+                result[name] = union_categoricals([
+                    _as_categorical(columns[name], categories[name]) for columns, categories, _ in parts
+                ])
+                continue
+            except TypeError:
+                # Tablas de valores de tipos distintos (p. ej. cuentas numéricas y de texto)
+                pass
+
+        pieces = []
+        for columns, categories, length in parts:
+            if name not in columns:
+                pieces.append(np.full(length, np.nan, dtype=object))
+            elif name in categories:
+                pieces.append(_decode(columns[name], categories[name]))
+            else:
+                pieces.append(columns[name])
+        result[name] = np.concatenate(pieces)
+    return result
+
+
+def as_processed_orders(orders):
+    """Normaliza una lista de órdenes (caché antigua, BD) a ProcessedOrders"""
+    if orders is None:
+        return ProcessedOrders.empty()
+    return ProcessedOrders.from_records(orders)
@@ -0,0 +1,101 @@
+"""
+Rankings top/bottom-K sin ordenar todo el desglose
+
+Los widgets de "mejor", "peor" y "más activo" y los rankings solo necesitan
+unas pocas filas de cada extremo. En lugar de ordenar todas las filas
+(O(n log n)) o recorrerlas una vez por widget, se extraen los valores de la
+métrica una sola vez y se seleccionan los K extremos con np.argpartition
+(O(n)); solo esas K filas se ordenan.
+
+Los empates se resuelven como max()/min() y sorted() estable: a igual valor
+gana la fila que aparece antes en el desglose.
+"""
+import numpy as np
+
+
+def top_k_indices(values, k=1, largest=True):
+    """
+    Índices de los K mayores (o menores) valores, ordenados
+
+    Args:
+        values (array): Valores de la métrica
+        k (int, optional): Número de índices; None para ordenar todos
+        largest (bool, optional): True para los mayores, False para los menores
+
+    Returns:
+        ndarray: Índices del mejor al peor según el criterio
+    """
+    values = np.asarray(values, dtype=float)
+    # Los NaN nunca son los mejores: se tratan como el peor valor posible
+    scores = np.nan_to_num(values if largest else -values, nan=-np.inf)
+    count = len(scores)
+    k = count if k is None else max(min(int(k), count), 0)
+    if k == 0:
+        return np.array([], dtype=np.int64)
+
+    if k < count:
+        # Valor del K-ésimo mejor: entran todos los mayores y los primeros empatados con él
+        threshold = np.partition(scores, count - k)[count - k]
+        above = np.flatnonzero(scores > threshold)
+        tied = np.flatnonzero(scores == threshold)[:k - len(above)]
+        selected = np.concatenate([above, tied])
+    else:
+        selected = np.arange(count)
+
+    return selected[np.lexsort((selected, -scores[selected]))]
+
+
+def top_k(rows, metric, k=1, largest=True):
+    """
+    Filas con los K mayores (o menores) valores de una métrica
+
+    Args:
+        rows (list): Desglose como lista de diccionarios
+        metric (str): Clave de la métrica
+        k (int, optional): Número de filas; None para ordenar todas
+        largest (bool, optional): True para los mayores, False para los menores
+
+    Returns:
+        list: Filas del mejor al peor según el criterio
+    """
+    values = np.fromiter((row[metric] for row in rows), dtype=float, count=len(rows))
+    return [rows[index] for index in top_k_indices(values, k, largest)]
+
+
+def rank_extremes(rows, metric, k=1):
+    """
+    Top-K y bottom-K de una métrica con una sola extracción de valores
+
+    Args:
+        rows (list): Desglose como lista de diccionarios
+        metric (str): Clave de la métrica
+        k (int, optional): Número de filas de cada extremo
+
+    Returns:
+        tuple: (K mayores de mayor a menor, K menores de menor a mayor)
+    """
+    values = np.fromiter((row[metric] for row in rows), dtype=float, count=len(rows))
+    return (
+        [rows[index] for index in top_k_indices(values, k, largest=True)],
+        [rows[index] for index in top_k_indices(values, k, largest=False)]
+    )
+
+
+def best_worst_active(rows, metric='totalPL', activity='totalTrades'):
+    """
+    Mejor y peor fila por una métrica y fila más activa
+
+    Args:
+        rows (list): Desglose como lista de diccionarios
+        metric (str, optional): Métrica de mejor/peor
+        activity (str, optional): Métrica de actividad
+
+    Returns:
+        tuple: (mejor, peor, más activa); None si no hay filas
+    """
+    if not rows:
+        return None, None, None
+
+    best, worst = rank_extremes(rows, metric, 1)
+    most_active = top_k(rows, activity, 1)
+    return best[0], worst[0], most_active[0]
@@ -0,0 +1,180 @@
+"""
+Métricas de rendimiento en ventanas móviles
+
+Calcula, para cada operación (ventana de N operaciones) o para cada día
+(ventana de N días naturales), el P&L, win rate, profit factor, expectancy
+y ratios tipo Sharpe y Sortino de la ventana que termina en ese punto.
+
+En lugar de recalcular cada ventana (O(n·w)), todas las sumas se obtienen
+de sumas acumuladas: la suma de una ventana [inicio, fin] es
+acumulado[fin + 1] - acumulado[inicio], de modo que el coste total es O(n)
+para cualquier tamaño de ventana. Para limitar la cancelación numérica en
+la varianza, los valores se centran en su media global antes de acumular
+los cuadrados.
+
+Los ratios no están anualizados: Sharpe = media / desviación típica
+(muestral) y Sortino = media / desviación a la baja (raíz de la media de
+min(valor, 0)²) de los valores de la ventana, que son el P&L de cada
+operación o el P&L de cada día con operaciones.
+"""
+import numpy as np
+
+from services.equity import lttb_indices
+from services.timestamps import NS_PER_DAY, valid_mask
+
+# Unidades de ventana: 'trades' (N operaciones) o 'days' (N días naturales)
+ROLLING_UNITS = ('trades', 'days')
+
+# Campos de cada punto de las métricas móviles
+ROLLING_FIELDS = ('trades', 'pnl', 'winRate', 'profitFactor', 'expectancy', 'sharpe', 'sortino')
+
+
+def rolling_window_stats(units, starts):
+    """
+    Estadísticas de ventanas definidas por su primera unidad
+
+    La ventana i abarca las unidades starts[i]..i (incluidas).
+
+    Args:
+        units (dict): Arrays por unidad: 'trades', 'wins', 'gains', 'losses' y
+            'value' (P&L de la unidad, usado para Sharpe/Sortino)
+        starts (ndarray): Índice de la primera unidad de cada ventana
+
+    Returns:
+        dict: Arrays de ROLLING_FIELDS (uno por ventana)
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.arange(1, len(starts) + 1)
+
+    def window_sum(values):
+        cumulative = np.concatenate([[0.0], np.cumsum(values, dtype=float)])
+        return cumulative[ends] - cumulative[starts]
+
+    value = np.asarray(units['value'], dtype=float)
+    centered = value - (value.mean() if len(value) else 0.0)
+
+    trades = window_sum(units['trades'])
+    wins = window_sum(units['wins'])
+    gains = window_sum(units['gains'])
+    losses = window_sum(units['losses'])
+    count = (ends - starts).astype(float)
+    centered_sum = window_sum(centered)
+    squares_sum = window_sum(centered * centered)
+    downside_sum = window_sum(np.minimum(value, 0.0) ** 2)
+
+    pnl = gains - losses
+    mean = window_sum(value) / count
+    with np.errstate(divide='ignore', invalid='ignore'):
+        variance = np.maximum(squares_sum - centered_sum * centered_sum / count, 0.0) / (count - 1)
+        std = np.sqrt(variance)
+        downside = np.sqrt(downside_sum / count)
+
+        return {
+            'trades': np.rint(trades).astype(np.int64),
+            'pnl': pnl,
+            'winRate': np.where(trades > 0, wins / trades * 100, 0.0),
+            'profitFactor': np.where(losses > 0, gains / losses, gains),
+            'expectancy': np.where(trades > 0, pnl / trades, 0.0),
+            'sharpe': np.where((count > 1) & (std > 0), mean / std, 0.0),
+            'sortino': np.where(downside > 0, mean / downside, 0.0)
+        }
+
+
+def rolling_trade_metrics(pnl, window):
+    """
+    Métricas de las ventanas de las últimas N operaciones
+
+    Args:
+        pnl (ndarray): P&L de cada operación en orden cronológico
+        window (int): Número de operaciones por ventana
+
+    Returns:
+        dict: Arrays de ROLLING_FIELDS (uno por operación)
+    """
+    pnl = np.asarray(pnl, dtype=float)
+    window = max(int(window), 1)
+    starts = np.maximum(np.arange(len(pnl)) - window + 1, 0)
+    return rolling_window_stats(_trade_units(pnl), starts)
+
+
+def rolling_day_metrics(pnl, timestamps, window):
+    """
+    Métricas de las ventanas de los últimos N días naturales
+
+    Las operaciones se agregan primero por día; la ventana de cada día con
+    operaciones incluye los días (con operaciones) de los N días naturales
+    que terminan en él. Las operaciones sin fecha válida se ignoran.
+
+    Args:
+        pnl (ndarray): P&L de cada operación en orden cronológico
+        timestamps (ndarray): Timestamps (ns) de cada operación
+        window (int): Número de días naturales por ventana
+
+    Returns:
+        tuple: (días como número de días desde epoch, dict de arrays de ROLLING_FIELDS)
+    """
+    pnl = np.asarray(pnl, dtype=float)
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    valid = valid_mask(timestamps)
+    pnl, day_numbers = pnl[valid], timestamps[valid] // NS_PER_DAY
+
+    days, codes = np.unique(day_numbers, return_inverse=True)
+    per_trade = _trade_units(pnl)
+    units = {name: np.bincount(codes, weights=values, minlength=len(days)) for name, values in per_trade.items()}
+
+    window = max(int(window), 1)
+    starts = np.searchsorted(days, days - window + 1, side='left')
+    return days, rolling_window_stats(units, starts)
+
+
+def _trade_units(pnl):
+    """Medidas por operación para rolling_window_stats"""
+    wins = pnl > 0
+    return {
+        'trades': np.ones(len(pnl)),
+        'wins': wins.astype(float),
+        'gains': np.where(wins, pnl, 0.0),
+        'losses': np.where(wins, 0.0, -pnl),
+        'value': pnl
+    }
+
+
+def rolling_chart_points(pnl, timestamps, window, unit, points):
+    """
+    Puntos de las métricas móviles para el gráfico
+
+    Args:
+        pnl (ndarray): P&L de cada operación en orden cronológico
+        timestamps (ndarray): Timestamps (ns) de cada operación
+        window (int): Tamaño de la ventana (operaciones o días)
+        unit (str): 'trades' o 'days'
+        points (int): Número máximo de puntos (submuestreo LTTB sobre el P&L de la ventana)
+
+    Returns:
+        tuple: (lista de diccionarios con 'label' y ROLLING_FIELDS, número total de puntos)
+    """
+    if unit not in ROLLING_UNITS:
+        raise ValueError(f"Unidad de ventana desconocida: '{unit}'")
+
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    if unit == 'days':
+        days, metrics = rolling_day_metrics(pnl, timestamps, window)
+    else:
+        metrics = rolling_trade_metrics(pnl, window)
+
+    total = len(metrics['pnl'])
+    selected = lttb_indices(metrics['pnl'], points)
+
+    # Etiquetas solo de los puntos seleccionados: fecha del día o número y hora de la operación
+    if unit == 'days':
+        labels = np.datetime_as_string(days[selected].astype('datetime64[D]')).tolist()
+    else:
+        dates = np.datetime_as_string(timestamps[selected].view('datetime64[ns]'), unit='m')
+        dates = np.where(valid_mask(timestamps[selected]), np.char.replace(dates, 'T', ' '), '')
+        labels = [f'#{index + 1} {date}'.strip() for index, date in zip(selected.tolist(), dates.tolist())]
+
+    columns = {name: metrics[name][selected].tolist() for name in ROLLING_FIELDS}
+    return [
+        dict({'label': label}, **{name: columns[name][position] for name in ROLLING_FIELDS})
+        for position, label in enumerate(labels)
+    ], total
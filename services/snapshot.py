@@ -0,0 +1,210 @@
+"""
+Instantáneas binarias por columnas de las exportaciones CSV
+
+La primera vez que se parsea un CSV se guarda, junto a los datos, una
+instantánea con sus columnas ya tipadas y normalizadas: un archivo .npy por
+columna y un meta.json con el tipo de cada columna y la huella del CSV de
+origen (tamaño, mtime y SHA-256). Las cargas siguientes mapean en memoria
+los .npy (np.load con mmap_mode) en lugar de volver a parsear el texto.
+
+Tipos de columna:
+
+- 'numeric': el array tal cual (float, int o bool).
+- 'category': códigos enteros y tabla de valores (ver services.ingest.CATEGORICAL_COLUMNS).
+- 'string': texto de ancho fijo más una máscara de valores ausentes.
+
+La instantánea es válida si el tamaño y el mtime del CSV coinciden; si solo
+coincide el tamaño (archivo copiado o tocado) se compara el SHA-256.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+# Versión del formato; las instantáneas de otra versión se ignoran
+SNAPSHOT_FORMAT_VERSION = 1
+
+_META_FILE = 'meta.json'
+_HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def file_fingerprint(path, with_hash=True):
+    """
+    Huella de un archivo de origen
+
+    Args:
+        path (str): Ruta del archivo
+        with_hash (bool, optional): Incluir el SHA-256 del contenido
+
+    Returns:
+        dict: 'size', 'mtime_ns' y (opcionalmente) 'sha256'
+    """
+    stat = os.stat(path)
+    fingerprint = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    if with_hash:
+        fingerprint['sha256'] = _sha256(path)
+    return fingerprint
+
+
+def _sha256(path):
+    """SHA-256 del contenido de un archivo leído por bloques"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def snapshot_path(snapshot_dir, source_path, kind):
+    """Directorio de la instantánea de un CSV (uno por ruta de origen y tipo)"""
+    source_key = hashlib.sha1(os.path.abspath(source_path).encode('utf-8')).hexdigest()[:12]
+    return os.path.join(snapshot_dir, f'{kind}-{source_key}')
+
+
+def load_snapshot(snapshot_dir, source_path, kind):
+    """
+    Carga la instantánea de un CSV si existe y corresponde al archivo actual
+
+    Args:
+        snapshot_dir (str): Directorio de instantáneas
+        source_path (str): Ruta del CSV de origen
+        kind (str): 'orders', 'trades' o 'tickets'
+
+    Returns:
+        DataFrame or None: Datos normalizados o None si no hay instantánea válida
+    """
+    path = snapshot_path(snapshot_dir, source_path, kind)
+    meta_path = os.path.join(path, _META_FILE)
+    if not os.path.exists(meta_path):
+        return None
+
+    try:
+        with open(meta_path, encoding='utf-8') as f:
+            meta = json.load(f)
+
+        if meta.get('version') != SNAPSHOT_FORMAT_VERSION or not _is_current(meta, source_path, meta_path):
+            return None
+
+        columns = {
+            column['name']: _load_column(path, index, column)
+            for index, column in enumerate(meta['columns'])
+        }
+        return pd.DataFrame(columns, copy=False)
+
+    except Exception as e:
+        print(f"[ERROR] No se pudo cargar la instantánea {path}: {e}")
+        return None
+
+
+def _is_current(meta, source_path, meta_path):
+    """Comprueba que la instantánea corresponde al contenido actual del CSV"""
+    source = meta['source']
+    current = file_fingerprint(source_path, with_hash=False)
+    if current['size'] != source['size']:
+        return False
+    if current['mtime_ns'] == source['mtime_ns']:
+        return True
+
+    # Mismo tamaño pero otro mtime: decidir por el contenido
+    if _sha256(source_path) != source['sha256']:
+        return False
+
+    meta['source']['mtime_ns'] = current['mtime_ns']
+    _write_json(meta_path, meta)
+    return True
+
+
+def _load_column(path, index, column):
+    """Carga (mapeada en memoria) una columna de la instantánea"""
+    def load(suffix):
+        return np.load(os.path.join(path, f'{index}.{suffix}.npy'), mmap_mode='c', allow_pickle=False)
+
+    if column['type'] == 'category':
+        return pd.Categorical.from_codes(load('codes'), pd.Index(load('categories')))
+
+    if column['type'] == 'string':
+        values = load('values').astype(object)
+        values[load('missing')] = np.nan
+        return values
+
+    return load('values')
+
+
+def write_snapshot(snapshot_dir, source_path, kind, frame):
+    """
+    Guarda la instantánea de un CSV ya parseado y normalizado
+
+    Se escribe en un directorio temporal y se mueve a su sitio al terminar,
+    de modo que una instantánea a medio escribir nunca se da por válida.
+
+    Args:
+        snapshot_dir (str): Directorio de instantáneas
+        source_path (str): Ruta del CSV de origen
+        kind (str): 'orders', 'trades' o 'tickets'
+        frame (DataFrame): Datos normalizados del CSV
+    """
+    path = snapshot_path(snapshot_dir, source_path, kind)
+
+    try:
+        os.makedirs(snapshot_dir, exist_ok=True)
+        source = file_fingerprint(source_path)
+        temp_dir = tempfile.mkdtemp(prefix=f'.{kind}-', dir=snapshot_dir)
+
+        columns = [
+            _save_column(temp_dir, index, name, frame[name])
+            for index, name in enumerate(frame.columns)
+        ]
+        _write_json(os.path.join(temp_dir, _META_FILE), {
+            'version': SNAPSHOT_FORMAT_VERSION,
+            'kind': kind,
+            'source': source,
+            'rows': len(frame),
+            'columns': columns
+        })
+
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.replace(temp_dir, path)
+        print(f"[INFO] Instantánea guardada: {path}")
+
+    except Exception as e:
+        print(f"[ERROR] No se pudo guardar la instantánea de {source_path}: {e}")
+
+
+def _save_column(path, index, name, series):
+    """Guarda una columna y devuelve su descripción para meta.json"""
+    def save(suffix, values):
+        np.save(os.path.join(path, f'{index}.{suffix}.npy'), values, allow_pickle=False)
+
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        save('codes', series.cat.codes.to_numpy())
+        save('categories', series.cat.categories.to_numpy(dtype=_plain_dtype(series.cat.categories)))
+        return {'name': name, 'type': 'category'}
+
+    if series.dtype != object:
+        save('values', series.to_numpy())
+        return {'name': name, 'type': 'numeric'}
+
+    missing = series.isna().to_numpy()
+    save('values', series.where(~missing, '').astype(str).to_numpy(dtype=str))
+    save('missing', missing)
+    return {'name': name, 'type': 'string'}
+
+
+def _plain_dtype(categories):
+    """Tipo NumPy sin objetos para guardar una tabla de valores"""
+    if categories.dtype == object:
+        return str
+    return categories.dtype
+
+
+def _write_json(path, data):
+    """Escribe un JSON de forma atómica"""
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(temp_path, path)
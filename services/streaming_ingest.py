@@ -0,0 +1,221 @@
+"""
+Ingesta por trozos (streaming) de las exportaciones de DAS Trader
+
+Los tres CSV se leen por trozos de chunk_size filas y se reparten en
+particiones temporales según un hash del OrderID (los tickets se reparten
+por el OrderID de su trade). Cada partición contiene órdenes completas, de
+modo que se puede unir y agregar de forma independiente; los agregados
+parciales se combinan con PerformanceAccumulator en el mismo diccionario de
+resultados que produce process_trading_data.
+
+La memoria de ingesta queda acotada por chunk_size. Lo único que crece con
+la exportación es el índice TradeID -> partición (dos enteros por trade),
+necesario para enviar cada ticket a la partición de su orden.
+
+Las órdenes se guardan en las particiones con su número de fila en el CSV
+(columna ROW_COLUMN). Ese número es la secuencia global con la que
+PerformanceAccumulator desempata las órdenes con el mismo timestamp, y con él
+processed_orders vuelve al orden del CSV; así la curva de equity y el drawdown
+coinciden con los de process_trading_data.
+"""
+import math
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from services.aggregates import PerformanceAccumulator
+from services.cube import PerformanceCube
+from services.data_processor import _get_empty_result
+from services.engines import get_engine
+from services.ingest import normalize_frame, read_export_csv
+from services.order_index import OrderIndex
+from services.positions import RoundTripBook
+from services.processed_orders import ProcessedOrders
+
+# Tamaño de trozo por defecto (filas)
+DEFAULT_CHUNK_SIZE = 100_000
+
+# Bytes leídos del inicio de cada archivo para estimar su número de filas
+_SAMPLE_BYTES = 64 * 1024
+
+# Columna temporal con el número de fila de cada orden en el CSV
+ROW_COLUMN = '_csv_row'
+
+
+def process_trading_data_streaming(orders_path, trades_path, tickets_path, chunk_size=DEFAULT_CHUNK_SIZE,
+                                   engine=None):
+    """
+    Procesa los datos de trading leyendo los CSV por trozos
+
+    Args:
+        orders_path (str): Ruta del CSV de órdenes
+        trades_path (str): Ruta del CSV de trades
+        tickets_path (str): Ruta del CSV de tickets
+        chunk_size (int, optional): Número máximo de filas por trozo y, aproximadamente, por partición
+        engine (str, optional): Motor usado para unir cada partición
+
+    Returns:
+        dict: Mismo formato que process_trading_data
+    """
+    try:
+        processing_engine = get_engine(engine)
+        num_partitions = _estimate_partitions([orders_path, trades_path], chunk_size)
+
+        with tempfile.TemporaryDirectory(prefix='das_ingest_') as spill_dir:
+            trade_index = _spill_trades(trades_path, spill_dir, num_partitions, chunk_size)
+            _spill_orders(orders_path, spill_dir, num_partitions, chunk_size)
+            if os.path.exists(tickets_path) and os.path.getsize(tickets_path) > 0:
+                _spill_tickets(tickets_path, spill_dir, trade_index, chunk_size)
+
+            accumulator = PerformanceAccumulator()
+            parts, positions = [], []
+
+            for partition in range(num_partitions):
+                partial = _process_partition(spill_dir, partition, processing_engine)
+                if partial is None:
+                    continue
+                rows, processed = partial
+                accumulator.update(processed, sequence=rows)
+                parts.append(processed)
+                positions.append(rows)
+
+        # Volver al orden del CSV de órdenes
+        processed_orders = ProcessedOrders.concat(parts)
+        if len(processed_orders):
+            processed_orders = processed_orders.take(np.argsort(np.concatenate(positions), kind='stable'))
+
+        result = accumulator.to_result()
+        result['processed_orders'] = processed_orders
+        result['aggregate_state'] = accumulator.compact()
+        result['performance_cube'] = PerformanceCube.from_orders(result['processed_orders'])
+        result['order_index'] = OrderIndex.from_orders(result['processed_orders'])
+        result['round_trips'] = RoundTripBook.from_orders(result['processed_orders'])
+        return result
+
+    except Exception as e:
+        print(f"Error procesando datos: {e}")
+        return _get_empty_result()
+
+
+def _estimate_partitions(paths, chunk_size):
+    """Estima el número de particiones para que cada una tenga ~chunk_size filas"""
+    max_rows = max(_estimate_rows(path) for path in paths)
+    return max(1, math.ceil(max_rows / chunk_size))
+
+
+def _estimate_rows(path):
+    """Estima el número de filas de un CSV a partir de una muestra del inicio"""
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        sample = f.read(_SAMPLE_BYTES)
+
+    lines = sample.count(b'\n')
+    if lines == 0 or size <= len(sample):
+        return lines
+    return int(size / (len(sample) / lines))
+
+
+def _partition_of(keys, num_partitions):
+    """Calcula la partición de cada clave a partir de un hash de su texto"""
+    hashes = pd.util.hash_array(keys.astype(str).str.strip().to_numpy(dtype=object))
+    return (hashes % np.uint64(num_partitions)).astype(np.int64)
+
+
+def _partition_path(spill_dir, name, partition):
+    """Ruta del archivo temporal de una partición"""
+    return os.path.join(spill_dir, f'{name}_{partition}.csv')
+
+
+def _append_partitions(frame, partitions, spill_dir, name):
+    """Añade las filas del trozo a los archivos de sus particiones"""
+    for partition, rows in frame.groupby(partitions, sort=False):
+        path = _partition_path(spill_dir, name, partition)
+        rows.to_csv(path, mode='a', header=not os.path.exists(path), index=False)
+
+
+def _read_chunks(path, chunk_size):
+    """Lee un CSV por trozos conservando los valores como texto"""
+    return pd.read_csv(path, dtype=str, chunksize=chunk_size)
+
+
+def _spill_trades(trades_path, spill_dir, num_partitions, chunk_size):
+    """
+    Reparte los trades por partición y construye el índice TradeID -> partición
+
+    Returns:
+        tuple: (hashes de TradeID ordenados, partición de cada uno)
+    """
+    trade_hashes = []
+    trade_partitions = []
+
+    for chunk in _read_chunks(trades_path, chunk_size):
+        partitions = _partition_of(chunk['OrderID'], num_partitions)
+        _append_partitions(chunk, partitions, spill_dir, 'trades')
+
+        trade_hashes.append(pd.util.hash_array(chunk['TradeID'].astype(str).str.strip().to_numpy(dtype=object)))
+        trade_partitions.append(partitions)
+
+    if not trade_hashes:
+        return np.array([], dtype=np.uint64), np.array([], dtype=np.int64)
+
+    hashes = np.concatenate(trade_hashes)
+    partitions = np.concatenate(trade_partitions)
+    order = np.argsort(hashes, kind='stable')
+    return hashes[order], partitions[order]
+
+
+def _spill_orders(orders_path, spill_dir, num_partitions, chunk_size):
+    """Reparte las órdenes por partición según su OrderID, con su número de fila en el CSV"""
+    offset = 0
+    for chunk in _read_chunks(orders_path, chunk_size):
+        chunk[ROW_COLUMN] = np.arange(offset, offset + len(chunk), dtype=np.int64)
+        offset += len(chunk)
+        _append_partitions(chunk, _partition_of(chunk['OrderID'], num_partitions), spill_dir, 'orders')
+
+
+def _spill_tickets(tickets_path, spill_dir, trade_index, chunk_size):
+    """Reparte los tickets en la partición de la orden de su trade"""
+    hashes, partitions = trade_index
+    if not len(hashes):
+        return
+
+    for chunk in _read_chunks(tickets_path, chunk_size):
+        ticket_hashes = pd.util.hash_array(chunk['TradeID'].astype(str).str.strip().to_numpy(dtype=object))
+        pos = np.clip(np.searchsorted(hashes, ticket_hashes), 0, len(hashes) - 1)
+        matched = hashes[pos] == ticket_hashes
+
+        # Los tickets sin trade no afectan al resultado
+        if matched.any():
+            _append_partitions(chunk[matched], partitions[pos[matched]], spill_dir, 'tickets')
+
+
+def _process_partition(spill_dir, partition, engine):
+    """
+    Une y procesa las órdenes de una partición
+
+    Returns:
+        tuple or None: (filas en el CSV de las órdenes procesadas, ProcessedOrders),
+                       o None si la partición no tiene órdenes o trades
+    """
+    orders_path = _partition_path(spill_dir, 'orders', partition)
+    trades_path = _partition_path(spill_dir, 'trades', partition)
+    tickets_path = _partition_path(spill_dir, 'tickets', partition)
+
+    if not (os.path.exists(orders_path) and os.path.exists(trades_path)):
+        return None
+
+    orders_df = normalize_frame(read_export_csv(orders_path, 'orders'), 'orders')
+    rows = pd.to_numeric(orders_df.pop(ROW_COLUMN)).to_numpy(dtype=np.int64)
+    trades_df = normalize_frame(read_export_csv(trades_path, 'trades'), 'trades')
+    if os.path.exists(tickets_path):
+        tickets_df = normalize_frame(read_export_csv(tickets_path, 'tickets'), 'tickets')
+    else:
+        tickets_df = pd.DataFrame()
+
+    processed = engine.join(orders_df, trades_df, tickets_df)
+
+    # Las uniones solo conservan (en su orden) las órdenes con algún trade
+    rows = rows[orders_df['OrderID'].isin(trades_df['OrderID']).to_numpy()]
+    return rows, processed
@@ -0,0 +1,192 @@
+"""
+Utilidades de fecha/hora para las órdenes procesadas
+
+La columna 'time' de DAS Trader se parsea una sola vez durante la ingesta y
+se guarda como entero de nanosegundos desde epoch (columna 'timestamp', hora
+local de la exportación sin zona horaria). Las órdenes sin fecha válida
+llevan el valor NAT, que es el mínimo de int64 y por tanto se ordena primero.
+Todas las ordenaciones cronológicas y los cálculos de hora, fecha o día de la
+semana deben partir de esa columna en lugar de volver a parsear el texto.
+"""
+from datetime import time as dt_time
+
+import numpy as np
+import pandas as pd
+
+# Formatos conocidos de las exportaciones (se detecta cuál usa cada archivo)
+KNOWN_TIME_FORMATS = (
+    '%m/%d/%y %H:%M:%S',
+    '%Y-%m-%d %H:%M:%S',
+    '%m/%d/%Y %H:%M:%S',
+)
+
+# Valor de timestamp para fechas ausentes o no parseables (igual que pd.NaT)
+NAT = np.iinfo(np.int64).min
+
+NS_PER_SECOND = 1_000_000_000
+NS_PER_DAY = 86_400 * NS_PER_SECOND
+
+# Número de valores que se usan para detectar el formato
+_DETECTION_SAMPLE = 200
+
+WEEKDAY_NAMES = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
+
+
+def detect_time_format(values, formats=KNOWN_TIME_FORMATS):
+    """
+    Detecta el formato de fecha/hora que mejor parsea una muestra de valores
+
+    Args:
+        values (Series): Valores de texto de la columna de tiempo
+        formats (tuple, optional): Formatos candidatos
+
+    Returns:
+        str or None: Formato con más aciertos o None si ninguno parsea la muestra
+    """
+    sample = pd.Series(values).dropna().head(_DETECTION_SAMPLE)
+    if sample.empty:
+        return None
+
+    best_format, best_hits = None, 0
+    for fmt in formats:
+        hits = pd.to_datetime(sample, format=fmt, errors='coerce').notna().sum()
+        if hits > best_hits:
+            best_format, best_hits = fmt, hits
+    return best_format
+
+
+def parse_timestamps(values, formats=None):
+    """
+    Parsea de forma vectorizada una columna de fecha/hora
+
+    Primero se parsea toda la columna con el formato detectado y después solo
+    los valores que no encajan se prueban con los demás formatos.
+
+    Args:
+        values (Series or array): Valores de texto de la columna de tiempo
+        formats (tuple, optional): Formatos candidatos; por defecto KNOWN_TIME_FORMATS
+
+    Returns:
+        ndarray: int64 con nanosegundos desde epoch (NAT si no se pudo parsear)
+    """
+    values = pd.Series(values).reset_index(drop=True)
+    formats = tuple(formats or KNOWN_TIME_FORMATS)
+
+    detected = detect_time_format(values, formats)
+    if detected is not None:
+        formats = (detected,) + tuple(fmt for fmt in formats if fmt != detected)
+
+    parsed = pd.Series(pd.NaT, index=values.index, dtype='datetime64[ns]')
+    for fmt in formats:
+        missing = parsed.isna() & values.notna()
+        if not missing.any():
+            break
+        parsed[missing] = pd.to_datetime(values[missing], format=fmt, errors='coerce')
+
+    return parsed.to_numpy(dtype='datetime64[ns]').view(np.int64)
+
+
+def valid_mask(timestamps):
+    """Máscara de timestamps válidos"""
+    return np.asarray(timestamps, dtype=np.int64) != NAT
+
+
+def hours_of(timestamps):
+    """Hora del día (0-23) de cada timestamp; 0 para fechas no válidas"""
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    hours = (timestamps % NS_PER_DAY) // (3600 * NS_PER_SECOND)
+    return np.where(valid_mask(timestamps), hours, 0)
+
+
+def weekdays_of(timestamps):
+    """Día de la semana (0 = lunes) de cada timestamp; -1 para fechas no válidas"""
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    # El 1970-01-01 fue jueves (3)
+    weekdays = (timestamps // NS_PER_DAY + 3) % 7
+    return np.where(valid_mask(timestamps), weekdays, -1)
+
+
+def dates_of(timestamps):
+    """Fecha 'YYYY-MM-DD' de cada timestamp; cadena vacía para fechas no válidas"""
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    days = np.datetime_as_string(timestamps.view('datetime64[ns]').astype('datetime64[D]'))
+    return np.where(valid_mask(timestamps), days, '').astype(object)
+
+
+def time_of_day_ns(timestamps):
+    """Nanosegundos transcurridos desde medianoche de cada timestamp"""
+    return np.asarray(timestamps, dtype=np.int64) % NS_PER_DAY
+
+
+def time_to_ns(value):
+    """Convierte un datetime.time a nanosegundos desde medianoche"""
+    if not isinstance(value, dt_time):
+        raise TypeError('Se esperaba un datetime.time')
+    seconds = value.hour * 3600 + value.minute * 60 + value.second
+    return seconds * NS_PER_SECOND + value.microsecond * 1000
+
+
+def order_timestamps(orders):
+    """
+    Devuelve el array de timestamps de un conjunto de órdenes
+
+    Usa la columna 'timestamp' cuando existe y, para cachés antiguas que no la
+    tienen, parsea la columna 'time' una única vez.
+
+    Args:
+        orders (ProcessedOrders): Órdenes procesadas
+
+    Returns:
+        ndarray: int64 con nanosegundos desde epoch
+    """
+    if not len(orders):
+        return np.array([], dtype=np.int64)
+    if 'timestamp' in orders.columns:
+        return np.asarray(orders.column('timestamp'), dtype=np.int64)
+    if 'time' in orders.columns:
+        return parse_timestamps(orders.column('time'))
+    return np.full(len(orders), NAT, dtype=np.int64)
+
+
+def fill_timestamps(orders):
+    """
+    Devuelve el array de timestamps de los fills de un conjunto de órdenes
+
+    Los fills con la misma hora (texto) que su orden reutilizan el timestamp
+    ya parseado de la orden; del resto solo se parsea una vez cada hora
+    distinta.
+
+    Args:
+        orders (ProcessedOrders): Órdenes procesadas (con la columna 'time' en los fills)
+
+    Returns:
+        ndarray: int64 con nanosegundos desde epoch, un valor por fill
+    """
+    times = orders.fill_column('time')
+    timestamps = np.full(len(times), NAT, dtype=np.int64)
+    pending = np.ones(len(times), dtype=bool)
+
+    if 'time' in orders.columns and len(times):
+        owners = np.repeat(np.arange(len(orders)), np.diff(orders.fill_offsets))
+        same = times == orders.column('time')[owners]
+        timestamps[same] = order_timestamps(orders)[owners[same]]
+        pending &= ~same
+
+    if pending.any():
+        codes, uniques = pd.factorize(times[pending])
+        parsed = np.append(parse_timestamps(uniques), NAT)
+        timestamps[pending] = parsed[codes]
+    return timestamps
+
+
+def order_timestamp(order):
+    """Timestamp de una orden individual (parseando 'time' si falta la columna)"""
+    timestamp = order.get('timestamp')
+    if timestamp is not None:
+        return timestamp
+    return int(parse_timestamps([order.get('time')])[0])
+
+
+def chronological_order(timestamps):
+    """Permutación estable que ordena los timestamps cronológicamente"""
+    return np.argsort(np.asarray(timestamps, dtype=np.int64), kind='stable')